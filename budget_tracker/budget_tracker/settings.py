@@ -41,11 +41,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so its timings cover the rest of the stack; removes itself
+    # at startup unless BUDGETS_PERF_ENABLED is set.
+    'budgets.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'budgets.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +85,53 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# budgets.cache stores month totals and breakdowns here. Local memory is
+# per process; use a shared backend (file, memcached, redis) when running
+# several worker processes so invalidations reach all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'budget-tracker',
+    }
+}
+
+
+# Request performance instrumentation
+# budgets.middleware.PerformanceMiddleware adds a Server-Timing header
+# (wall, SQL and cache timings) to every response and writes p50/p95/p99
+# per URL name as JSON lines every BUDGETS_PERF_REPORT_INTERVAL seconds,
+# to BUDGETS_PERF_REPORT_FILE or, when that is None, the 'budgets.perf'
+# logger. Disabled, the middleware is not loaded at all.
+
+BUDGETS_PERF_ENABLED = False
+BUDGETS_PERF_SLOWEST_QUERIES = 3
+BUDGETS_PERF_REPORT_INTERVAL = 60
+BUDGETS_PERF_REPORT_FILE = None
+
+
+# On-demand profiling
+# Staff requests with ?_profile=1 or an X-Profile: 1 header, and budgets
+# management commands run with --profile, write a cProfile capture to
+# BUDGETS_PROFILE_DIR, keeping the newest BUDGETS_PROFILE_KEEP. Captures
+# are listed in the admin under Monthly instances > Profiles.
+
+BUDGETS_PROFILE_REQUESTS = True
+BUDGETS_PROFILE_DIR = BASE_DIR / 'profiles'
+BUDGETS_PROFILE_KEEP = 50
+
+
+# Metrics
+# /metrics serves budgets.metrics in the Prometheus text format. With
+# BUDGETS_METRICS_DIR unset each process reports only its own values; set it
+# to a directory shared by all worker processes on the host (and emptied on
+# deploy) to report values summed over them.
+
+BUDGETS_METRICS_DIR = None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
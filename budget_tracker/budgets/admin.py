@@ -1,6 +1,85 @@
-from django.contrib import admin
+import io
+from datetime import date
+
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
+from django.core.exceptions import PermissionDenied
 from django import forms
-from .models import BudgetItem, MonthlyInstance
+from django.db.models import Q
+from django.db.models.functions import Collate
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from . import metrics
+from .imports import DEFAULT_BATCH_SIZE, import_items
+from .models import BudgetItem, BudgetItemCostPeriod, MonthlyInstance, Owner
+from .months import month_ordinal, ordinal_to_month
+from .profiling import get_capture, recent_captures
+from .views import BadRequest, _decode_cursor, _encode_cursor
+
+
+class ActiveInMonthFilter(admin.SimpleListFilter):
+    """Filter budget items to the repeating items active in an existing month."""
+    title = 'active in month'
+    parameter_name = 'active_in'
+    # Months listed either side of the current one; others can still be
+    # picked with ?active_in=YYYY-MM-DD.
+    MONTHS_AROUND = 6
+
+    def lookups(self, request, model_admin):
+        """List the existing months within ``MONTHS_AROUND`` of today, latest first, and the selected month."""
+        today = month_ordinal(timezone.localdate())
+        months = list(MonthlyInstance.objects.filter(
+            month__gte=ordinal_to_month(today - self.MONTHS_AROUND),
+            month__lte=ordinal_to_month(today + self.MONTHS_AROUND)
+        ).order_by('-month').values_list('month', flat=True)[:2 * self.MONTHS_AROUND + 1])
+        selected = self.selected_month()
+        if selected is not None and selected not in months:
+            months = sorted(months + [selected], reverse=True)
+        return [(month.isoformat(), month.strftime('%B %Y')) for month in months]
+
+    def selected_month(self):
+        try:
+            return date.fromisoformat(self.value())
+        except (TypeError, ValueError):
+            return None
+
+    def queryset(self, request, queryset):
+        if self.value():
+            month = self.selected_month()
+            if month is None:
+                return queryset.none()
+            return queryset.active_in(month)
+        return queryset
+
+
+class BudgetItemAutocomplete(AutocompleteSelectMultiple):
+    """
+    Select2 picker for the repeating or non-repeating budget items of a month.
+
+    Only the selected items are rendered; everything else is searched a page
+    at a time through ``MonthlyInstanceAdmin.item_lookup_view``, which pages
+    by cursor rather than page number (see ``budgets/js/item_lookup.js``).
+    """
+
+    def __init__(self, repeats, admin_site=admin.site, attrs=None):
+        super().__init__(MonthlyInstance._meta.get_field('budget_items'), admin_site, attrs)
+        self.repeats = repeats
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-keyset'] = 'true'
+        return attrs
+
+    @property
+    def media(self):
+        return super().media + forms.Media(js=['budgets/js/item_lookup.js'])
+
+    def get_url(self):
+        url = reverse(f'{self.admin_site.name}:budgets_monthlyinstance_item_lookup')
+        return f"{url}?repeats={'true' if self.repeats else 'false'}"
 
 
 class MonthlyInstanceAdminForm(forms.ModelForm):
@@ -8,14 +87,14 @@ class MonthlyInstanceAdminForm(forms.ModelForm):
     
     repeating_items = forms.ModelMultipleChoiceField(
         queryset=BudgetItem.objects.none(),
-        widget=forms.CheckboxSelectMultiple,
+        widget=BudgetItemAutocomplete(repeats=True),
         required=False,
         help_text="These are automatically included repeating budget items for this month"
     )
     
     non_repeating_items = forms.ModelMultipleChoiceField(
         queryset=BudgetItem.objects.none(),
-        widget=admin.widgets.FilteredSelectMultiple("Budget Items", is_stacked=False),
+        widget=BudgetItemAutocomplete(repeats=False),
         required=False,
         help_text="Select additional non-repeating budget items to include in this month"
     )
@@ -26,54 +105,97 @@ class MonthlyInstanceAdminForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.creating = self.instance._state.adding
         
-        # Set up the querysets for repeating and non-repeating items
-        self.fields['repeating_items'].queryset = BudgetItem.objects.filter(repeats=True)
-        self.fields['non_repeating_items'].queryset = BudgetItem.objects.filter(repeats=False)
+        # Set up the querysets for repeating and non-repeating items. They
+        # are only evaluated for the selected ids, by the widgets and by
+        # validation.
+        items = BudgetItem.objects.select_related('owner')
+        self.fields['repeating_items'].queryset = items.filter(repeats=True)
+        self.fields['non_repeating_items'].queryset = items.filter(repeats=False)
         
         # If we have an instance, populate the fields with current selections
         if self.instance and self.instance.pk:
-            current_items = self.instance.budget_items.all()
-            repeating_current = current_items.filter(repeats=True)
-            non_repeating_current = current_items.filter(repeats=False)
+            current_items = self.instance.budget_items.values_list('pk', 'repeats')
             
             # Set initial values for the fields
             if 'initial' not in kwargs:
                 self.initial = {}
-            self.initial['repeating_items'] = list(repeating_current)
-            self.initial['non_repeating_items'] = list(non_repeating_current)
+            self.initial['repeating_items'] = []
+            self.initial['non_repeating_items'] = []
+            for pk, repeats in current_items:
+                self.initial['repeating_items' if repeats else 'non_repeating_items'].append(pk)
     
-    def save(self, commit=True):
-        instance = super().save(commit=commit)
-        
-        if commit:
-            # Clear existing items and set the new ones
-            selected_repeating = self.cleaned_data.get('repeating_items', [])
-            selected_non_repeating = self.cleaned_data.get('non_repeating_items', [])
-            
-            # Combine both sets of items
-            all_selected_items = list(selected_repeating) + list(selected_non_repeating)
-            instance.budget_items.set(all_selected_items)
-            
-            # Recalculate total
-            instance.calculate_total()
-        
-        return instance
+    def _save_m2m(self):
+        """
+        Apply the picked items to the month, diffing against its current items.
+
+        Runs from ``save()`` and, in the admin's ``commit=False`` flow, from
+        ``save_m2m()``. A new month also gets the repeating items active in
+        it, so when the admin saves it with ``auto_populate=False`` the month
+        is populated in this single pass. Picked repeating items are costed
+        for their occurrences in the month.
+        """
+        super()._save_m2m()
+        month = self.instance.month
+        occurrences = {item.pk: item.occurrences_in(month) for item in self.cleaned_data.get('repeating_items', ())}
+        selected = set(occurrences) | {item.pk for item in self.cleaned_data.get('non_repeating_items', ())}
+        if self.creating:
+            active = BudgetItem.objects.occurrences_in(month)
+            occurrences.update(active)
+            selected.update(active)
+        self.instance.apply_selection(selected, occurrences=occurrences)
+
+
+class ImportItemsForm(forms.Form):
+    file = forms.FileField(help_text="UTF-8 CSV file with a header row")
+    link_months = forms.BooleanField(
+        required=False,
+        help_text="Link new repeating items into existing monthly instances"
+    )
+
+
+class TimedSaveMixin:
+    """Observe the time of add and change form submissions in ``budgets_admin_save_seconds``."""
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        if request.method != 'POST':
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        with metrics.admin_save_seconds.time(model=self.model._meta.model_name):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+
+class BudgetItemCostPeriodInline(admin.TabularInline):
+    model = BudgetItemCostPeriod
+    extra = 0
+    fields = ['effective_from', 'cost']
+
+
+@admin.register(Owner)
+class OwnerAdmin(TimedSaveMixin, admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at']
 
 
 @admin.register(BudgetItem)
-class BudgetItemAdmin(admin.ModelAdmin):
-    list_display = ['name', 'owner', 'cost', 'repeats', 'startdate', 'end_date', 'created_at']
-    list_filter = ['owner', 'repeats', 'created_at', 'startdate']
-    search_fields = ['name', 'owner']
+class BudgetItemAdmin(TimedSaveMixin, admin.ModelAdmin):
+    list_display = ['name', 'owner', 'cost', 'repeats', 'recurrence', 'startdate', 'end_date', 'created_at']
+    list_select_related = ['owner']
+    # The owner filter lists the small Owner table and filters on the
+    # indexed foreign key instead of a DISTINCT over every item.
+    list_filter = ['owner', 'repeats', 'recurrence', ActiveInMonthFilter, 'created_at', 'startdate']
+    search_fields = ['name', 'owner__name']
+    autocomplete_fields = ['owner']
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [BudgetItemCostPeriodInline]
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'owner')
         }),
         ('Financial Details', {
-            'fields': ('cost', 'repeats')
+            'fields': ('cost', 'repeats', 'recurrence', 'interval', 'day_of_month')
         }),
         ('Date Information', {
             'fields': ('startdate', 'end_date')
@@ -84,9 +206,54 @@ class BudgetItemAdmin(admin.ModelAdmin):
         }),
     )
 
+    # Skipped rows listed on the import page; the rest are only counted.
+    MAX_LISTED_ERRORS = 100
+
+    def get_urls(self):
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='budgets_budgetitem_import'
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Bulk-create items from an uploaded CSV file, streamed from the upload."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        errors = []
+        form = ImportItemsForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_items(
+                    lines, batch_size=DEFAULT_BATCH_SIZE, link_months=form.cleaned_data['link_months']
+                )
+            except (UnicodeDecodeError, ValueError) as exc:
+                form.add_error('file', str(exc))
+            else:
+                self.message_user(
+                    request,
+                    f"Created {result.created} budget item(s) and linked {result.linked} line item(s).",
+                    messages.SUCCESS
+                )
+                if not result.errors:
+                    return redirect('admin:budgets_budgetitem_changelist')
+                errors = result.errors
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import budget items',
+            'form': form,
+            'errors': errors[:self.MAX_LISTED_ERRORS],
+            'more_errors': max(len(errors) - self.MAX_LISTED_ERRORS, 0),
+        }
+        return TemplateResponse(request, 'admin/budgets/budgetitem/import_items.html', context)
+
 
 @admin.register(MonthlyInstance)
-class MonthlyInstanceAdmin(admin.ModelAdmin):
+class MonthlyInstanceAdmin(TimedSaveMixin, admin.ModelAdmin):
     form = MonthlyInstanceAdminForm
     list_display = ['month', 'total_amount', 'created_at']
     list_filter = ['month', 'created_at']
@@ -114,5 +281,92 @@ class MonthlyInstanceAdmin(admin.ModelAdmin):
     )
     
     def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        obj.calculate_total()
+        # New months are populated by the form's save_m2m(), together with
+        # the picked items.
+        obj.save(auto_populate=False)
+
+    # Results per page of the item pickers.
+    LOOKUP_PAGE_SIZE = 20
+    # Captures listed, and functions shown per capture, on the profiles page.
+    LISTED_PROFILES = 50
+    PROFILE_FUNCTIONS = 30
+    PROFILE_SORTS = ('cumulative', 'tottime', 'ncalls')
+
+    def get_urls(self):
+        return [
+            path(
+                'item-lookup/',
+                self.admin_site.admin_view(self.item_lookup_view),
+                name='budgets_monthlyinstance_item_lookup'
+            ),
+            path(
+                'profiles/',
+                self.admin_site.admin_view(self.profiles_view),
+                name='budgets_monthlyinstance_profiles'
+            ),
+            path(
+                'profiles/<str:name>/',
+                self.admin_site.admin_view(self.profiles_view),
+                name='budgets_monthlyinstance_profile'
+            ),
+        ] + super().get_urls()
+
+    def item_lookup_view(self, request):
+        """
+        Return one page of budget items for the item pickers in Select2's format.
+
+        Items are filtered by ``repeats`` and a name prefix ``term`` and walked
+        in case-insensitive name order along a partial (name, id) index: the
+        prefix is a LIKE the index can seek on, and a page seeks past the
+        (name, id) ``cursor`` returned with the page before it instead of
+        using OFFSET. One extra row is fetched to tell whether there is a
+        next page instead of counting matches.
+        """
+        if not (self.has_add_permission(request) or self.has_change_permission(request)):
+            raise PermissionDenied
+        items = BudgetItem.objects.filter(
+            repeats=request.GET.get('repeats') == 'true'
+        ).alias(name_nocase=Collate('name', 'nocase')).select_related('owner').order_by('name_nocase', 'id')
+        term = request.GET.get('term', '').strip()
+        if term:
+            items = items.filter(name__startswith=term)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                name, pk = _decode_cursor(BudgetItem, ['name', 'id'], cursor)
+            except BadRequest as exc:
+                return JsonResponse({'error': str(exc)}, status=400)
+            # The redundant >= gives SQLite a range to seek to.
+            items = items.filter(Q(name_nocase__gt=name) | Q(id__gt=pk), name_nocase__gte=name)
+        rows = list(items[:self.LOOKUP_PAGE_SIZE + 1])
+        pagination = {'more': len(rows) > self.LOOKUP_PAGE_SIZE}
+        if pagination['more']:
+            last = rows[self.LOOKUP_PAGE_SIZE - 1]
+            pagination['cursor'] = _encode_cursor([last.name, last.pk])
+        return JsonResponse({
+            'results': [{'id': str(item.pk), 'text': str(item)} for item in rows[:self.LOOKUP_PAGE_SIZE]],
+            'pagination': pagination,
+        })
+
+    def profiles_view(self, request, name=None):
+        """List recent profile captures and show the top functions of one of them."""
+        capture = report = None
+        sort = request.GET.get('sort', 'cumulative')
+        if sort not in self.PROFILE_SORTS:
+            sort = 'cumulative'
+        if name is not None:
+            capture = get_capture(name)
+            if capture is None:
+                raise Http404("No such profile capture")
+            report = capture.top_functions(self.PROFILE_FUNCTIONS, sort)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': capture.label if capture else 'Profile captures',
+            'captures': recent_captures(self.LISTED_PROFILES),
+            'capture': capture,
+            'report': report,
+            'sort': sort,
+            'sorts': self.PROFILE_SORTS,
+        }
+        return TemplateResponse(request, 'admin/budgets/monthlyinstance/profiles.html', context)
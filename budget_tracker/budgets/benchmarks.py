@@ -0,0 +1,589 @@
+"""
+Micro and macro benchmarks for the budgets app.
+
+Micro benchmarks (``BENCHMARKS``) build their own data inside a transaction
+that is rolled back afterwards, so they are safe to run against a
+development database.
+
+Macro benchmarks (``MACRO_BENCHMARKS``) time whole operations and pages
+against the data already in the database, typically created with
+``manage.py seed_benchmark``. Anything they write is rolled back too.
+"""
+import time
+from calendar import monthrange
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.test import Client
+from django.test.utils import override_settings
+
+from . import cache, recurrence
+from .forecast import forecast
+from .intervals import IntervalTree
+from .models import (
+    BudgetItem, BudgetItemCostPeriod, MonthlyInstance, MonthlyLineItem, Owner, cost_segments
+)
+from .months import month_ordinal, ordinal_to_month
+
+
+BENCHMARKS = {}
+MACRO_BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under ``name``."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def macro_benchmark(name):
+    """Register a benchmark of the existing data under ``name``."""
+    def decorator(func):
+        MACRO_BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _timed(func, repeat):
+    """Run ``func`` ``repeat`` times and return the best and mean wall times."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        'best_ms': round(min(timings) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+    }
+
+
+def _owners(count):
+    """Return ``count`` Owner instances named ``Owner <n>``, creating them if needed."""
+    names = [f'Owner {i}' for i in range(count)]
+    ids = Owner.objects.ids_for(names)
+    return [Owner(pk=ids[name], name=name) for name in names]
+
+
+def _create_linked_month(size):
+    """Create one month with ``size`` linked items, bypassing auto-population."""
+    owners = _owners(50)
+    items = BudgetItem.objects.bulk_create(
+        [
+            BudgetItem(
+                name=f'Item {i}',
+                owner=owners[i % 50],
+                cost=Decimal('10.00') + Decimal(i % 100),
+                repeats=False,
+                startdate=date(2024, 1, 1),
+            )
+            for i in range(size)
+        ],
+        batch_size=5000,
+    )
+    instance = MonthlyInstance.objects.create(month=date(1900, 1, 1))
+    instance.budget_items.clear()
+    MonthlyLineItem.objects.bulk_create(
+        [MonthlyLineItem.for_item(item, monthly_instance_id=instance.pk) for item in items],
+        batch_size=5000,
+    )
+    return instance
+
+
+@benchmark('calculate_total')
+def bench_calculate_total(sizes=(10_000, 100_000), repeat=5):
+    """
+    Time ``MonthlyInstance.calculate_total`` for a month with ``size`` linked items.
+
+    The previous implementation (materialise every item and sum in Python,
+    then a full ``save()``) is timed alongside for comparison.
+    """
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                instance = _create_linked_month(size)
+
+                def legacy():
+                    instance.total_amount = sum(
+                        (item.cost for item in instance.budget_items.all()),
+                        Decimal('0.00'),
+                    )
+                    instance.save()
+
+                results.append({
+                    'benchmark': 'calculate_total',
+                    'items': size,
+                    'aggregate': _timed(instance.calculate_total, repeat),
+                    'python_sum': _timed(legacy, repeat),
+                })
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+@benchmark('cost_as_of')
+def bench_cost_as_of(sizes=(100_000,), repeat=3, months=120):
+    """
+    Time as-of cost resolution for ``size`` items with cost history.
+
+    Every item gets two cost periods inside the ``months`` window. Times the
+    single-month ``with_cost_as_of`` aggregate and resolving every item's
+    cost for every month from ``schedules`` and ``cost_segments`` into
+    per-month totals.
+    """
+    start = date(2024, 1, 1)
+    first = month_ordinal(start)
+    last = first + months - 1
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                owner_list = _owners(50)
+                items = BudgetItem.objects.bulk_create(
+                    [
+                        BudgetItem(
+                            name=f'Item {i}',
+                            owner=owner_list[i % 50],
+                            cost=Decimal('10.00') + Decimal(i % 100),
+                            repeats=True,
+                            startdate=start,
+                        )
+                        for i in range(size)
+                    ],
+                    batch_size=5000,
+                )
+                BudgetItemCostPeriod.objects.bulk_create(
+                    [
+                        BudgetItemCostPeriod(
+                            budget_item=item,
+                            effective_from=ordinal_to_month(first + (i * 7 + offset) % months),
+                            cost=item.cost + offset,
+                        )
+                        for i, item in enumerate(items)
+                        for offset in (1, months // 2)
+                    ],
+                    batch_size=5000,
+                )
+                middle = ordinal_to_month(first + months // 2)
+
+                def single_month():
+                    BudgetItem.objects.with_cost_as_of(middle).aggregate(total=Sum('cost_as_of'))
+
+                def month_range():
+                    schedules = BudgetItemCostPeriod.objects.schedules()
+                    deltas = [Decimal('0')] * (months + 1)
+                    for item_id, cost in BudgetItem.objects.values_list('id', 'cost').iterator(chunk_size=10000):
+                        for run_first, run_last, run_cost in cost_segments(cost, schedules.get(item_id), first, last):
+                            deltas[run_first - first] += run_cost
+                            deltas[run_last - first + 1] -= run_cost
+
+                results.append({
+                    'benchmark': 'cost_as_of',
+                    'items': size,
+                    'months': months,
+                    'single_month_sql': _timed(single_month, repeat),
+                    'all_months_schedules': _timed(month_range, repeat),
+                })
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+@benchmark('forecast')
+def bench_forecast(sizes=(1_000_000,), repeat=3, months=120, owners=5000):
+    """
+    Time a ``months``-month forecast over ``size`` repeating items.
+
+    Items start on the first of a month spread over ten years and one in
+    ten has an end date; one in a hundred has a cost period.
+    """
+    start = date(2024, 1, 1)
+    first = month_ordinal(start)
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                owner_list = _owners(owners)
+                items = BudgetItem.objects.bulk_create(
+                    [
+                        BudgetItem(
+                            name=f'Item {i}',
+                            owner=owner_list[i % owners],
+                            cost=Decimal('10.00') + Decimal(i % 100),
+                            repeats=True,
+                            startdate=ordinal_to_month(first - 60 + i % 120),
+                            end_date=ordinal_to_month(first + i % 150) if i % 10 == 0 else None,
+                        )
+                        for i in range(size)
+                    ],
+                    batch_size=5000,
+                )
+                BudgetItemCostPeriod.objects.bulk_create(
+                    [
+                        BudgetItemCostPeriod(
+                            budget_item=item,
+                            effective_from=ordinal_to_month(first + i % months),
+                            cost=item.cost + 5,
+                        )
+                        for i, item in enumerate(items[::100])
+                    ],
+                    batch_size=5000,
+                )
+                results.append({
+                    'benchmark': 'forecast',
+                    'items': size,
+                    'months': months,
+                    'owners': owners,
+                    'forecast': _timed(lambda: forecast(start, months=months), repeat),
+                })
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+@benchmark('refresh_totals')
+def bench_refresh_totals(sizes=(1_200,), repeat=3, items=100):
+    """
+    Time recomputing the totals of ``size`` months with ``items`` lines each.
+
+    Compares looping ``calculate_total()`` over the months, the grouped
+    ``recompute_totals()`` and the single-UPDATE ``refresh_totals()``, whole
+    and in 120-month chunks.
+    """
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                owners = _owners(10)
+                BudgetItem.objects.bulk_create(
+                    [
+                        BudgetItem(
+                            name=f'Item {i}',
+                            owner=owners[i % 10],
+                            cost=Decimal('10.00') + Decimal(i % 100),
+                            repeats=True,
+                            startdate=date(1900, 1, 1),
+                        )
+                        for i in range(items)
+                    ],
+                    batch_size=5000,
+                )
+                start = date(1900, 1, 1)
+                end = ordinal_to_month(month_ordinal(start) + size - 1)
+                MonthlyInstance.objects.bulk_generate(start, end)
+                months = MonthlyInstance.objects.filter(month__gte=start, month__lte=end)
+
+                def loop():
+                    for instance in months:
+                        instance.calculate_total()
+
+                results.append({
+                    'benchmark': 'refresh_totals',
+                    'months': size,
+                    'items': items,
+                    'calculate_total_loop': _timed(loop, repeat),
+                    'recompute_totals': _timed(months.recompute_totals, repeat),
+                    'refresh_totals': _timed(months.refresh_totals, repeat),
+                    'refresh_totals_chunked': _timed(lambda: months.refresh_totals(chunk_months=120), repeat),
+                })
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+def _stepped_counts(rows, first, last):
+    """Count occurrences per item and month by stepping through dates, the baseline ``expand`` replaces."""
+    counts = {}
+    window_end = ordinal_to_month(last + 1) - timedelta(days=1)
+    for key, rule, interval, day_of_month, startdate, end_date in rows:
+        end = window_end if end_date is None else min(end_date, window_end)
+        period = recurrence.DAY_PERIODS.get(rule)
+        if period is not None:
+            occurrence = startdate
+            while occurrence <= end:
+                ordinal = month_ordinal(occurrence)
+                if ordinal >= first:
+                    counts[key, ordinal] = counts.get((key, ordinal), 0) + 1
+                occurrence += timedelta(days=period)
+            continue
+        step = recurrence.month_step(rule, interval)
+        day = day_of_month if rule == recurrence.DAY_OF_MONTH else 1
+        occurrence = None
+        ordinal = month_ordinal(startdate)
+        while ordinal <= month_ordinal(end):
+            month = ordinal_to_month(ordinal)
+            occurrence_day = month.replace(day=min(day, monthrange(month.year, month.month)[1]))
+            if startdate <= occurrence_day <= end:
+                if ordinal >= first:
+                    counts[key, ordinal] = 1
+                ordinal += step
+            else:
+                ordinal += 1
+    return counts
+
+
+@benchmark('recurrence')
+def bench_recurrence(sizes=(100_000,), repeat=3, months=120):
+    """
+    Time expanding the occurrences of ``size`` items with mixed recurrences over ``months`` months.
+
+    Items cycle through every rule with starts spread over ten years and one
+    in ten ending. Compares ``recurrence.expand`` with stepping through each
+    item's dates, and times a forecast of the same items.
+    """
+    start = date(2024, 1, 1)
+    first = month_ordinal(start)
+    last = first + months - 1
+    rules = [rule for rule, _ in recurrence.RECURRENCE_CHOICES]
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                owner_list = _owners(50)
+                BudgetItem.objects.bulk_create(
+                    [
+                        BudgetItem(
+                            name=f'Item {i}',
+                            owner=owner_list[i % 50],
+                            cost=Decimal('10.00') + Decimal(i % 100),
+                            repeats=True,
+                            recurrence=rules[i % len(rules)],
+                            interval=2 + i % 5,
+                            day_of_month=1 + i % 31,
+                            startdate=date(2019, 1, 1) + timedelta(days=i % 3650),
+                            end_date=date(2024, 1, 1) + timedelta(days=i % 4000) if i % 10 == 0 else None,
+                        )
+                        for i in range(size)
+                    ],
+                    batch_size=5000,
+                )
+                rows = list(BudgetItem.objects.values_list(
+                    'id', *recurrence.RULE_FIELDS, 'startdate', 'end_date'
+                ))
+                results.append({
+                    'benchmark': 'recurrence',
+                    'items': size,
+                    'months': months,
+                    'occurrences': sum(
+                        count * ((run_last - run_first) // step + 1)
+                        for _, run_first, run_last, step, count in recurrence.expand(rows, first, last)
+                    ),
+                    'expand': _timed(lambda: list(recurrence.expand(rows, first, last)), repeat),
+                    'date_stepping': _timed(lambda: _stepped_counts(rows, first, last), repeat),
+                    'forecast': _timed(lambda: forecast(start, months=months), repeat),
+                })
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+@benchmark('overlapping')
+def bench_overlapping(sizes=(1_000_000,), repeat=5):
+    """
+    Time "which items overlap this window" for ``size`` items over twenty years.
+
+    Half the items repeat (one in three open-ended), half are one-offs.
+    Times counting and listing a quarter and a fiscal year with
+    ``overlapping()`` and with an ``IntervalTree`` snapshot, plus building
+    the snapshot.
+    """
+    base = month_ordinal(date(2010, 1, 1))
+    windows = {
+        'quarter': (date(2012, 4, 1), date(2012, 6, 30)),
+        'fiscal_year': (date(2024, 4, 1), date(2025, 3, 31)),
+    }
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                owner_ids = [owner.pk for owner in _owners(50)]
+
+                def rows():
+                    for i in range(size):
+                        start = ordinal_to_month(base + i % 240)
+                        repeats = i % 2 == 0
+                        end = ordinal_to_month(base + i % 240 + i % 37) if repeats and i % 3 else None
+                        yield f'Item {i}', owner_ids[i % 50], Decimal('10.00'), repeats, start, end
+
+                BudgetItem.objects.insert_rows(rows())
+                tree = {}
+
+                def build():
+                    tree['tree'] = IntervalTree.from_items()
+
+                result = {'benchmark': 'overlapping', 'items': size, 'tree_build': _timed(build, 1)}
+                for name, (start, end) in windows.items():
+                    items = BudgetItem.objects.overlapping(start, end)
+                    first, last = month_ordinal(start), month_ordinal(end)
+                    result[name] = {
+                        'matches': items.count(),
+                        'sql_count': _timed(items.count, repeat),
+                        'sql_ids': _timed(lambda: list(items.values_list('id', flat=True)), repeat),
+                        'tree_count': _timed(lambda: tree['tree'].count(first, last), repeat),
+                        'tree_ids': _timed(lambda: tree['tree'].overlapping(first, last), repeat),
+                    }
+                results.append(result)
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+def dataset_summary():
+    """Return row counts and the month range of the data being benchmarked."""
+    months = MonthlyInstance.objects.aggregate(first=Min('month'), last=Max('month'))
+    return {
+        'owners': Owner.objects.count(),
+        'items': BudgetItem.objects.count(),
+        'repeating_items': BudgetItem.objects.filter(repeats=True).count(),
+        'cost_periods': BudgetItemCostPeriod.objects.count(),
+        'months': MonthlyInstance.objects.count(),
+        'line_items': MonthlyLineItem.objects.count(),
+        'first_month': months['first'],
+        'last_month': months['last'],
+    }
+
+
+def _rolled_back(func):
+    """Return a callable running ``func`` in a transaction that is rolled back."""
+    def run():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+    return run
+
+
+def _middle_month():
+    """Return the MonthlyInstance in the middle of the existing range."""
+    months = MonthlyInstance.objects.order_by('month')
+    return months[months.count() // 2]
+
+
+@contextmanager
+def _admin_client():
+    """Yield a test client logged in as a temporary superuser, rolled back on exit."""
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+        user = User.objects.create_superuser('benchmark', 'benchmark@example.com', None)
+        client = Client()
+        client.force_login(user)
+        yield client
+        transaction.set_rollback(True)
+
+
+def _fetch(client, url, params=None):
+    """GET ``url`` and read the whole body, returning ``(status, bytes)``."""
+    response = client.get(url, params)
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def _time_requests(client, pages, repeat, benchmark_name):
+    results = []
+    for label, url, params in pages:
+        status, size = _fetch(client, url, params)
+        results.append({
+            'benchmark': benchmark_name,
+            'page': label,
+            'url': url,
+            'status': status,
+            'bytes': size,
+            **_timed(lambda: _fetch(client, url, params), repeat),
+        })
+    return results
+
+
+@macro_benchmark('month_writes')
+def bench_month_writes(repeat=5):
+    """
+    Time creating and auto-populating a month, re-applying a month's items and ``calculate_total``.
+
+    The new month is the one after the last existing month; the other two
+    use the month in the middle of the range.
+    """
+    instance = _middle_month()
+    last = MonthlyInstance.objects.aggregate(last=Max('month'))['last']
+    new_month = ordinal_to_month(month_ordinal(last) + 1)
+    current = list(instance.line_items.values_list('budget_item_id', flat=True))
+    return [{
+        'benchmark': 'month_writes',
+        'month': instance.month,
+        'line_items': len(current),
+        'auto_populate_new_month': _timed(
+            _rolled_back(lambda: MonthlyInstance.objects.create(month=new_month)), repeat
+        ),
+        'apply_unchanged_selection': _timed(_rolled_back(lambda: instance.apply_selection(current)), repeat),
+        'calculate_total': _timed(_rolled_back(instance.calculate_total), repeat),
+    }]
+
+
+@macro_benchmark('admin_pages')
+def bench_admin_pages(repeat=5):
+    """
+    Time the admin changelists, change pages and item picker lookup through the test client.
+    """
+    instance = _middle_month()
+    item = BudgetItem.objects.order_by('pk').first()
+    with _admin_client() as client:
+        return _time_requests(client, [
+            ('item changelist', '/admin/budgets/budgetitem/', None),
+            ('item changelist by owner', '/admin/budgets/budgetitem/', {'owner__id__exact': item.owner_id}),
+            ('item changelist search', '/admin/budgets/budgetitem/', {'q': 'Rent'}),
+            ('item change', f'/admin/budgets/budgetitem/{item.pk}/change/', None),
+            ('month changelist', '/admin/budgets/monthlyinstance/', None),
+            ('month change', f'/admin/budgets/monthlyinstance/{instance.pk}/change/', None),
+            ('item picker lookup', '/admin/budgets/monthlyinstance/item-lookup/', {'repeats': 'true', 'term': 'gym'}),
+        ], repeat, 'admin_pages')
+
+
+@macro_benchmark('reports')
+def bench_reports(repeat=5):
+    """
+    Time the JSON API, month summaries (cold and cached), exports and a 12-month forecast.
+    """
+    instance = _middle_month()
+    month = f'{instance.month:%Y-%m}'
+    with _admin_client() as client:
+        results = _time_requests(client, [
+            ('items page', '/api/items/', {'limit': 500}),
+            ('items page by owner', '/api/items/', {'owner': 'Owner 0', 'limit': 500}),
+            ('months page', '/api/months/', None),
+            ('month summary (cached)', f'/api/months/{month}/', None),
+            ('line items export (one month)', '/api/export/line-items/', {'from': month, 'to': month}),
+            ('items export', '/api/export/items/', None),
+        ], repeat, 'reports')
+
+        def cold_summary():
+            cache.invalidate_months([instance.month])
+            _fetch(client, f'/api/months/{month}/')
+
+        results.append({
+            'benchmark': 'reports',
+            'page': 'month summary (cold)',
+            'url': f'/api/months/{month}/',
+            **_timed(cold_summary, repeat),
+        })
+    results.append({
+        'benchmark': 'reports',
+        'page': 'forecast (12 months)',
+        **_timed(lambda: forecast(instance.month, months=12), repeat),
+    })
+    return results
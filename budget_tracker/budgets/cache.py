@@ -0,0 +1,124 @@
+"""
+Cached per-month totals, owner subtotals and item id sets.
+
+Values live in Django's cache framework (``CACHES['default']`` unless
+``BUDGETS_CACHE_ALIAS`` names another alias) under keys that embed a
+per-month version token::
+
+    budgets:<YYYY-MM>:version          -> token
+    budgets:<YYYY-MM>:<token>:<kind>   -> value
+
+Invalidating a month replaces its token, so every cached value for the
+month becomes unreachable at once without deleting keys one by one. Tokens
+are random rather than counters, so a version key evicted before its data
+can never make old entries reachable again.
+
+Writes invalidate the months they touch from ``budgets.signals``: once
+immediately and once more when the transaction commits. The second bump
+discards anything a concurrent reader cached from the pre-commit state, so
+no read that starts after a write commits can return stale data.
+"""
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import metrics
+from .models import MonthlyInstance, MonthlyLineItem, OwnerMonthSummary
+from .months import month_start
+
+
+_MISSING = object()
+
+# Hit and miss counts per kind for this process, e.g. ``total.hit``.
+stats = Counter()
+
+
+def _cache():
+    return caches[getattr(settings, 'BUDGETS_CACHE_ALIAS', 'default')]
+
+
+def _month_key(month):
+    return f'budgets:{month_start(month):%Y-%m}'
+
+
+def _version(month):
+    """Return the current version token for ``month``, creating one if needed."""
+    cache = _cache()
+    key = f'{_month_key(month)}:version'
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        token = cache.get(key)
+    return token
+
+
+def _bump(months):
+    _cache().set_many(
+        {f'{_month_key(month)}:version': uuid.uuid4().hex for month in months},
+        timeout=None
+    )
+
+
+def invalidate_months(months, using=None):
+    """
+    Invalidate everything cached for ``months`` now and again on commit.
+    """
+    months = {month_start(month) for month in months}
+    if not months:
+        return
+    _bump(months)
+    transaction.on_commit(lambda: _bump(months), using=using)
+
+
+def _cached(month, kind, compute):
+    cache = _cache()
+    key = f'{_month_key(month)}:{_version(month)}:{kind}'
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        stats[f'{kind}.hit'] += 1
+        metrics.cache_requests.inc(kind=kind, result='hit')
+        return value
+    stats[f'{kind}.miss'] += 1
+    metrics.cache_requests.inc(kind=kind, result='miss')
+    value = compute(month_start(month))
+    cache.set(key, value)
+    return value
+
+
+def _compute_total(month):
+    return MonthlyInstance.objects.filter(month=month).values_list('total_amount', flat=True).first()
+
+
+def _compute_owners(month):
+    return dict(
+        OwnerMonthSummary.objects.filter(monthly_instance__month=month).values_list('owner', 'total')
+    )
+
+
+def _compute_item_ids(month):
+    return frozenset(
+        MonthlyLineItem.objects.filter(monthly_instance__month=month).values_list('budget_item_id', flat=True)
+    )
+
+
+def month_total(month):
+    """Return the stored total of ``month``, or None if it has no MonthlyInstance."""
+    return _cached(month, 'total', _compute_total)
+
+
+def owner_subtotals(month):
+    """Return ``{owner: total}`` for the line items of ``month``."""
+    return _cached(month, 'owners', _compute_owners)
+
+
+def item_ids(month):
+    """Return the frozenset of budget item ids linked to ``month``."""
+    return _cached(month, 'item_ids', _compute_item_ids)
+
+
+def reset_stats():
+    """Reset the hit and miss counters."""
+    stats.clear()
@@ -0,0 +1,91 @@
+"""
+Streaming exports of budget items and monthly line items.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)``, so model
+instances are never built and the queryset result cache is never filled.
+Each row is formatted and yielded before the next is read, which keeps peak
+memory at roughly ``chunk_size`` rows plus one formatted line however many
+rows are exported (about 2 MB at the default chunk size of 2000).
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import BudgetItem, MonthlyLineItem
+
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Export name -> (model, column names, ORM lookups for values_list).
+EXPORTS = {
+    'items': (
+        BudgetItem,
+        [
+            'id', 'name', 'owner', 'cost', 'repeats', 'recurrence', 'interval', 'day_of_month',
+            'startdate', 'end_date', 'created_at', 'updated_at',
+        ],
+        [
+            'id', 'name', 'owner__name', 'cost', 'repeats', 'recurrence', 'interval', 'day_of_month',
+            'startdate', 'end_date', 'created_at', 'updated_at',
+        ],
+    ),
+    'line-items': (
+        MonthlyLineItem,
+        ['month', 'budget_item_id', 'name', 'owner', 'cost', 'repeats'],
+        ['monthly_instance__month', 'budget_item_id', 'budget_item__name', 'owner', 'cost_snapshot', 'repeats'],
+    ),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_queryset(name, start=None, end=None):
+    """
+    Return ``(columns, queryset)`` for export ``name``.
+
+    ``start`` and ``end`` restrict line items to months in that range,
+    inclusive. The queryset yields value tuples in a stable order.
+    """
+    model, columns, lookups = EXPORTS[name]
+    queryset = model.objects.all()
+    if model is MonthlyLineItem:
+        if start is not None:
+            queryset = queryset.filter(monthly_instance__month__gte=start)
+        if end is not None:
+            queryset = queryset.filter(monthly_instance__month__lte=end)
+        queryset = queryset.order_by('monthly_instance__month', 'budget_item_id')
+    else:
+        queryset = queryset.order_by('id')
+    return columns, queryset.values_list(*lookups)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``queryset`` as CSV lines, header first."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_jsonl(columns, queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``queryset`` as one JSON object per line, decimals as strings."""
+    encoder = DjangoJSONEncoder()
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def stream_export(name, fmt, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return a generator of text lines for export ``name`` in format ``fmt``."""
+    columns, queryset = export_queryset(name, start, end)
+    stream = stream_csv if fmt == 'csv' else stream_jsonl
+    return stream(columns, queryset, chunk_size)
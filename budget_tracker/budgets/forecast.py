@@ -0,0 +1,163 @@
+"""
+Multi-month spend forecasting over repeating budget items.
+
+A forecast answers "what will each owner spend in each of the next N
+months" without creating any MonthlyInstance rows. It applies the same rule
+as ``MonthlyInstance.auto_populate_repeating_items``: a repeating item counts
+its cost once per occurrence of its recurrence in the month (see
+``budgets.recurrence``). Costs follow BudgetItemCostPeriod history.
+
+Amounts are accumulated as integer cents in month x owner difference
+arrays, one per step between a run's months: every run of constant cost
+adds at its first month and subtracts one step after its last, and a
+prefix sum over months with that stride gives the spend matrix. Monthly
+items without cost history are reduced by the database to start and end
+events grouped by ``(owner, date)`` on the indexed owner key, so the
+Python work grows with the number of distinct groups rather than the
+number of items. Other items are expanded with ``recurrence.expand``.
+"""
+from decimal import Decimal
+from itertools import chain
+
+from django.db import models
+from django.db.models import Sum
+from django.db.models.functions import Greatest
+
+from .models import BudgetItem, BudgetItemCostPeriod, Owner, cost_segments
+from .months import (
+    first_active_ordinal, last_active_ordinal, month_ordinal, ordinal_to_month
+)
+from .recurrence import MONTHLY, RULE_FIELDS, align, expand
+
+
+def _cents(amount):
+    return int(amount * 100)
+
+
+def _decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class Forecast:
+    """
+    A month x owner spend matrix in integer cents.
+
+    ``cents[i][j]`` is the spend of ``owners[j]`` in ``months[i]``.
+    """
+
+    def __init__(self, months, owners, cents):
+        self.months = months
+        self.owners = owners
+        self.cents = cents
+
+    def amount(self, month, owner):
+        """Return the spend of ``owner`` in ``month`` as a Decimal."""
+        return _decimal(self.cents[self.months.index(month)][self.owners.index(owner)])
+
+    def month_totals(self):
+        """Return the total spend of every month as Decimals, in month order."""
+        return [_decimal(sum(row)) for row in self.cents]
+
+    def owner_totals(self):
+        """Return ``{owner: total}`` over the whole forecast as Decimals."""
+        return {
+            owner: _decimal(sum(row[j] for row in self.cents))
+            for j, owner in enumerate(self.owners)
+        }
+
+    def as_dict(self):
+        """Return a JSON-serialisable dict with amounts as decimal strings."""
+        return {
+            'months': [month.strftime('%Y-%m') for month in self.months],
+            'owners': self.owners,
+            'spend': [[str(_decimal(value)) for value in row] for row in self.cents],
+        }
+
+
+def forecast(start, months=36, owners=None):
+    """
+    Forecast spend per owner for ``months`` months starting at ``start``.
+
+    ``owners`` optionally restricts the forecast to the given owner names.
+    Only reads from the database.
+    """
+    first = month_ordinal(start)
+    last = first + months - 1
+    window_start = ordinal_to_month(first)
+    window_end = ordinal_to_month(last)
+
+    items = BudgetItem.objects.filter(repeats=True).overlapping(window_start, window_end).order_by()
+    if owners is not None:
+        items = items.filter(owner__name__in=owners)
+
+    # (owner id, month ordinal, step, signed cents) changes in the spend of
+    # every step-th month.
+    events = []
+
+    # Monthly items without cost history: starts before the window are
+    # clamped to its first month so they collapse into one group per owner.
+    # Items ending before they become active are left out, as their end
+    # event would come before their start.
+    has_history = models.Exists(
+        BudgetItemCostPeriod.objects.filter(budget_item=models.OuterRef('pk'))
+    )
+    plain = items.filter(~has_history, recurrence=MONTHLY, first_month__lte=models.F('last_month'))
+    starts = plain.annotate(
+        start=Greatest('startdate', models.Value(window_start), output_field=models.DateField())
+    ).values('owner', 'start').annotate(total=Sum('cost')).values_list('owner', 'start', 'total')
+    for owner, startdate, total in starts.iterator(chunk_size=10000):
+        events.append((owner, first_active_ordinal(startdate), 1, _cents(total)))
+    ends = plain.filter(end_date__lte=window_end).values('owner', 'end_date').annotate(
+        total=Sum('cost')
+    ).values_list('owner', 'end_date', 'total')
+    for owner, end_date, total in ends.iterator(chunk_size=10000):
+        events.append((owner, last_active_ordinal(end_date) + 1, 1, -_cents(total)))
+
+    # Items with cost history and the other recurrences are expanded into
+    # runs of occurrences, split into runs of constant cost. Queried apart,
+    # as an OR of the two conditions would scan every item; the items with
+    # history are looked up from the cost period index by primary key.
+    with_history = items.filter(pk__in=BudgetItemCostPeriod.objects.values('budget_item'))
+    schedules = BudgetItemCostPeriod.objects.filter(
+        budget_item__in=with_history,
+        effective_from__lte=window_end
+    ).schedules()
+    rows = chain.from_iterable(
+        queryset.values_list('id', 'owner', 'cost', *RULE_FIELDS, 'startdate', 'end_date').iterator(chunk_size=10000)
+        for queryset in (with_history, items.filter(~has_history).exclude(recurrence=MONTHLY))
+    )
+    runs = expand(((row[:3], *row[3:]) for row in rows), first, last)
+    for (item_id, owner, cost), item_first, item_last, step, count in runs:
+        for run_first, run_last, run_cost in cost_segments(cost, schedules.get(item_id), item_first, item_last):
+            run = align(item_first, step, run_first, run_last)
+            if run is not None:
+                events.append((owner, run[0], step, _cents(run_cost) * count))
+                events.append((owner, run[1] + step, step, -_cents(run_cost) * count))
+
+    name_of = dict(Owner.objects.filter(pk__in={owner for owner, _, _, _ in events}).values_list('id', 'name'))
+    owner_names = sorted(set(name_of.values()) | set(owners or ()))
+    column = {owner: j for j, owner in enumerate(owner_names)}
+    deltas = {}
+    for owner, ordinal, step, cents in events:
+        if step not in deltas:
+            deltas[step] = [[0] * len(owner_names) for _ in range(months + step)]
+        deltas[step][ordinal - first][column[name_of[owner]]] += cents
+
+    cents = [[0] * len(owner_names) for _ in range(months)]
+    for step, rows in deltas.items():
+        for i in range(months):
+            if i >= step:
+                rows[i] = [total + delta for total, delta in zip(rows[i - step], rows[i])]
+            cents[i] = [total + delta for total, delta in zip(cents[i], rows[i])]
+
+    # Drop owners whose items never fall on a month in the window, unless
+    # they were asked for explicitly.
+    keep = [
+        j for j, owner in enumerate(owner_names)
+        if owner in (owners or ()) or any(row[j] for row in cents)
+    ]
+    return Forecast(
+        [ordinal_to_month(ordinal) for ordinal in range(first, last + 1)],
+        [owner_names[j] for j in keep],
+        [[row[j] for j in keep] for row in cents],
+    )
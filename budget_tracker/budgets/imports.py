@@ -0,0 +1,191 @@
+"""
+Bulk import of budget items from CSV.
+
+The file is read one row at a time and rows are collected into batches.
+Each batch is validated in a single pass with plain parsing rather than
+``full_clean()`` and inserted with ``BudgetItem.objects.insert_rows`` in
+its own transaction, so a bad row is reported and skipped without aborting
+the rest of the run and memory stays bounded by the batch size.
+"""
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import metrics
+from .models import BudgetItem, MonthlyInstance, Owner
+from .recurrence import DAY_OF_MONTH, MONTHLY, RECURRENCE_CHOICES, RULE_FIELDS
+
+
+REQUIRED_COLUMNS = ('name', 'owner', 'cost', 'startdate')
+OPTIONAL_COLUMNS = ('repeats', 'end_date') + RULE_FIELDS
+DEFAULT_BATCH_SIZE = 5000
+
+MIN_COST = Decimal('0.01')
+# DecimalField(max_digits=10, decimal_places=2).
+MAX_COST = Decimal('99999999.99')
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n'}
+RECURRENCES = {value for value, _ in RECURRENCE_CHOICES}
+# PositiveSmallIntegerField.
+MAX_INTERVAL = 32767
+
+
+class ImportResult:
+    """
+    Outcome of an import: counts and per-row errors as ``(line, message)``.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.linked = 0
+        self.errors = []
+
+    def __repr__(self):
+        return f'<ImportResult created={self.created} linked={self.linked} errors={len(self.errors)}>'
+
+
+def _text(row, name, max_length):
+    value = (row.get(name) or '').strip()
+    if not value:
+        raise ValueError(f"{name} is required")
+    if len(value) > max_length:
+        raise ValueError(f"{name} is longer than {max_length} characters")
+    return value
+
+
+def _date(row, name, required=True):
+    value = (row.get(name) or '').strip()
+    if not value and not required:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD), got {value!r}")
+
+
+def _cost(row):
+    value = (row.get('cost') or '').strip()
+    try:
+        cost = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"cost must be a number, got {value!r}")
+    if not cost.is_finite() or cost.as_tuple().exponent < -2:
+        raise ValueError(f"cost must have at most 2 decimal places, got {value!r}")
+    if cost < MIN_COST or cost > MAX_COST:
+        raise ValueError(f"cost must be between {MIN_COST} and {MAX_COST}, got {value!r}")
+    return cost
+
+
+def _repeats(row):
+    value = (row.get('repeats') or '').strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"repeats must be true or false, got {value!r}")
+
+
+def _number(row, name, low, high, default):
+    value = (row.get(name) or '').strip()
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+    if number < low or number > high:
+        raise ValueError(f"{name} must be between {low} and {high}, got {value!r}")
+    return number
+
+
+def _rule(row):
+    """Return the ``RULE_FIELDS`` values of ``row``, checked as ``BudgetItem.clean()`` does."""
+    recurrence = (row.get('recurrence') or '').strip().lower() or MONTHLY
+    if recurrence not in RECURRENCES:
+        raise ValueError(f"recurrence must be one of {', '.join(sorted(RECURRENCES))}, got {recurrence!r}")
+    interval = _number(row, 'interval', 1, MAX_INTERVAL, 1)
+    day_of_month = _number(row, 'day_of_month', 1, 31, None)
+    if recurrence == DAY_OF_MONTH and day_of_month is None:
+        raise ValueError(f"day_of_month is required when recurrence is {DAY_OF_MONTH}")
+    return recurrence, interval, day_of_month
+
+
+def _validate_batch(batch, result):
+    """
+    Return item tuples for the valid rows of ``batch``, recording errors for the rest.
+
+    Tuples hold the ``ITEM_COLUMNS`` and then the ``RULE_FIELDS`` values; the
+    owner column holds the owner's name, see ``_resolve_owners``.
+    """
+    rows = []
+    for line, row in batch:
+        try:
+            rows.append((
+                _text(row, 'name', 200),
+                _text(row, 'owner', 100),
+                _cost(row),
+                _repeats(row),
+                _date(row, 'startdate'),
+                _date(row, 'end_date', required=False),
+                *_rule(row),
+            ))
+        except ValueError as exc:
+            result.errors.append((line, str(exc)))
+    return rows
+
+
+def _resolve_owners(rows):
+    """
+    Replace owner names in ``rows`` with Owner ids, creating new owners in bulk.
+    """
+    ids = Owner.objects.ids_for(row[1] for row in rows)
+    return [(name, ids[owner], *rest) for name, owner, *rest in rows]
+
+
+@metrics.import_seconds.time()
+def import_items(lines, batch_size=DEFAULT_BATCH_SIZE, link_months=False):
+    """
+    Create BudgetItems from CSV ``lines`` (a text file or iterable of lines).
+
+    The header must contain ``name``, ``owner``, ``cost`` and ``startdate``;
+    ``repeats``, ``end_date`` and the rule columns ``recurrence`` (default
+    monthly), ``interval`` and ``day_of_month`` are optional, so an items
+    export can be imported again. Owners are matched by name
+    and created when missing. With ``link_months`` the new
+    repeating items are also linked into the existing MonthlyInstances they
+    are active in and those months' totals are adjusted. Raises ValueError
+    if required columns are missing; row problems are collected in the
+    returned ImportResult instead.
+    """
+    reader = csv.DictReader(lines)
+    missing = [name for name in REQUIRED_COLUMNS if name not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    result = ImportResult()
+    batch = []
+
+    def flush():
+        rows = _validate_batch(batch, result)
+        batch.clear()
+        if not rows:
+            return
+        with transaction.atomic():
+            items = BudgetItem.objects.insert_rows(_resolve_owners(rows), batch_size=len(rows))
+            if link_months:
+                result.linked += MonthlyInstance.objects.link_new_items(
+                    items.filter(repeats=True).select_related('owner')
+                )
+        result.created += len(rows)
+
+    for row in reader:
+        # Header is line 1; the reader tracks lines for quoted newlines.
+        batch.append((reader.line_num, row))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    metrics.import_rows.inc(result.created, result='created')
+    metrics.import_rows.inc(len(result.errors), result='skipped')
+    return result
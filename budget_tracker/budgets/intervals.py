@@ -0,0 +1,151 @@
+"""
+In-process interval tree over budget item month ranges.
+
+``BudgetItem.objects.overlapping()`` answers one window with an index range
+scan. Code that asks about many windows of the same items (reports per
+quarter or fiscal year, forecasts) can build an ``IntervalTree`` once and
+query it in memory instead: ``overlapping(first, last)`` returns the ids of
+the items covering any month ordinal from ``first`` to ``last`` in
+O(log n + k) and ``count(first, last)`` their number in O(log n).
+
+The tree is a centred interval tree laid over the month ordinals as an
+implicit binary tree: an interval is stored at the node whose centre it
+spans, which is found from the highest bit in which the offsets of its
+ends differ. Building is therefore one grouping pass and a sort per node
+rather than a recursive partition.
+
+``item_intervals()`` keeps a snapshot of every item per process. It is
+rebuilt after an item is saved or deleted in this process (see
+``budgets.signals``) and otherwise once it is ``max_age`` seconds old,
+which bounds how stale it can be after bulk inserts or writes in other
+processes.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from .models import BudgetItem
+from .months import month_ordinal
+
+
+class IntervalTree:
+    """
+    Static interval tree over ``(id, first, last)`` month ordinal ranges, bounds inclusive.
+    """
+
+    def __init__(self, intervals):
+        nodes = {}
+        base = None
+        rows = [(first, last, id_) for id_, first, last in intervals if first <= last]
+        if rows:
+            base = min(first for first, _, _ in rows)
+        self.base = base or 0
+        for first, last, id_ in rows:
+            a, b = first - self.base, last - self.base
+            level = (a ^ b).bit_length()
+            nodes.setdefault((level, a >> level), []).append((a, b, id_))
+
+        # Per node: starts ascending with their ids, and ends ascending
+        # with theirs, so each side of a query is one bisect and a slice.
+        self.nodes = {}
+        for key, members in nodes.items():
+            by_first = sorted(members)
+            by_last = sorted(members, key=lambda member: member[1])
+            self.nodes[key] = (
+                [a for a, _, _ in by_first], [id_ for _, _, id_ in by_first],
+                [b for _, b, _ in by_last], [id_ for _, _, id_ in by_last],
+            )
+        # The root spans offsets 0 to 2 ** height - 1.
+        self.height = max((last - self.base).bit_length() for _, last, _ in rows) if rows else 0
+        # Nodes with a stored interval in their subtree; the walk skips the rest.
+        self.populated = set()
+        for level, prefix in self.nodes:
+            while level <= self.height and (level, prefix) not in self.populated:
+                self.populated.add((level, prefix))
+                level, prefix = level + 1, prefix >> 1
+        self.firsts = sorted(first for first, _, _ in rows)
+        self.lasts = sorted(last for _, last, _ in rows)
+
+    @classmethod
+    def from_items(cls, queryset=None):
+        """Build a tree of the ``first_month``/``last_month`` ranges of ``queryset`` (default: all items)."""
+        queryset = BudgetItem.objects.all() if queryset is None else queryset
+        return cls(queryset.order_by().values_list('id', 'first_month', 'last_month').iterator(chunk_size=10000))
+
+    def __len__(self):
+        return len(self.firsts)
+
+    def count(self, first, last):
+        """Return how many intervals overlap ordinals ``first`` to ``last``."""
+        if first > last:
+            return 0
+        # Those starting by ``last``, less those among them ending before
+        # ``first`` (every interval ending before ``first`` starts by then).
+        return bisect_right(self.firsts, last) - bisect_left(self.lasts, first)
+
+    def overlapping(self, first, last):
+        """Return the ids of the intervals overlapping ordinals ``first`` to ``last``, in no particular order."""
+        s = max(first - self.base, 0)
+        e = min(last - self.base, (1 << self.height) - 1)
+        found = []
+        if s > e or not self.nodes:
+            return found
+        stack = [(self.height, 0)]
+        while stack:
+            level, prefix = stack.pop()
+            if (level, prefix) not in self.populated:
+                continue
+            low = prefix << level
+            if low > e or low + (1 << level) - 1 < s:
+                continue
+            node = self.nodes.get((level, prefix))
+            if level == 0:
+                if node:
+                    found.extend(node[1])
+                continue
+            centre = low + (1 << (level - 1))
+            # Intervals stored here start before the centre and end at or after it.
+            if e < centre:
+                if node:
+                    found.extend(node[1][:bisect_right(node[0], e)])
+                stack.append((level - 1, prefix << 1))
+            elif s >= centre:
+                if node:
+                    found.extend(node[3][bisect_left(node[2], s):])
+                stack.append((level - 1, (prefix << 1) | 1))
+            else:
+                if node:
+                    found.extend(node[1])
+                stack.append((level - 1, prefix << 1))
+                stack.append((level - 1, (prefix << 1) | 1))
+        return found
+
+    def overlapping_dates(self, start, end):
+        """Return the ids covering a month from ``start`` to ``end``, like ``BudgetItemQuerySet.overlapping``."""
+        return self.overlapping(month_ordinal(start), month_ordinal(end))
+
+
+_lock = threading.Lock()
+_snapshot = None
+_built_at = 0.0
+
+
+def item_intervals(max_age=300):
+    """
+    Return this process's ``IntervalTree`` of all items.
+
+    Rebuilt when invalidated or older than ``max_age`` seconds.
+    """
+    global _snapshot, _built_at
+    with _lock:
+        if _snapshot is None or time.monotonic() - _built_at > max_age:
+            _snapshot = IntervalTree.from_items()
+            _built_at = time.monotonic()
+        return _snapshot
+
+
+def invalidate():
+    """Drop the snapshot so the next ``item_intervals()`` call rebuilds it."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
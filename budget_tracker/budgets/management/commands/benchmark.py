@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import CommandError
+
+from budgets.benchmarks import BENCHMARKS
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Run the budgets benchmarks and print the timings as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f"Benchmarks to run (default: all). Available: {', '.join(sorted(BENCHMARKS))}",
+        )
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            help="Dataset sizes to benchmark (e.g. --sizes 10000 100000)",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help="Number of timed runs per size (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        kwargs = {'repeat': options['repeat']}
+        if options['sizes']:
+            kwargs['sizes'] = options['sizes']
+
+        results = []
+        for name in names:
+            results.extend(BENCHMARKS[name](**kwargs))
+        self.stdout.write(json.dumps(results, indent=2))
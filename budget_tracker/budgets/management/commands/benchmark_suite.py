@@ -0,0 +1,76 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from budgets.benchmarks import MACRO_BENCHMARKS, dataset_summary
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Run the macro benchmarks against the data in the database (see seed_benchmark) "
+        "and print the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f"Benchmarks to run (default: all). Available: {', '.join(sorted(MACRO_BENCHMARKS))}",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help="Number of timed runs per measurement (default: 5)",
+        )
+        parser.add_argument(
+            '--label',
+            default='',
+            help="Free-form label stored with the results, e.g. a branch or commit",
+        )
+        parser.add_argument(
+            '--output',
+            help="Also write the JSON results to this file",
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(MACRO_BENCHMARKS)
+        unknown = [name for name in names if name not in MACRO_BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+        dataset = dataset_summary()
+        if not dataset['items'] or not dataset['months']:
+            raise CommandError("No budget items or months to benchmark; run seed_benchmark first.")
+
+        database = connection.vendor
+        if database == 'sqlite':
+            database += f' {connection.Database.sqlite_version}'
+
+        started = time.perf_counter()
+        report = {
+            'label': options['label'],
+            'started_at': timezone.now(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': database,
+            },
+            'dataset': dataset,
+            'results': [],
+        }
+        for name in names:
+            report['results'].extend(MACRO_BENCHMARKS[name](repeat=options['repeat']))
+        report['elapsed_s'] = round(time.perf_counter() - started, 3)
+
+        output = json.dumps(report, indent=2, cls=DjangoJSONEncoder)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,61 @@
+from django.core.management.base import CommandError
+
+from budgets.exports import DEFAULT_CHUNK_SIZE, EXPORTS, FORMATS, stream_export
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Stream budget items or monthly line items as CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'name',
+            choices=sorted(EXPORTS),
+            help="What to export",
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default='csv',
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month of line items to export (YYYY-MM)",
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help="Last month of line items to export, inclusive (YYYY-MM)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Rows fetched from the database at a time (default: {DEFAULT_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            '--output',
+            help="Write to this file instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start']) if options['start'] else None
+            end = parse_month(options['end']) if options['end'] else None
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        lines = stream_export(
+            options['name'], options['format'], start, end, chunk_size=options['chunk_size']
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
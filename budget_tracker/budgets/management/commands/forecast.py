@@ -0,0 +1,58 @@
+import csv
+import json
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from budgets.forecast import forecast
+from budgets.months import month_start, parse_month
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Forecast spend per owner per month from repeating budget items (read-only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month to forecast (YYYY-MM, default: current month)",
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=36,
+            help="Number of months to forecast (default: 36)",
+        )
+        parser.add_argument(
+            '--owner',
+            action='append',
+            dest='owners',
+            help="Restrict the forecast to this owner (repeatable)",
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            default='csv',
+            help="Output format (default: csv)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start']) if options['start'] else month_start(timezone.localdate())
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['months'] < 1:
+            raise CommandError("--months must be at least 1")
+
+        result = forecast(start, months=options['months'], owners=options['owners'])
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(result.as_dict(), indent=2))
+            return
+
+        data = result.as_dict()
+        writer = csv.writer(self.stdout)
+        writer.writerow(['month'] + data['owners'] + ['total'])
+        for month, row, total in zip(data['months'], data['spend'], result.month_totals()):
+            writer.writerow([month] + row + [str(total)])
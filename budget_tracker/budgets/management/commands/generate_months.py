@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import CommandError
+
+from budgets.models import MonthlyInstance
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Create MonthlyInstances for every missing month in a range in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            required=True,
+            help="First month to generate (YYYY-MM)",
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            required=True,
+            help="Last month to generate, inclusive (YYYY-MM)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help="Rows per INSERT batch (default: 10000)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start'])
+            end = parse_month(options['end'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if start > end:
+            raise CommandError("--from must not be after --to")
+
+        started = time.perf_counter()
+        instances = MonthlyInstance.objects.bulk_generate(
+            start, end, batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(instances)} monthly instance(s) in {elapsed:.2f}s"
+        ))
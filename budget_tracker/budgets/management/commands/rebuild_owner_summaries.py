@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import CommandError
+
+from budgets.models import MonthlyInstance, OwnerMonthSummary
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Recompute the owner x month summary table from the line items."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month to rebuild (YYYY-MM, default: all months)",
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help="Last month to rebuild, inclusive (YYYY-MM, default: all months)",
+        )
+
+    def handle(self, *args, **options):
+        months = None
+        try:
+            if options['start'] or options['end']:
+                months = MonthlyInstance.objects.all()
+                if options['start']:
+                    months = months.filter(month__gte=parse_month(options['start']))
+                if options['end']:
+                    months = months.filter(month__lte=parse_month(options['end']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        rows = OwnerMonthSummary.objects.rebuild(months)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} owner summary row(s) in {elapsed:.2f}s"
+        ))
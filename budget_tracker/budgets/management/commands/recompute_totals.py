@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import CommandError
+from django.db import connections
+
+from budgets.models import MonthlyInstance
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+
+
+def _recompute_chunk(ids):
+    """Recompute the totals of the months with ``ids``; runs in a worker process."""
+    return len(ids), MonthlyInstance.objects.filter(pk__in=ids).recompute_totals()
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Recompute the stored total of every monthly instance from its line items, "
+        "in chunks of months spread over a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month to recompute (YYYY-MM, default: all months)",
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help="Last month to recompute, inclusive (YYYY-MM, default: all months)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Worker processes (default: 1, recompute in this process)",
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=100,
+            help="Months per chunk; each chunk is one aggregate query and one transaction (default: 100)",
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                "File recording the months already done. An interrupted run started "
+                "again with the same file skips them; the file is removed on success."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk'] < 1:
+            raise CommandError("--workers and --chunk must be positive")
+        months = MonthlyInstance.objects.order_by('month')
+        try:
+            if options['start']:
+                months = months.filter(month__gte=parse_month(options['start']))
+            if options['end']:
+                months = months.filter(month__lte=parse_month(options['end']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        checkpoint = options['checkpoint']
+        done = set()
+        if checkpoint and os.path.exists(checkpoint):
+            try:
+                with open(checkpoint) as handle:
+                    done = set(json.load(handle)['done'])
+            except (ValueError, KeyError, TypeError) as exc:
+                raise CommandError(f"Unreadable checkpoint {checkpoint}: {exc}")
+        ids = [pk for pk in months.values_list('pk', flat=True) if pk not in done]
+        chunks = [ids[i:i + options['chunk']] for i in range(0, len(ids), options['chunk'])]
+        if done:
+            self.stdout.write(f"Resuming: {len(done)} month(s) already done, {len(ids)} left")
+
+        def record(chunk):
+            if checkpoint:
+                done.update(chunk)
+                with open(f'{checkpoint}.tmp', 'w') as handle:
+                    json.dump({'done': sorted(done)}, handle)
+                os.replace(f'{checkpoint}.tmp', checkpoint)
+
+        started = time.perf_counter()
+        checked = changed = 0
+
+        def progress(result, chunk):
+            nonlocal checked, changed
+            record(chunk)
+            checked += result[0]
+            changed += result[1]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{checked}/{len(ids)} months, {changed} changed, "
+                f"{checked / elapsed if elapsed else 0:.0f} months/s"
+            )
+
+        if options['workers'] == 1 or len(chunks) < 2:
+            for chunk in chunks:
+                progress(_recompute_chunk(chunk), chunk)
+        else:
+            # Workers are forked with the app already set up; close the
+            # connections first so each opens its own.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(options['workers'], mp_context=context) as pool:
+                futures = {pool.submit(_recompute_chunk, chunk): chunk for chunk in chunks}
+                try:
+                    for future in as_completed(futures):
+                        progress(future.result(), futures[future])
+                except KeyboardInterrupt:
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {checked} month total(s), {changed} changed, in {elapsed:.2f}s"
+        ))
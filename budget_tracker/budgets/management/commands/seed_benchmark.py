@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import CommandError
+
+from budgets.models import BudgetItem, MonthlyInstance
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+from budgets.seeding import default_start, seed_dataset
+
+
+class Command(ProfiledCommand):
+    help = "Fill an empty database with deterministic synthetic budget data for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=100000,
+            help="Number of budget items (default: 100000)",
+        )
+        parser.add_argument(
+            '--owners',
+            type=int,
+            default=1000,
+            help="Number of owners (default: 1000)",
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=120,
+            help="Number of monthly instances (default: 120)",
+        )
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month (YYYY-MM, default: centred on the current month)",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Random seed (default: 0)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help="Rows per INSERT batch (default: 10000)",
+        )
+
+    def handle(self, *args, **options):
+        if options['items'] < 1 or options['owners'] < 1 or options['months'] < 1:
+            raise CommandError("--items, --owners and --months must be positive")
+        try:
+            start = parse_month(options['start']) if options['start'] else default_start(options['months'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if BudgetItem.objects.exists() or MonthlyInstance.objects.exists():
+            raise CommandError(
+                "The database already has budget data; seed an empty database "
+                "(e.g. after 'manage.py flush')."
+            )
+
+        started = time.perf_counter()
+        counts = seed_dataset(
+            options['items'],
+            options['owners'],
+            options['months'],
+            start=start,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {summary} from {start:%Y-%m} in {elapsed:.2f}s"
+        ))
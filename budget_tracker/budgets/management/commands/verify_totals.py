@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+
+from budgets.models import MonthlyInstance
+from budgets.months import parse_month
+from budgets.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Check every monthly instance's stored total against the sum of its line items, "
+        "reading months in id order a chunk at a time, and optionally repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help="First month to check (YYYY-MM, default: all months)",
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help="Last month to check, inclusive (YYYY-MM, default: all months)",
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=500,
+            help="Months read per grouped query; bounds memory and the length of each read (default: 500)",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help="Seconds to sleep between chunks to limit the load on a live database (default: 0)",
+        )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help="Recompute the totals that disagree, one UPDATE per chunk",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk'] < 1 or options['pause'] < 0:
+            raise CommandError("--chunk must be positive and --pause not negative")
+        months = MonthlyInstance.objects.all()
+        try:
+            if options['start']:
+                months = months.filter(month__gte=parse_month(options['start']))
+            if options['end']:
+                months = months.filter(month__lte=parse_month(options['end']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        checked = drifted = repaired = 0
+        last_pk = 0
+        while True:
+            # Keyset pagination on the primary key: every chunk is one
+            # grouped query, however far into the table it is.
+            rows = list(
+                months.filter(pk__gt=last_pk).with_line_total().order_by('pk')
+                .values_list('pk', 'month', 'total_amount', 'line_total')[:options['chunk']]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            checked += len(rows)
+            drift = [
+                (pk, month, stored, computed.quantize(Decimal('0.01')))
+                for pk, month, stored, computed in rows
+                if stored != computed.quantize(Decimal('0.01'))
+            ]
+            for _, month, stored, computed in drift:
+                self.stdout.write(f"{month:%Y-%m}: stored {stored}, line items sum to {computed}")
+            drifted += len(drift)
+            if drift and options['repair']:
+                repaired += MonthlyInstance.objects.filter(pk__in=[row[0] for row in drift]).refresh_totals()
+            if options['pause'] and len(rows) == options['chunk']:
+                time.sleep(options['pause'])
+
+        elapsed = time.perf_counter() - started
+        summary = f"Checked {checked} month total(s) in {elapsed:.2f}s: {drifted} disagreed"
+        if options['repair']:
+            summary += f", {repaired} repaired"
+        elif drifted:
+            raise CommandError(f"{summary}; run with --repair to fix them")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,300 @@
+"""
+Prometheus metrics for budget operations.
+
+Counters and histograms are declared at the bottom of this module and
+updated by the models, imports, admin and cache. ``exposition()`` renders
+them in the Prometheus text format for the ``/metrics`` view; there is no
+client library dependency.
+
+Values live in a per-process store. With ``BUDGETS_METRICS_DIR`` unset the
+store is a dict in memory, which only describes the process answering the
+scrape. Set it to a directory shared by the worker processes of a host and
+every process instead keeps its values in its own memory-mapped file there
+(``metrics-<pid>.db``); ``exposition()`` sums all files in the directory,
+so any worker answers a scrape with host-wide values, and counts of
+workers that have exited are kept. Empty the directory when deploying.
+
+A file is a 8-byte used length followed by entries of a 4-byte key length,
+the UTF-8 key padded to 8 bytes and an 8-byte double. Only the owning
+process writes it, and the used length is published after an entry is
+complete, so readers never see a partial key.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REGISTRY = []
+
+_HEADER = struct.Struct('q')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+_FILE_PREFIX = 'metrics-'
+_FILE_SUFFIX = '.db'
+
+
+def _padded(length):
+    return length + (-(_LENGTH.size + length) % 8)
+
+
+def _entries(data, used):
+    """Yield ``(key, value, value offset)`` for the entries of a store file."""
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        offset = start + _padded(length)
+        yield bytes(data[start:start + length]).decode(), _VALUE.unpack_from(data, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+class MemoryStore:
+    """Values of this process only, in a dict."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+
+    def inc(self, amounts):
+        with self.lock:
+            for key, amount in amounts:
+                self.values[key] += amount
+
+    def collect(self):
+        with self.lock:
+            return dict(self.values)
+
+
+class FileStore:
+    """Values of this process in a memory-mapped file, summed with the other files of its directory."""
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.file = open(self.directory / f'{_FILE_PREFIX}{os.getpid()}{_FILE_SUFFIX}', 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(self.INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        # A file left by an earlier process with the same pid is continued.
+        self.used = _HEADER.unpack_from(self.map, 0)[0] or _HEADER.size
+        self.offsets = {key: offset for key, _, offset in _entries(self.map, self.used)}
+
+    def _add(self, key):
+        encoded = key.encode()
+        size = _LENGTH.size + _padded(len(encoded)) + _VALUE.size
+        if self.used + size > len(self.map):
+            self.map.close()
+            self.file.truncate(max(2 * os.fstat(self.file.fileno()).st_size, self.used + size))
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        _LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + _LENGTH.size:self.used + _LENGTH.size + len(encoded)] = encoded
+        offset = self.used + size - _VALUE.size
+        _VALUE.pack_into(self.map, offset, 0.0)
+        self.used += size
+        _HEADER.pack_into(self.map, 0, self.used)
+        self.offsets[key] = offset
+        return offset
+
+    def inc(self, amounts):
+        with self.lock:
+            for key, amount in amounts:
+                offset = self.offsets.get(key)
+                if offset is None:
+                    offset = self._add(key)
+                _VALUE.pack_into(self.map, offset, _VALUE.unpack_from(self.map, offset)[0] + amount)
+
+    def collect(self):
+        values = defaultdict(float)
+        for path in self.directory.glob(f'{_FILE_PREFIX}*{_FILE_SUFFIX}'):
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            if len(data) < _HEADER.size:
+                continue
+            for key, value, _ in _entries(data, _HEADER.unpack_from(data, 0)[0]):
+                values[key] += value
+        return values
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _store():
+    """Return this process's store for the configured ``BUDGETS_METRICS_DIR``."""
+    directory = getattr(settings, 'BUDGETS_METRICS_DIR', None)
+    # Keyed by pid so a forked worker opens its own file.
+    key = (str(directory) if directory else None, os.getpid())
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = FileStore(directory) if directory else MemoryStore()
+    return store
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._keys = {}
+        REGISTRY.append(self)
+
+    def _key(self, suffix, labels):
+        """Return the store key of one sample; keys are JSON ``[name, suffix, labels]``."""
+        cache_key = (suffix, tuple(labels.items()))
+        key = self._keys.get(cache_key)
+        if key is None:
+            if set(labels) - {'le'} != set(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {', '.join(self.labelnames) or 'none'}")
+            key = self._keys[cache_key] = json.dumps([self.name, suffix, sorted(labels.items())])
+        return key
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _store().inc([(self._key('', labels), amount)])
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        amounts = [
+            (self._key('_bucket', {**labels, 'le': _format(bound)}), 1)
+            for bound in self.buckets if value <= bound
+        ]
+        amounts.append((self._key('_sum', labels), value))
+        amounts.append((self._key('_count', labels), 1))
+        _store().inc(amounts)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _format(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return f'{value:.1f}'
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _line(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{label}="{_escape(text)}"' for label, text in labels) + '}'
+    return f'{name} {_format(value)}'
+
+
+def samples():
+    """Return ``{(metric name, suffix, labels): value}`` summed over every process sharing the store."""
+    values = defaultdict(float)
+    for key, value in _store().collect().items():
+        name, suffix, labels = json.loads(key)
+        values[name, suffix, tuple(tuple(pair) for pair in labels)] += value
+    return values
+
+
+def exposition():
+    """Render every registered metric in the Prometheus text format."""
+    values = samples()
+    series = defaultdict(set)
+    for name, suffix, labels in values:
+        series[name].add(tuple(pair for pair in labels if pair[0] != 'le'))
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for labels in sorted(series[metric.name]):
+            if metric.type == 'histogram':
+                # Buckets are stored cumulatively; one never reached is 0.
+                for bound in metric.buckets:
+                    bucket = tuple(sorted(labels + (('le', _format(bound)),)))
+                    lines.append(_line(
+                        f'{metric.name}_bucket', bucket, values.get((metric.name, '_bucket', bucket), 0)
+                    ))
+                for suffix in ('_sum', '_count'):
+                    lines.append(_line(metric.name + suffix, labels, values.get((metric.name, suffix, labels), 0)))
+            else:
+                lines.append(_line(metric.name, labels, values[metric.name, '', labels]))
+
+    # Hit ratios are derived from the summed cache counters so they cover
+    # every process.
+    lookups = defaultdict(lambda: [0.0, 0.0])
+    for labels in series[cache_requests.name]:
+        labels_dict = dict(labels)
+        lookups[labels_dict['kind']][labels_dict['result'] == 'miss'] += values[cache_requests.name, '', labels]
+    lines.append('# HELP budgets_cache_hit_ratio Share of budgets.cache lookups answered from the cache.')
+    lines.append('# TYPE budgets_cache_hit_ratio gauge')
+    for kind, (hits, misses) in sorted(lookups.items()):
+        lines.append(_line('budgets_cache_hit_ratio', [('kind', kind)], hits / (hits + misses)))
+    return '\n'.join(lines) + '\n'
+
+
+month_generate_seconds = Histogram(
+    'budgets_month_generate_seconds', 'Time to generate a range of months with bulk_generate.'
+)
+months_generated = Counter(
+    'budgets_months_generated_total', 'MonthlyInstances created by bulk_generate.'
+)
+month_populate_seconds = Histogram(
+    'budgets_month_populate_seconds', 'Time to auto-populate a month with its repeating items.'
+)
+month_populate_items = Counter(
+    'budgets_month_populate_items_total', 'Active repeating items processed while auto-populating months.'
+)
+month_total_seconds = Histogram(
+    'budgets_month_total_seconds', 'Time to recompute and store a month total.'
+)
+rows_written = Counter(
+    'budgets_rows_written_total', 'Rows written by the bulk write paths.', ['model', 'operation']
+)
+import_seconds = Histogram(
+    'budgets_import_seconds', 'Time to import a CSV of budget items.'
+)
+import_rows = Counter(
+    'budgets_import_rows_total', 'CSV rows imported or skipped.', ['result']
+)
+admin_save_seconds = Histogram(
+    'budgets_admin_save_seconds', 'Time to handle an admin add or change form submission.', ['model']
+)
+cache_requests = Counter(
+    'budgets_cache_requests_total', 'budgets.cache lookups by kind and result.', ['kind', 'result']
+)
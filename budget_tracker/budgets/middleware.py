@@ -0,0 +1,262 @@
+"""
+Per-request performance instrumentation and profiling.
+
+``ProfilingMiddleware`` profiles single requests on demand; see
+``budgets.profiling``.
+
+``PerformanceMiddleware`` is listed in ``MIDDLEWARE`` but only runs when
+``BUDGETS_PERF_ENABLED`` is true; otherwise it raises ``MiddlewareNotUsed``
+at startup and Django leaves it out of the handler chain, so a disabled
+middleware costs nothing per request.
+
+When enabled, every request records its wall time, query count, database
+time, slowest queries and ``budgets.cache`` hits and misses. These are
+returned in a ``Server-Timing`` header (query text is never sent, only
+durations) and aggregated per URL name. Every
+``BUDGETS_PERF_REPORT_INTERVAL`` seconds the aggregates (p50/p95/p99 of
+wall time, database time and query count, plus the slowest queries seen)
+are written as one JSON line to ``BUDGETS_PERF_REPORT_FILE``, or logged to
+the ``budgets.perf`` logger when no file is set, and reset.
+
+Queries run while a streaming response is consumed happen after the
+middleware returns and are not counted. Cache counts come from the
+process-wide ``budgets.cache.stats`` and may include other threads'
+lookups under a threaded server.
+"""
+import heapq
+import json
+import logging
+import math
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils import timezone
+
+from . import cache
+from .profiling import profile
+
+
+logger = logging.getLogger('budgets.perf')
+
+# Samples kept per URL name and report period; beyond this a uniform
+# reservoir sample is kept so percentiles stay representative.
+MAX_SAMPLES = 10000
+# Characters of SQL kept for each slow query in reports.
+SQL_PREVIEW = 500
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of sorted, non-empty ``values``."""
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def _cache_counts():
+    hits = misses = 0
+    for key, count in cache.stats.items():
+        if key.endswith('.hit'):
+            hits += count
+        elif key.endswith('.miss'):
+            misses += count
+    return hits, misses
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and keeping the slowest ``keep``.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.time = 0.0
+        self.slowest = []  # Min-heap of (duration, sql).
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.time += duration
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, (duration, sql))
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, sql))
+
+
+class _Series:
+    """Count, maximum and a reservoir sample of one measurement."""
+
+    def __init__(self):
+        self.count = 0
+        self.max = 0
+        self.samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.max = max(self.max, value)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = value
+
+    def summary(self, digits=3):
+        values = sorted(self.samples)
+        return {
+            'p50': round(percentile(values, 0.50), digits),
+            'p95': round(percentile(values, 0.95), digits),
+            'p99': round(percentile(values, 0.99), digits),
+            'max': round(self.max, digits),
+        }
+
+
+class RequestStats:
+    """
+    Per URL name aggregates of the requests recorded since the last report.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.started_at = timezone.now()
+        self.urls = {}
+
+    def record(self, name, wall_ms, timer, cache_hits, cache_misses):
+        with self.lock:
+            url = self.urls.get(name)
+            if url is None:
+                url = self.urls[name] = {
+                    'wall_ms': _Series(), 'db_ms': _Series(), 'queries': _Series(),
+                    'cache_hits': 0, 'cache_misses': 0, 'slowest': [],
+                }
+            url['wall_ms'].add(wall_ms)
+            url['db_ms'].add(timer.time * 1000)
+            url['queries'].add(timer.count)
+            url['cache_hits'] += cache_hits
+            url['cache_misses'] += cache_misses
+            for duration, sql in timer.slowest:
+                if len(url['slowest']) < self.keep:
+                    heapq.heappush(url['slowest'], (duration, sql))
+                elif duration > url['slowest'][0][0]:
+                    heapq.heapreplace(url['slowest'], (duration, sql))
+
+    def report(self):
+        """Return the aggregates as a JSON-ready dict and start a new period."""
+        with self.lock:
+            urls, self.urls = self.urls, {}
+            started_at, self.started_at = self.started_at, timezone.now()
+        return {
+            'period_start': started_at,
+            'period_end': self.started_at,
+            'urls': {
+                name: {
+                    'requests': url['wall_ms'].count,
+                    'wall_ms': url['wall_ms'].summary(),
+                    'db_ms': url['db_ms'].summary(),
+                    'queries': url['queries'].summary(digits=1),
+                    'cache_hits': url['cache_hits'],
+                    'cache_misses': url['cache_misses'],
+                    'slowest_queries': [
+                        {'ms': round(duration * 1000, 3), 'sql': sql[:SQL_PREVIEW]}
+                        for duration, sql in sorted(url['slowest'], reverse=True)
+                    ],
+                }
+                for name, url in sorted(urls.items())
+            },
+        }
+
+
+class PerformanceMiddleware:
+    """
+    Record per-request timings, add a ``Server-Timing`` header and report percentiles per URL name.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BUDGETS_PERF_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.keep = getattr(settings, 'BUDGETS_PERF_SLOWEST_QUERIES', 3)
+        self.interval = getattr(settings, 'BUDGETS_PERF_REPORT_INTERVAL', 60)
+        self.report_file = getattr(settings, 'BUDGETS_PERF_REPORT_FILE', None)
+        self.stats = RequestStats(self.keep)
+        self.next_report = time.monotonic() + self.interval
+        self.report_lock = threading.Lock()
+
+    def __call__(self, request):
+        timer = QueryTimer(self.keep)
+        hits_before, misses_before = _cache_counts()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        hits, misses = _cache_counts()
+        hits -= hits_before
+        misses -= misses_before
+
+        metrics = [
+            f'app;dur={wall_ms:.1f}',
+            f'db;dur={timer.time * 1000:.1f};desc="{timer.count} queries"',
+            f'cache;desc="{hits} hits, {misses} misses"',
+        ] + [
+            f'sql-{rank};dur={duration * 1000:.1f}'
+            for rank, (duration, _) in enumerate(sorted(timer.slowest, reverse=True), 1)
+        ]
+        if response.has_header('Server-Timing'):
+            metrics.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(metrics)
+
+        match = request.resolver_match
+        self.stats.record(match.view_name if match else '<unresolved>', wall_ms, timer, hits, misses)
+        if time.monotonic() >= self.next_report:
+            self.write_report()
+        return response
+
+    def write_report(self):
+        """Write the aggregates since the last report and reset them."""
+        with self.report_lock:
+            self.next_report = time.monotonic() + self.interval
+            report = self.stats.report()
+            if not report['urls']:
+                return
+            line = json.dumps(report, cls=DjangoJSONEncoder)
+            if self.report_file:
+                with open(self.report_file, 'a') as handle:
+                    handle.write(line + '\n')
+            else:
+                logger.info(line)
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of staff users that ask for it with ``?_profile=1`` or ``X-Profile: 1``.
+
+    Must come after ``AuthenticationMiddleware``. The capture's name is
+    returned in an ``X-Profile-Capture`` header. A request arriving while
+    another capture is being taken is served unprofiled, without the header.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BUDGETS_PROFILE_REQUESTS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wanted = request.GET.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+        if not (wanted and request.user.is_staff):
+            return self.get_response(request)
+        with profile(f'{request.method} {request.path}') as result:
+            response = self.get_response(request)
+        if result:
+            response['X-Profile-Capture'] = result[0].name
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(condition=models.Q(('repeats', True)), fields=['startdate', 'end_date'], name='budgetitem_active_idx'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def snapshot_existing_line_items(apps, schema_editor):
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    MonthlyLineItem = apps.get_model('budgets', 'MonthlyLineItem')
+    item = BudgetItem.objects.filter(pk=models.OuterRef('budget_item_id'))
+    MonthlyLineItem.objects.using(schema_editor.connection.alias).update(
+        cost_snapshot=models.Subquery(item.values('cost')[:1]),
+        owner=models.Subquery(item.values('owner')[:1]),
+        repeats=models.Subquery(item.values('repeats')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_budgetitem_active_idx'),
+    ]
+
+    operations = [
+        # Adopt the auto-created M2M table as an explicit through model
+        # without touching the database, then rename it and its columns.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='MonthlyLineItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('monthlyinstance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='budgets.monthlyinstance')),
+                        ('budgetitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='budgets.budgetitem')),
+                    ],
+                    options={
+                        'db_table': 'budgets_monthlyinstance_budget_items',
+                        'unique_together': {('monthlyinstance', 'budgetitem')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='monthlyinstance',
+                    name='budget_items',
+                    field=models.ManyToManyField(blank=True, help_text='Budget items included in this month', through='budgets.MonthlyLineItem', to='budgets.budgetitem'),
+                ),
+            ],
+        ),
+        migrations.AlterModelTable(
+            name='monthlylineitem',
+            table=None,
+        ),
+        migrations.RenameField(
+            model_name='monthlylineitem',
+            old_name='monthlyinstance',
+            new_name='monthly_instance',
+        ),
+        migrations.RenameField(
+            model_name='monthlylineitem',
+            old_name='budgetitem',
+            new_name='budget_item',
+        ),
+        migrations.AlterField(
+            model_name='monthlylineitem',
+            name='monthly_instance',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='budgets.monthlyinstance'),
+        ),
+        migrations.AlterField(
+            model_name='monthlylineitem',
+            name='budget_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='budgets.budgetitem'),
+        ),
+        migrations.AlterModelOptions(
+            name='monthlylineitem',
+            options={'verbose_name': 'Monthly Line Item', 'verbose_name_plural': 'Monthly Line Items'},
+        ),
+        migrations.AddField(
+            model_name='monthlylineitem',
+            name='cost_snapshot',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Cost of the budget item when it was linked to this month', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='monthlylineitem',
+            name='owner',
+            field=models.CharField(blank=True, help_text='Owner of the budget item when it was linked to this month', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='monthlylineitem',
+            name='repeats',
+            field=models.BooleanField(default=False, help_text='Whether the budget item was repeating when it was linked'),
+        ),
+        migrations.RunPython(snapshot_existing_line_items, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='monthlylineitem',
+            index=models.Index(fields=['monthly_instance', 'owner', 'cost_snapshot'], name='lineitem_month_owner_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:31
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_monthlylineitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetItemCostPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField(help_text='Date from which this cost applies (months on or after this date)')),
+                ('cost', models.DecimalField(decimal_places=2, help_text='Monetary amount from the effective date (minimum $0.01)', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_periods', to='budgets.budgetitem')),
+            ],
+            options={
+                'verbose_name': 'Budget Item Cost Period',
+                'verbose_name_plural': 'Budget Item Cost Periods',
+                'ordering': ['budget_item', 'effective_from'],
+                'indexes': [models.Index(fields=['budget_item', 'effective_from', 'cost'], name='costperiod_asof_idx')],
+                'unique_together': {('budget_item', 'effective_from')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def summarise_existing_line_items(apps, schema_editor):
+    MonthlyLineItem = apps.get_model('budgets', 'MonthlyLineItem')
+    OwnerMonthSummary = apps.get_model('budgets', 'OwnerMonthSummary')
+    grouped = MonthlyLineItem.objects.using(schema_editor.connection.alias).order_by().values(
+        'monthly_instance_id', 'owner'
+    ).annotate(
+        total=models.Sum('cost_snapshot'), count=models.Count('pk')
+    ).values_list('monthly_instance_id', 'owner', 'total', 'count')
+    select, params = grouped.query.sql_with_params()
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        'INSERT INTO {} ({}, {}, {}, {}) {}'.format(
+            quote(OwnerMonthSummary._meta.db_table),
+            quote('monthly_instance_id'), quote('owner'), quote('total'), quote('item_count'),
+            select,
+        ),
+        params
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0005_budgetitem_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerMonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(blank=True, help_text='Owner snapshot of the line items summarised', max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text="Sum of the owner's line item costs in this month", max_digits=12)),
+                ('item_count', models.IntegerField(default=0, help_text="Number of the owner's line items in this month")),
+                ('monthly_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owner_summaries', to='budgets.monthlyinstance')),
+            ],
+            options={
+                'verbose_name': 'Owner Month Summary',
+                'verbose_name_plural': 'Owner Month Summaries',
+                'unique_together': {('monthly_instance', 'owner')},
+            },
+        ),
+        migrations.RunPython(summarise_existing_line_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,163 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def _normalise(name):
+    return ' '.join(name.split())
+
+
+def owners_from_strings(apps, schema_editor):
+    """
+    Create one Owner per distinct owner string and point every item at it.
+
+    Strings that differ only in case or whitespace are merged under the most
+    common spelling and an empty owner becomes "Unassigned". Distinct strings
+    are applied with one UPDATE per string, served by the
+    (owner, created_at, id) index, and owners are created in batches. The
+    owner snapshots of the line items are respelled the same way and the
+    owner summaries rebuilt from them, so reports do not keep the old
+    spellings apart.
+    """
+    db = schema_editor.connection.alias
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    Owner = apps.get_model('budgets', 'Owner')
+
+    counts = BudgetItem.objects.using(db).order_by().values('owner').annotate(
+        count=models.Count('pk')
+    ).values_list('owner', 'count')
+    spellings = {}
+    for owner, count in counts.iterator(chunk_size=BATCH_SIZE):
+        key = _normalise(owner).casefold()
+        best = spellings.get(key)
+        if best is None or count > best[1]:
+            spellings[key] = (_normalise(owner) or 'Unassigned', count)
+
+    names = sorted(name for name, _ in spellings.values())
+    for start in range(0, len(names), BATCH_SIZE):
+        Owner.objects.using(db).bulk_create([Owner(name=name) for name in names[start:start + BATCH_SIZE]])
+    owner_ids = dict(Owner.objects.using(db).values_list('name', 'id'))
+
+    # Materialised first: SQLite does not isolate an open cursor from
+    # updates to the table it is reading.
+    strings = list(BudgetItem.objects.using(db).order_by('owner').values_list('owner', flat=True).distinct())
+    for owner in strings:
+        name = spellings[_normalise(owner).casefold()][0]
+        BudgetItem.objects.using(db).filter(owner=owner).update(owner_ref=owner_ids[name])
+
+    _respell_line_items(apps, schema_editor, spellings)
+
+
+def _respell_line_items(apps, schema_editor, spellings):
+    """
+    Apply the merged spellings to the line item owner snapshots and rebuild the owner summaries.
+
+    Snapshots of owners no item has any more keep their own spelling,
+    normalised. Changed strings are rewritten with one CASE UPDATE per
+    batch, and the summaries are recomputed with one INSERT ... SELECT when
+    anything changed.
+    """
+    db = schema_editor.connection.alias
+    MonthlyLineItem = apps.get_model('budgets', 'MonthlyLineItem')
+    OwnerMonthSummary = apps.get_model('budgets', 'OwnerMonthSummary')
+
+    respelled = {}
+    for owner in MonthlyLineItem.objects.using(db).order_by().values_list('owner', flat=True).distinct():
+        key = _normalise(owner).casefold()
+        name = spellings[key][0] if key in spellings else _normalise(owner) or 'Unassigned'
+        if name != owner:
+            respelled[owner] = name
+    if not respelled:
+        return
+
+    strings = sorted(respelled)
+    for start in range(0, len(strings), BATCH_SIZE):
+        batch = strings[start:start + BATCH_SIZE]
+        MonthlyLineItem.objects.using(db).filter(owner__in=batch).update(owner=models.Case(
+            *(models.When(owner=owner, then=models.Value(respelled[owner])) for owner in batch),
+            output_field=models.CharField(),
+        ))
+
+    OwnerMonthSummary.objects.using(db).all().delete()
+    grouped = MonthlyLineItem.objects.using(db).order_by().values(
+        'monthly_instance_id', 'owner'
+    ).annotate(
+        total=models.Sum('cost_snapshot'), count=models.Count('pk')
+    ).values_list('monthly_instance_id', 'owner', 'total', 'count')
+    select, params = grouped.query.sql_with_params()
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        'INSERT INTO {} ({}, {}, {}, {}) {}'.format(
+            quote(OwnerMonthSummary._meta.db_table),
+            quote('monthly_instance_id'), quote('owner'), quote('total'), quote('item_count'),
+            select,
+        ),
+        params
+    )
+
+
+def strings_from_owners(apps, schema_editor):
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    Owner = apps.get_model('budgets', 'Owner')
+    db = schema_editor.connection.alias
+    for owner_id, name in list(Owner.objects.using(db).values_list('id', 'name')):
+        BudgetItem.objects.using(db).filter(owner_ref=owner_id).update(owner=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0006_ownermonthsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Owner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the owner', max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Owner',
+                'verbose_name_plural': 'Owners',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='owner_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='budgets.owner'),
+        ),
+        migrations.RunPython(owners_from_strings, strings_from_owners),
+        migrations.RemoveIndex(
+            model_name='budgetitem',
+            name='budgetitem_owner_created_idx',
+        ),
+        # Lets the string column be re-added to populated tables on reverse.
+        migrations.AlterField(
+            model_name='budgetitem',
+            name='owner',
+            field=models.CharField(default='', help_text='Owner of this budget item', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='budgetitem',
+            name='owner',
+        ),
+        migrations.RenameField(
+            model_name='budgetitem',
+            old_name='owner_ref',
+            new_name='owner',
+        ),
+        migrations.AlterField(
+            model_name='budgetitem',
+            name='owner',
+            field=models.ForeignKey(help_text='Owner of this budget item', on_delete=django.db.models.deletion.PROTECT, related_name='budget_items', to='budgets.owner'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='budgetitem_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0007_owner'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(condition=models.Q(('repeats', True)), fields=['name', 'id'], name='budgetitem_repeating_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(condition=models.Q(('repeats', False)), fields=['name', 'id'], name='budgetitem_one_off_name_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+# Ordinal of December 9999, the last_month of open-ended items.
+OPEN_ENDED_MONTH = 9999 * 12 + 11
+
+
+def _ordinal(field):
+    return ExtractYear(field) * 12 + ExtractMonth(field) - 1
+
+
+def backfill_month_range(apps, schema_editor):
+    """
+    Derive first_month and last_month for every existing item in one UPDATE.
+
+    Repeating items cover the months from their first active month (the
+    month of startdate, or the next one when it starts after the 1st) to
+    the month of end_date; one-off items the month of startdate.
+    """
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    BudgetItem.objects.using(schema_editor.connection.alias).update(
+        first_month=models.Case(
+            models.When(repeats=True, startdate__day__gt=1, then=_ordinal('startdate') + 1),
+            default=_ordinal('startdate'),
+        ),
+        last_month=models.Case(
+            models.When(repeats=False, then=_ordinal('startdate')),
+            models.When(end_date__isnull=True, then=models.Value(OPEN_ENDED_MONTH)),
+            default=_ordinal('end_date'),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0008_budgetitem_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetitem',
+            name='first_month',
+            field=models.IntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='last_month',
+            field=models.IntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_month_range, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(fields=['first_month', 'last_month'], name='budgetitem_months_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(fields=['last_month', 'first_month'], name='budgetitem_last_month_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0009_budgetitem_month_range'),
+    ]
+
+    # Existing items recur monthly and existing line items cover one
+    # occurrence, so first_month/last_month and the snapshots are unchanged.
+    operations = [
+        migrations.AddField(
+            model_name='budgetitem',
+            name='recurrence',
+            field=models.CharField(
+                choices=[
+                    ('monthly', 'Monthly'), ('day_of_month', 'Monthly on a day'), ('quarterly', 'Quarterly'),
+                    ('annual', 'Annually'), ('every_n_months', 'Every N months'), ('weekly', 'Weekly'),
+                    ('fortnightly', 'Fortnightly'),
+                ],
+                default='monthly',
+                help_text="How often a repeating item occurs; each occurrence costs the item's cost",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='interval',
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text='Months between occurrences when recurring every N months',
+                validators=[django.core.validators.MinValueValidator(1)],
+            ),
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='day_of_month',
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text='Day the item occurs on when recurring monthly on a day (the last day in shorter months)',
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name='monthlylineitem',
+            name='occurrences',
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text='Times the budget item occurs in this month; the snapshot covers all of them',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(
+                condition=models.Q(('recurrence', 'monthly'), _negated=True),
+                fields=['first_month', 'last_month'],
+                name='budgetitem_recurring_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-15 05:39
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0010_budgetitem_recurrence'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='budgetitem',
+            name='budgetitem_repeating_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='budgetitem',
+            name='budgetitem_one_off_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), models.F('id'), condition=models.Q(('repeats', True)), name='budgetitem_repeating_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), models.F('id'), condition=models.Q(('repeats', False)), name='budgetitem_one_off_name_idx'),
+        ),
+    ]
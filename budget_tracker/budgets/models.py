@@ -1,8 +1,261 @@
-from django.db import models
-from django.core.validators import MinValueValidator
+from itertools import islice
+
+from django.db import connections, models, transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce, Collate, ExtractMonth, ExtractYear, Mod
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.dispatch import Signal
+from django.utils import timezone
 from decimal import Decimal
 from datetime import date
 
+from . import metrics
+from .months import (
+    OPEN_ENDED_MONTH, first_active_ordinal, month_ordinal, month_range, month_start, ordinal_to_month
+)
+from .recurrence import (
+    ANNUAL, DAY_OF_MONTH, EVERY_N_MONTHS, MONTHLY, QUARTERLY, RECURRENCE_CHOICES, RULE_FIELDS,
+    align, expand, item_month_range, occurrence_counts, run_totals
+)
+
+
+# Sent by MonthlyInstance with ``months`` (month dates) after set-based
+# writes that change line items or totals without firing model signals.
+months_changed = Signal()
+
+# Column order of the row tuples passed to BudgetItemQuerySet.insert_rows.
+# ``owner`` is an Owner primary key.
+ITEM_COLUMNS = ('name', 'owner', 'cost', 'repeats', 'startdate', 'end_date')
+
+# BudgetItem fields that first_month and last_month are derived from.
+MONTH_RANGE_FIELDS = ('repeats', 'startdate', 'end_date') + RULE_FIELDS
+
+
+def _ordinal_expression(field):
+    return ExtractYear(field) * 12 + ExtractMonth(field) - 1
+
+
+def month_range_expressions():
+    """
+    Return ``{'first_month': ..., 'last_month': ...}`` SQL expressions matching ``item_month_range``.
+
+    Only valid for one-off and monthly items; see ``refresh_month_range``.
+    """
+    return {
+        'first_month': models.Case(
+            models.When(repeats=True, startdate__day__gt=1, then=_ordinal_expression('startdate') + 1),
+            default=_ordinal_expression('startdate'),
+        ),
+        'last_month': models.Case(
+            models.When(repeats=False, then=_ordinal_expression('startdate')),
+            models.When(end_date__isnull=True, then=models.Value(OPEN_ENDED_MONTH)),
+            default=_ordinal_expression('end_date'),
+        ),
+    }
+
+
+class OwnerQuerySet(models.QuerySet):
+    """
+    QuerySet for owners.
+    """
+
+    def ids_for(self, names):
+        """
+        Return ``{name: id}`` for ``names``, creating the owners that do not exist yet.
+        """
+        names = set(names)
+        ids = dict(self.filter(name__in=names).values_list('name', 'id'))
+        missing = names - ids.keys()
+        if missing:
+            self.bulk_create([self.model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(self.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+
+class Owner(models.Model):
+    """
+    Person or team a budget item belongs to.
+
+    Kept in its own small table so filtering and grouping items by owner are
+    index lookups on ``BudgetItem.owner`` instead of scans over repeated
+    strings.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Name of the owner"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OwnerQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Owner"
+        verbose_name_plural = "Owners"
+
+    def __str__(self):
+        return self.name
+
+
+class BudgetItemQuerySet(models.QuerySet):
+    """
+    QuerySet for budget items with common date-window filters.
+    """
+
+    def active_in(self, month):
+        """
+        Return repeating items occurring in ``month``.
+
+        A monthly item is active when it has a startdate on or before
+        ``month`` and either no end_date or an end_date on or after ``month``,
+        backed by the ``budgetitem_active_idx`` index. Items with other
+        recurrences occur in the months from ``first_month`` to
+        ``last_month``, every ``step`` months for quarterly, annual and
+        every-N-months rules, backed by ``budgetitem_recurring_idx``. The
+        default ordering is cleared so SQLite does not prefer walking
+        ``budgetitem_created_idx`` to avoid a sort; callers that need an
+        order apply their own.
+        """
+        ordinal = month_ordinal(month)
+        step = models.Case(
+            models.When(recurrence=QUARTERLY, then=models.Value(3)),
+            models.When(recurrence=ANNUAL, then=models.Value(12)),
+            models.When(recurrence=EVERY_N_MONTHS, then=models.F('interval')),
+            default=models.Value(1),
+            output_field=models.IntegerField(),
+        )
+        # repeats=True in both branches lets SQLite serve each from its own
+        # index (MULTI-INDEX OR) rather than scan.
+        monthly = models.Q(
+            repeats=True,
+            recurrence=MONTHLY,
+            startdate__lte=month
+        ) & (models.Q(end_date__isnull=True) | models.Q(end_date__gte=month))
+        other = models.Q(
+            repeats=True,
+            first_month__lte=ordinal,
+            last_month__gte=ordinal
+        ) & ~models.Q(recurrence=MONTHLY) & models.Q(
+            models.lookups.Exact(Mod(ordinal - models.F('first_month'), step), 0)
+        )
+        return self.filter(monthly | other).order_by()
+
+    def occurrences_in(self, month):
+        """
+        Return ``{item_id: occurrences}`` for the items of this queryset ``active_in`` ``month``.
+
+        Reads the items' rules in one query and counts with
+        ``recurrence.occurrence_counts``.
+        """
+        rows = self.active_in(month).values_list('pk', *RULE_FIELDS, 'startdate', 'end_date')
+        return occurrence_counts(rows, month)
+
+    def with_cost_as_of(self, month):
+        """
+        Annotate ``cost_as_of`` with each item's cost in ``month``.
+
+        Resolved in the same query with a correlated subquery picking the
+        latest BudgetItemCostPeriod effective on or before ``month``,
+        falling back to ``cost``.
+        """
+        period = BudgetItemCostPeriod.objects.filter(
+            budget_item=models.OuterRef('pk'),
+            effective_from__lte=month
+        ).order_by('-effective_from').values('cost')[:1]
+        return self.annotate(cost_as_of=Coalesce(models.Subquery(period), models.F('cost')))
+
+    def overlapping(self, start, end):
+        """
+        Return items covering at least one month from ``start`` to ``end`` inclusive.
+
+        Repeating items cover their active months and one-off items the
+        month they start in, as recorded in ``first_month``/``last_month``;
+        add ``repeats=True`` for the repeating items active in the window.
+        Items ending before they become active (``first_month >
+        last_month``) cover no month and are left out. Backed by the
+        ``budgetitem_months_idx`` and ``budgetitem_last_month_idx`` indexes.
+        For many lookups against the same data, see ``budgets.intervals``.
+        """
+        return self.filter(
+            first_month__lte=month_ordinal(end), last_month__gte=month_ordinal(start)
+        ).filter(first_month__lte=models.F('last_month'))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fill in ``first_month``/``last_month``, which ``save()`` would set, then bulk create."""
+        objs = list(objs)
+        for obj in objs:
+            obj.set_month_range()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        """Update, re-deriving ``first_month``/``last_month`` if their source fields change."""
+        if not set(kwargs) & set(MONTH_RANGE_FIELDS):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # The filter may match on the fields being changed, so remember
+            # the rows first.
+            pks = list(self.values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            self.model.objects.using(self.db).filter(pk__in=pks).refresh_month_range()
+        return updated
+
+    def delete(self):
+        """Delete these items, subtracting their line items from their months as ``BudgetItem.delete()`` does."""
+        with transaction.atomic(using=self.db):
+            MonthlyLineItem.objects.using(self.db).filter(
+                budget_item__in=self.order_by().values('pk')
+            ).discard()
+            return super().delete()
+
+    def refresh_month_range(self):
+        """
+        Recompute ``first_month``/``last_month`` of these items.
+
+        One-off and monthly items are updated in one UPDATE; items with
+        other recurrences are loaded and computed with ``item_month_range``.
+        """
+        plain = models.Q(repeats=False) | models.Q(recurrence=MONTHLY)
+        updated = models.QuerySet.update(self.filter(plain), **month_range_expressions())
+        others = list(self.exclude(plain).only('repeats', 'startdate', 'end_date', *RULE_FIELDS))
+        for item in others:
+            item.set_month_range()
+        return updated + self.model.objects.using(self.db).bulk_update(others, ['first_month', 'last_month'])
+
+    def insert_rows(self, rows, batch_size=10000):
+        """
+        Insert validated items given as tuples of ``ITEM_COLUMNS`` values.
+
+        Rows may go on with ``RULE_FIELDS`` values; items without them
+        recur monthly. Rows are written with ``executemany`` instead of
+        ``bulk_create`` and stamped with a single
+        ``created_at``/``updated_at``. Returns a queryset of the new items:
+        those with that timestamp and an id above the largest id before the
+        insert.
+        """
+        connection = connections[self.db]
+        now = timezone.now()
+        stamp = connection.ops.adapt_datetimefield_value(now)
+        adapt_date = connection.ops.adapt_datefield_value
+        with transaction.atomic(using=self.db):
+            previous = self.order_by().aggregate(last=Max('pk'))['last'] or 0
+            _insert_rows(
+                self.db,
+                self.model,
+                ITEM_COLUMNS + RULE_FIELDS + ('first_month', 'last_month', 'created_at', 'updated_at'),
+                (
+                    (
+                        name, owner, cost, repeats, adapt_date(startdate), adapt_date(end_date),
+                        *rule, *item_month_range(repeats, startdate, end_date, *rule), stamp, stamp
+                    )
+                    for name, owner, cost, repeats, startdate, end_date, *rule in rows
+                    for rule in [rule or (MONTHLY, 1, None)]
+                ),
+                batch_size
+            )
+        return self.model.objects.filter(pk__gt=previous, created_at=now)
+
 
 class BudgetItem(models.Model):
     """
@@ -12,8 +265,10 @@ class BudgetItem(models.Model):
         max_length=200,
         help_text="Name of the budget item (e.g., 'Monthly Rent', 'Car Insurance')"
     )
-    owner = models.CharField(
-        max_length=100,
+    owner = models.ForeignKey(
+        Owner,
+        on_delete=models.PROTECT,
+        related_name='budget_items',
         help_text="Owner of this budget item"
     )
     cost = models.DecimalField(
@@ -26,6 +281,23 @@ class BudgetItem(models.Model):
         default=False,
         help_text="Whether this budget item repeats"
     )
+    recurrence = models.CharField(
+        max_length=20,
+        choices=RECURRENCE_CHOICES,
+        default=MONTHLY,
+        help_text="How often a repeating item occurs; each occurrence costs the item's cost"
+    )
+    interval = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Months between occurrences when recurring every N months"
+    )
+    day_of_month = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1), MaxValueValidator(31)],
+        help_text="Day the item occurs on when recurring monthly on a day (the last day in shorter months)"
+    )
     startdate = models.DateField(
         help_text="Start date for this budget item"
     )
@@ -34,17 +306,590 @@ class BudgetItem(models.Model):
         blank=True,
         help_text="Optional end date for when this budget item should stop"
     )
+    # Month ordinals of the first and last occurrence, derived from repeats,
+    # the rule and the dates by save() for range-overlap queries; see
+    # recurrence.item_month_range.
+    first_month = models.IntegerField(editable=False)
+    last_month = models.IntegerField(editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BudgetItemQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Budget Item"
         verbose_name_plural = "Budget Items"
+        indexes = [
+            # Partial index: SQLite renders repeats=True as a bare column
+            # test, which can only be matched by an index WHERE clause.
+            models.Index(
+                fields=['startdate', 'end_date'],
+                condition=models.Q(repeats=True),
+                name='budgetitem_active_idx'
+            ),
+            # Keyset pagination of the API, optionally within one owner.
+            models.Index(fields=['created_at', 'id'], name='budgetitem_created_idx'),
+            models.Index(fields=['owner', 'created_at', 'id'], name='budgetitem_owner_created_idx'),
+            # Name-ordered pages of the monthly instance admin item pickers.
+            # NOCASE matches SQLite's case-insensitive LIKE, so prefix
+            # searches can seek on these too.
+            models.Index(
+                Collate('name', 'nocase'), 'id',
+                condition=models.Q(repeats=True),
+                name='budgetitem_repeating_name_idx'
+            ),
+            models.Index(
+                Collate('name', 'nocase'), 'id',
+                condition=models.Q(repeats=False),
+                name='budgetitem_one_off_name_idx'
+            ),
+            # Range-overlap queries (overlapping()): SQLite walks whichever
+            # bound is more selective for the window.
+            models.Index(fields=['first_month', 'last_month'], name='budgetitem_months_idx'),
+            models.Index(fields=['last_month', 'first_month'], name='budgetitem_last_month_idx'),
+            # The few items recurring other than monthly, which active_in
+            # and forecasts expand in Python.
+            models.Index(
+                fields=['first_month', 'last_month'],
+                condition=~models.Q(recurrence=MONTHLY),
+                name='budgetitem_recurring_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.owner} (${self.cost})"
 
+    # Fields whose changes affect monthly totals, line item snapshots or
+    # repeating links.
+    TRACKED_FIELDS = ('cost', 'owner_id', 'repeats', 'startdate', 'end_date') + RULE_FIELDS
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Override save to keep linked monthly instances in step with edits.
+
+        When cost, owner, dates, the repeats flag or the recurrence change,
+        the affected MonthlyInstance totals are adjusted by a signed delta
+        and repeating links are added to, removed from or recounted in the
+        months the item's occurrences move between, in the same transaction
+        as the save.
+        """
+        self.set_month_range()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(MONTH_RANGE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'first_month', 'last_month'}
+        if self._state.adding:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=self._state.db):
+                original = self._original_tracked_values()
+                super().save(*args, **kwargs)
+                if original is not None:
+                    self._sync_monthly_instances(original)
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def clean(self):
+        if self.recurrence == DAY_OF_MONTH and self.day_of_month is None:
+            raise ValidationError({'day_of_month': "Required when recurring monthly on a day."})
+
+    def set_month_range(self):
+        """Derive ``first_month`` and ``last_month`` from ``repeats``, the rule and the dates."""
+        self.first_month, self.last_month = item_month_range(
+            self.repeats, self.startdate, self.end_date, self.recurrence, self.interval, self.day_of_month
+        )
+
+    def recurrence_row(self):
+        """Return this item as a row for ``recurrence.expand``, keyed by its pk."""
+        return (self.pk, self.recurrence, self.interval, self.day_of_month, self.startdate, self.end_date)
+
+    def occurrences_in(self, month):
+        """Return how many times this item occurs in ``month``; a one-off item once, in the month it starts."""
+        if not self.repeats:
+            return int(month_ordinal(self.startdate) == month_ordinal(month))
+        return occurrence_counts([self.recurrence_row()], month).get(self.pk, 0)
+
+    def delete(self, *args, **kwargs):
+        """
+        Override delete to subtract this item's snapshot cost from the months it is linked to.
+        """
+        with transaction.atomic(using=self._state.db):
+            MonthlyLineItem.objects.filter(budget_item=self).discard()
+            return super().delete(*args, **kwargs)
+
+    def _original_tracked_values(self):
+        """
+        Return the tracked field values as currently stored in the database.
+
+        Uses the values captured when the instance was loaded, falling back
+        to a query for instances built by hand or loaded with deferred fields.
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        if all(name in loaded for name in self.TRACKED_FIELDS):
+            return loaded
+        return BudgetItem.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first()
+
+    @staticmethod
+    def _occurrences(values, months):
+        """
+        Return ``{month_id: occurrences}`` over ``months`` (``{ordinal: month_id}``) for tracked ``values``.
+
+        Empty for non-repeating items, which are never auto-linked.
+        """
+        if not values['repeats'] or not months:
+            return {}
+        row = (None, *(values[name] for name in RULE_FIELDS), values['startdate'], values['end_date'])
+        return {
+            months[ordinal]: count
+            for _, first, last, step, count in expand([row], min(months), max(months))
+            for ordinal in range(first, last + 1, step)
+            if ordinal in months
+        }
+
+    def _sync_monthly_instances(self, original):
+        """
+        Apply the change from ``original`` to the affected MonthlyInstance rows.
+
+        Line items in months before the current one keep their snapshot, so
+        cost edits only change the totals of the current and future months.
+        Changes to when the item occurs apply to every month.
+        """
+        cost = self._meta.get_field('cost').to_python(self.cost)
+        lines = MonthlyLineItem.objects.filter(budget_item=self)
+
+        if any(original[name] != value for name, value in (
+            ('cost', cost), ('owner_id', self.owner_id), ('repeats', self.repeats)
+        )):
+            lines.filter(
+                monthly_instance__month__gte=month_start(timezone.localdate())
+            ).refresh_snapshots(adjust_totals=True)
+
+        current = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+        schedule = ('repeats', 'startdate', 'end_date') + RULE_FIELDS
+        if all(original[name] == current[name] for name in schedule):
+            return
+
+        # Existing months either version of the item occurs in.
+        ranges = [
+            item_month_range(*(values[name] for name in schedule))
+            for values in (original, current) if values['repeats']
+        ]
+        ranges = [(first, last) for first, last in ranges if first <= last]
+        if not ranges:
+            months = {}
+        else:
+            months = MonthlyInstance.objects.filter(
+                month__gte=ordinal_to_month(min(first for first, _ in ranges)),
+                month__lte=ordinal_to_month(max(last for _, last in ranges))
+            ).values_list('month', 'id')
+            months = {month_ordinal(month): month_id for month, month_id in months}
+        old = self._occurrences(original, months)
+        new = self._occurrences(current, months)
+        if old == new:
+            return
+        linked = dict(lines.values_list('monthly_instance_id', 'occurrences'))
+
+        # Months the item no longer occurs in lose the link and its cost.
+        leaving_ids = [month_id for month_id in old.keys() - new.keys() if month_id in linked]
+        if leaving_ids:
+            lines.filter(monthly_instance_id__in=leaving_ids).discard()
+
+        # Months it still occurs in, a different number of times, are
+        # recosted.
+        recounted = {}
+        for month_id in old.keys() & new.keys():
+            if month_id in linked and linked[month_id] != new[month_id]:
+                recounted.setdefault(new[month_id], []).append(month_id)
+        for count, month_ids in recounted.items():
+            lines.filter(monthly_instance_id__in=month_ids).update(occurrences=count)
+        if recounted:
+            lines.filter(
+                monthly_instance_id__in=[month_id for month_ids in recounted.values() for month_id in month_ids]
+            ).refresh_snapshots(adjust_totals=True)
+
+        # Months it starts occurring in gain the link and its cost as of
+        # that month.
+        entering_ids = [month_id for month_id in new.keys() - old.keys() if month_id not in linked]
+        if entering_ids:
+            MonthlyLineItem.objects.bulk_create([
+                MonthlyLineItem.for_item(
+                    self, monthly_instance_id=month_id, cost=Decimal('0.00'), occurrences=new[month_id]
+                )
+                for month_id in sorted(entering_ids)
+            ])
+            entering_lines = lines.filter(monthly_instance_id__in=entering_ids)
+            entering_lines.refresh_snapshots()
+            entering_lines._adjust_month_totals(models.F('cost_snapshot'))
+
+
+class BudgetItemCostPeriodQuerySet(models.QuerySet):
+    """
+    QuerySet for budget item cost periods.
+    """
+
+    def schedules(self):
+        """
+        Return ``{item_id: [(first_ordinal, cost), ...]}`` for the periods in this queryset.
+
+        ``first_ordinal`` is the first month ordinal the period applies to
+        and each item's list is sorted by it, ready for ``cost_segments``.
+        Reads everything in one query.
+        """
+        schedules = {}
+        rows = self.order_by('budget_item_id', 'effective_from').values_list(
+            'budget_item_id', 'effective_from', 'cost'
+        )
+        for item_id, effective_from, cost in rows.iterator(chunk_size=10000):
+            schedules.setdefault(item_id, []).append((first_active_ordinal(effective_from), cost))
+        return schedules
+
+
+def cost_segments(base_cost, schedule, first, last):
+    """
+    Split the month ordinals ``first``..``last`` into ``(first, last, cost)`` runs.
+
+    ``base_cost`` applies until the first entry of ``schedule`` (as returned
+    by ``BudgetItemCostPeriodQuerySet.schedules``) takes effect.
+    """
+    cost = base_cost
+    start = first
+    for effective, period_cost in schedule or ():
+        if effective > last:
+            break
+        if effective > start:
+            yield start, effective - 1, cost
+            start = effective
+        cost = period_cost
+    if start <= last:
+        yield start, last, cost
+
+
+class BudgetItemCostPeriod(models.Model):
+    """
+    Model for effective-dated cost changes of a budget item.
+
+    ``BudgetItem.cost`` applies from the item's start date; each period
+    replaces it from ``effective_from`` onwards, until the next period.
+    """
+    budget_item = models.ForeignKey(
+        BudgetItem,
+        on_delete=models.CASCADE,
+        related_name='cost_periods'
+    )
+    effective_from = models.DateField(
+        help_text="Date from which this cost applies (months on or after this date)"
+    )
+    cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text="Monetary amount from the effective date (minimum $0.01)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BudgetItemCostPeriodQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['budget_item', 'effective_from']
+        verbose_name = "Budget Item Cost Period"
+        verbose_name_plural = "Budget Item Cost Periods"
+        unique_together = ['budget_item', 'effective_from']
+        indexes = [
+            # Covers as-of lookups (latest effective_from <= month per item).
+            models.Index(
+                fields=['budget_item', 'effective_from', 'cost'],
+                name='costperiod_asof_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_item.name} from {self.effective_from}: ${self.cost}"
+
+    def save(self, *args, **kwargs):
+        """
+        Override save to re-resolve line item costs from the earliest affected month.
+        """
+        with transaction.atomic(using=self._state.db):
+            previous = None
+            if not self._state.adding:
+                previous = BudgetItemCostPeriod.objects.filter(pk=self.pk).values_list(
+                    'effective_from', flat=True
+                ).first()
+            super().save(*args, **kwargs)
+            self._refresh_line_items(min(filter(None, [previous, self.effective_from])))
+
+    def delete(self, *args, **kwargs):
+        """
+        Override delete to re-resolve line item costs the period applied to.
+        """
+        with transaction.atomic(using=self._state.db):
+            result = super().delete(*args, **kwargs)
+            self._refresh_line_items(self.effective_from)
+            return result
+
+    def _refresh_line_items(self, effective_from):
+        MonthlyLineItem.objects.filter(
+            budget_item_id=self.budget_item_id,
+            monthly_instance__month__gte=effective_from
+        ).refresh_snapshots(adjust_totals=True)
+
+
+def _insert_rows(using, model, columns, rows, batch_size):
+    """
+    Insert rows of ``model`` given as tuples of values for ``columns``.
+
+    Uses ``executemany`` on plain tuples: building a model instance per
+    row for ``bulk_create`` and preparing every value through its field
+    costs tens of microseconds a row, which dominates when writing
+    millions of rows. Values must already be in their database form.
+    Returns the number of rows inserted.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(opts.db_table),
+        ', '.join(quote(opts.get_field(name).column) for name in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    metrics.rows_written.inc(count, model=opts.model_name, operation='insert')
+    return count
+
+
+# Column order of the row tuples passed to MonthlyInstanceQuerySet._insert_line_items.
+LINE_ITEM_COLUMNS = ('monthly_instance', 'budget_item', 'cost_snapshot', 'owner', 'repeats', 'occurrences')
+
+
+class MonthlyInstanceQuerySet(models.QuerySet):
+    """
+    QuerySet for monthly instances with bulk generation helpers.
+    """
+
+    @metrics.month_generate_seconds.time()
+    def bulk_generate(self, start, end, batch_size=10000):
+        """
+        Create a MonthlyInstance for every missing month from ``start`` to ``end``.
+
+        The occurrences of repeating items in every month are expanded in
+        memory (see ``recurrence.expand``) from a single query, instances are inserted with ``bulk_create`` (totals
+        already filled in) and the line items are written in batches of
+        ``batch_size``, all inside one transaction. Months that already exist
+        are left untouched. Returns the list of created instances.
+        """
+        months = month_range(start, end)
+        if not months:
+            return []
+        existing = set(
+            self.filter(month__gte=months[0], month__lte=months[-1])
+            .values_list('month', flat=True)
+        )
+        months = [month for month in months if month not in existing]
+        if not months:
+            return []
+
+        base = month_ordinal(months[0])
+        span = month_ordinal(months[-1]) - base + 1
+
+        # Repeating items occurring in at least one of the requested months,
+        # split into runs of constant cost and occurrences as (id, amount,
+        # owner, first, last, step, occurrences) with first/last offsets
+        # into the span and amount the cost of all the month's occurrences.
+        candidates = BudgetItem.objects.filter(repeats=True).overlapping(months[0], months[-1]).order_by()
+        schedules = BudgetItemCostPeriod.objects.filter(
+            budget_item__in=candidates,
+            effective_from__lte=months[-1]
+        ).schedules()
+        rows = candidates.values_list('id', 'cost', 'owner__name', *RULE_FIELDS, 'startdate', 'end_date')
+        items = []
+        for (item_id, cost, owner), first, last, step, count in expand(
+            ((row[:3], *row[3:]) for row in rows.iterator(chunk_size=batch_size)), base, base + span - 1
+        ):
+            for run_first, run_last, run_cost in cost_segments(cost, schedules.get(item_id), first, last):
+                run = align(first, step, run_first, run_last)
+                if run is not None:
+                    items.append((item_id, run_cost * count, owner, run[0] - base, run[1] - base, step, count))
+
+        # Strided difference arrays over the span give every month's total
+        # in O(runs + months).
+        totals = run_totals(
+            ((first, last, step, amount) for _, amount, _, first, last, step, _ in items), span, Decimal('0')
+        )
+
+        with transaction.atomic(using=self.db):
+            instances = self.bulk_create(
+                [
+                    self.model(
+                        month=month,
+                        total_amount=totals[month_ordinal(month) - base].quantize(Decimal('0.01'))
+                    )
+                    for month in months
+                ],
+                batch_size=batch_size
+            )
+            pk_at = [None] * span
+            for instance in instances:
+                pk_at[month_ordinal(instance.month) - base] = instance.pk
+            # Emit rows month by month in item id order so inserts append to
+            # the line item (monthly_instance_id, budget_item_id) index.
+            items_at = [[] for _ in range(span)]
+            for item in sorted(items):
+                for offset in range(item[3], item[4] + 1, item[5]):
+                    items_at[offset].append(item)
+            rows = (
+                (pk_at[offset], item_id, amount, owner, True, count)
+                for offset in range(span)
+                if pk_at[offset] is not None
+                for item_id, amount, owner, _, _, _, count in items_at[offset]
+            )
+            self._insert_line_items(rows, batch_size)
+            OwnerMonthSummary.objects.insert_from_lines([instance.pk for instance in instances])
+        metrics.months_generated.inc(len(instances))
+        months_changed.send(sender=self.model, months=months)
+        return instances
+
+    def link_new_items(self, items, batch_size=10000):
+        """
+        Link newly created repeating ``items`` into the months of this queryset they occur in.
+
+        The items must not have line items or cost history yet, so every
+        line is snapshotted from the item itself, times its occurrences in
+        the month; select their owners with
+        ``select_related('owner')``. Lines are written with
+        ``_insert_line_items`` and the affected month totals are adjusted in
+        one UPDATE. Returns the number of line items created.
+        """
+        items = {item.pk: item for item in items if item.repeats}
+        if not items:
+            return 0
+        pk_at = {month_ordinal(month): pk for month, pk in self.values_list('month', 'pk')}
+        if not pk_at:
+            return 0
+        rows = []
+        runs = expand((item.recurrence_row() for item in items.values()), min(pk_at), max(pk_at))
+        for item_id, first, last, step, count in runs:
+            item = items[item_id]
+            rows.extend(
+                (pk_at[ordinal], item_id, item.cost * count, item.owner.name, True, count)
+                for ordinal in range(first, last + 1, step)
+                if ordinal in pk_at
+            )
+        if not rows:
+            return 0
+        # Month by month so inserts land together in the line item indexes.
+        rows.sort(key=lambda row: (row[0], row[1]))
+        with transaction.atomic(using=self.db):
+            self._insert_line_items(rows, batch_size)
+            lines = MonthlyLineItem.objects.filter(budget_item_id__in=list(items))
+            lines._adjust_month_totals(models.F('cost_snapshot'))
+            OwnerMonthSummary.objects.apply_lines(lines, 1)
+        month_of = {pk: ordinal_to_month(ordinal) for ordinal, pk in pk_at.items()}
+        months_changed.send(sender=self.model, months={month_of[row[0]] for row in rows})
+        return len(rows)
+
+    def recompute_totals(self, batch_size=1000):
+        """
+        Recompute the stored total of every month in this queryset from its line items.
+
+        The line item snapshots of all the months are summed in one grouped
+        query and only months whose stored total differs are written back,
+        with ``bulk_update``, so running it again writes nothing. Returns
+        the number of months whose total changed.
+        """
+        sums = dict(
+            MonthlyLineItem.objects.using(self.db)
+            .filter(monthly_instance__in=self.values('pk'))
+            .order_by()
+            .values('monthly_instance')
+            .annotate(total=Sum('cost_snapshot'))
+            .values_list('monthly_instance', 'total')
+        )
+        now = timezone.now()
+        changed = []
+        for instance in self.only('id', 'month', 'total_amount'):
+            total = (sums.get(instance.pk) or Decimal('0')).quantize(Decimal('0.01'))
+            if instance.total_amount != total:
+                instance.total_amount = total
+                instance.updated_at = now
+                changed.append(instance)
+        if changed:
+            with transaction.atomic(using=self.db):
+                self.model.objects.using(self.db).bulk_update(
+                    changed, ['total_amount', 'updated_at'], batch_size=batch_size
+                )
+            metrics.rows_written.inc(len(changed), model=self.model._meta.model_name, operation='update')
+            months_changed.send(sender=self.model, months=[instance.month for instance in changed])
+        return len(changed)
+
+    @staticmethod
+    def line_total():
+        """
+        Return an expression for the sum of a month's line item snapshots, 0.00 without any.
+
+        A correlated subquery rather than a grouped join, so an ordered and
+        sliced queryset only sums the months it returns.
+        """
+        total = MonthlyLineItem.objects.filter(
+            monthly_instance=models.OuterRef('pk')
+        ).order_by().values('monthly_instance').annotate(total=Sum('cost_snapshot')).values('total')
+        return Coalesce(
+            models.Subquery(total), Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+
+    def with_line_total(self):
+        """
+        Annotate ``line_total``, to compare against the denormalised ``total_amount``.
+        """
+        return self.annotate(line_total=self.line_total())
+
+    def refresh_totals(self, chunk_months=None):
+        """
+        Set the total of every month in this queryset from its line items in one UPDATE.
+
+        ``total_amount`` is assigned a correlated ``SUM`` subquery, so line
+        items and totals are never loaded into Python; only the month dates
+        are read, for ``months_changed``. Every matched row is written,
+        whether or not its total changed. With ``chunk_months`` the months
+        are updated in separate statements covering that many of the
+        existing months each, which bounds how long one write holds the
+        lock on SQLite. Returns the number of months updated.
+        """
+        values = {'total_amount': self.line_total(), 'updated_at': timezone.now()}
+        months = list(self.order_by('month').values_list('month', flat=True))
+        if not months:
+            return 0
+        if chunk_months is None:
+            updated = self.update(**values)
+        else:
+            updated = 0
+            for start in range(0, len(months), chunk_months):
+                chunk = months[start:start + chunk_months]
+                updated += self.filter(month__gte=chunk[0], month__lte=chunk[-1]).update(**values)
+        metrics.rows_written.inc(updated, model=self.model._meta.model_name, operation='update')
+        months_changed.send(sender=self.model, months=months)
+        return updated
+
+    def _insert_line_items(self, rows, batch_size):
+        """
+        Insert MonthlyLineItem rows given as tuples of ``LINE_ITEM_COLUMNS`` values.
+        """
+        _insert_rows(self.db, MonthlyLineItem, LINE_ITEM_COLUMNS, rows, batch_size)
+
 
 class MonthlyInstance(models.Model):
     """
@@ -55,6 +900,7 @@ class MonthlyInstance(models.Model):
     )
     budget_items = models.ManyToManyField(
         BudgetItem,
+        through='MonthlyLineItem',
         blank=True,
         help_text="Budget items included in this month"
     )
@@ -71,6 +917,8 @@ class MonthlyInstance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MonthlyInstanceQuerySet.as_manager()
+
     class Meta:
         ordering = ['-month']
         verbose_name = "Monthly Instance"
@@ -80,45 +928,404 @@ class MonthlyInstance(models.Model):
     def __str__(self):
         return f"{self.month.strftime('%B %Y')} - Total: ${self.total_amount}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets cache invalidation find the old month when the month is edited.
+        if 'month' in field_names:
+            instance._loaded_month = values[field_names.index('month')]
+        return instance
+
+    @metrics.month_total_seconds.time()
     def calculate_total(self):
         """
         Calculate the total amount for all budget items in this month.
+
+        The sum is computed by the database over the line item cost
+        snapshots and only ``total_amount`` and ``updated_at`` are written back.
         """
-        total = sum((item.cost for item in self.budget_items.all()), Decimal('0.00'))
+        total = self.line_items.aggregate(total=Sum('cost_snapshot'))['total'] or Decimal('0')
+        total = total.quantize(Decimal('0.01'))
         self.total_amount = total
-        self.save()
+        self.save(update_fields=['total_amount', 'updated_at'])
         return total
     
+    def owner_breakdown(self):
+        """
+        Return a dict mapping each owner to their total for this month.
+
+        Read from the owner summaries, so the cost is O(owners) however many
+        items the month has.
+        """
+        return dict(self.owner_summaries.values_list('owner', 'total'))
+    
+    @metrics.month_populate_seconds.time()
     def auto_populate_repeating_items(self):
         """
         Auto-populate this monthly instance with active repeating budget items.
         
         Adds budget items that:
         - Have repeats=True
-        - Have startdate <= this month
-        - Have no end_date OR end_date >= this month (not expired)
+        - Occur in this month by their recurrence, between startdate and
+          end_date (see BudgetItemQuerySet.active_in)
+        Each is costed for its number of occurrences in the month.
         """
-        # Get all repeating budget items that should be active for this month
-        active_repeating_items = BudgetItem.objects.filter(
-            repeats=True,
-            startdate__lte=self.month
-        ).filter(
-            models.Q(end_date__isnull=True) | models.Q(end_date__gte=self.month)
-        )
-        
-        # Add these items to this monthly instance
-        self.budget_items.set(active_repeating_items)
+        # Get all repeating budget items that occur in this month
+        occurrences = BudgetItem.objects.occurrences_in(self.month)
+        metrics.month_populate_items.inc(len(occurrences))
         
-        # Calculate the total amount for the auto-populated items
-        self.calculate_total()
+        # Make them this month's items and store the total
+        self.apply_selection(occurrences, occurrences=occurrences)
     
-    def save(self, *args, **kwargs):
+    def apply_selection(self, item_ids, occurrences=None):
+        """
+        Make the budget items with ``item_ids`` the items of this month.
+
+        Only the difference from the current items is written: dropped line
+        items are subtracted from the owner summaries and deleted, new ones
+        are inserted with their count in ``occurrences`` (``{item_id:
+        count}``, default 1) and snapshotted as of this month, and the total is then
+        recomputed once. Nothing beyond the read of the current items is
+        written when the selection is unchanged. Returns True if the items
+        changed.
+        """
+        item_ids = set(item_ids)
+        with transaction.atomic(using=self._state.db):
+            current = set(self.line_items.values_list('budget_item_id', flat=True))
+            removed = current - item_ids
+            added = item_ids - current
+            if removed:
+                lines = self.line_items.filter(budget_item_id__in=removed)
+                OwnerMonthSummary.objects.apply_lines(lines, -1)
+                lines.delete()
+                metrics.rows_written.inc(len(removed), model='monthlylineitem', operation='delete')
+            if added:
+                # Placeholder snapshots, filled in by refresh_snapshots().
+                MonthlyInstance.objects.using(self._state.db)._insert_line_items(
+                    (
+                        (self.pk, item_id, Decimal('0.00'), '', False, (occurrences or {}).get(item_id) or 1)
+                        for item_id in sorted(added)
+                    ),
+                    batch_size=10000
+                )
+                lines = self.line_items.all()
+                if current:
+                    lines = lines.filter(budget_item_id__in=added)
+                lines.refresh_snapshots()
+            if removed or added:
+                self.calculate_total()
+        return bool(removed or added)
+    
+    def save(self, *args, auto_populate=True, **kwargs):
         """
         Override save to auto-populate repeating items for new instances.
+
+        Pass ``auto_populate=False`` when the caller applies a selection that
+        already includes them, as the admin form does.
         """
         is_new = self.pk is None
         super().save(*args, **kwargs)
         
         # Only auto-populate for new instances
-        if is_new:
+        if is_new and auto_populate:
             self.auto_populate_repeating_items()
+
+
+class MonthlyLineItemQuerySet(models.QuerySet):
+    """
+    QuerySet for monthly line items.
+    """
+
+    @staticmethod
+    def as_of_cost():
+        """
+        Return an expression for each line's item cost as of the line's month.
+
+        Resolves to the latest BudgetItemCostPeriod effective on or before
+        the month, falling back to ``BudgetItem.cost``.
+        """
+        month = MonthlyInstance.objects.filter(
+            pk=models.OuterRef(models.OuterRef('monthly_instance_id'))
+        ).values('month')[:1]
+        period = BudgetItemCostPeriod.objects.filter(
+            budget_item_id=models.OuterRef('budget_item_id'),
+            effective_from__lte=models.Subquery(month)
+        ).order_by('-effective_from').values('cost')[:1]
+        base = BudgetItem.objects.filter(pk=models.OuterRef('budget_item_id')).values('cost')[:1]
+        return Coalesce(
+            models.Subquery(period),
+            models.Subquery(base),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+
+    @staticmethod
+    def snapshot_cost():
+        """Return an expression for each line's snapshot: its item's ``as_of_cost()`` times its occurrences."""
+        return models.ExpressionWrapper(
+            MonthlyLineItemQuerySet.as_of_cost() * models.F('occurrences'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+
+    def refresh_snapshots(self, adjust_totals=False):
+        """
+        Re-copy cost (as of each line's month, times its occurrences), owner and repeats from the budget items.
+
+        With ``adjust_totals`` the month totals are first shifted by the
+        difference between the new and old cost snapshots, and the lines
+        move from their old to their new owner summaries. Without it the
+        lines are treated as newly linked: totals are left to the caller and
+        the lines are only added to the owner summaries.
+        """
+        self._send_months_changed()
+        if adjust_totals:
+            self._adjust_month_totals(self.snapshot_cost() - models.F('cost_snapshot'))
+            OwnerMonthSummary.objects.apply_lines(self, -1)
+        item = BudgetItem.objects.filter(pk=models.OuterRef('budget_item_id'))
+        updated = self.update(
+            cost_snapshot=self.snapshot_cost(),
+            owner=models.Subquery(item.values('owner__name')[:1]),
+            repeats=models.Subquery(item.values('repeats')[:1]),
+        )
+        OwnerMonthSummary.objects.apply_lines(self, 1)
+        return updated
+
+    def discard(self):
+        """
+        Delete these line items and subtract them from their months' totals and owner summaries.
+        """
+        self._send_months_changed()
+        self._adjust_month_totals(-models.F('cost_snapshot'))
+        OwnerMonthSummary.objects.apply_lines(self, -1)
+        return self.delete()
+
+    def _send_months_changed(self):
+        """
+        Send ``months_changed`` for the months of these lines, if anyone is listening.
+        """
+        if not months_changed.has_listeners(MonthlyInstance):
+            return
+        months = MonthlyInstance.objects.using(self.db).filter(
+            pk__in=self.values('monthly_instance_id')
+        ).values_list('month', flat=True)
+        months_changed.send(sender=MonthlyInstance, months=list(months))
+
+    def _adjust_month_totals(self, delta):
+        """
+        Add the per-month sum of ``delta`` over these lines to each month's total.
+        """
+        per_month = self.filter(
+            monthly_instance=models.OuterRef('pk')
+        ).order_by().values('monthly_instance').annotate(
+            delta=Sum(delta)
+        ).values('delta')
+        MonthlyInstance.objects.using(self.db).filter(
+            pk__in=self.values('monthly_instance_id')
+        ).update(
+            total_amount=models.ExpressionWrapper(
+                models.F('total_amount') + models.Subquery(per_month),
+                output_field=models.DecimalField()
+            ),
+            updated_at=timezone.now()
+        )
+
+
+class MonthlyLineItem(models.Model):
+    """
+    Through model linking a budget item to a month.
+
+    Cost (as of the month, see BudgetItemCostPeriod, times the item's
+    occurrences in the month), owner name and repeats
+    are copied from the item when it is linked, so
+    month totals and owner breakdowns are computed from this table alone and
+    historical months keep the cost they were budgeted at.
+    """
+    monthly_instance = models.ForeignKey(
+        MonthlyInstance,
+        on_delete=models.CASCADE,
+        related_name='line_items'
+    )
+    budget_item = models.ForeignKey(
+        BudgetItem,
+        on_delete=models.CASCADE,
+        related_name='line_items'
+    )
+    cost_snapshot = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Cost of the budget item when it was linked to this month"
+    )
+    owner = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Owner of the budget item when it was linked to this month"
+    )
+    repeats = models.BooleanField(
+        default=False,
+        help_text="Whether the budget item was repeating when it was linked"
+    )
+    occurrences = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="Times the budget item occurs in this month; the snapshot covers all of them"
+    )
+
+    objects = MonthlyLineItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Monthly Line Item"
+        verbose_name_plural = "Monthly Line Items"
+        unique_together = ['monthly_instance', 'budget_item']
+        indexes = [
+            # Covers totals and owner breakdowns for a month without
+            # touching the table itself.
+            models.Index(
+                fields=['monthly_instance', 'owner', 'cost_snapshot'],
+                name='lineitem_month_owner_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.monthly_instance} - {self.budget_item}"
+
+    @classmethod
+    def for_item(cls, item, cost=None, **kwargs):
+        """
+        Build an unsaved line item for ``item`` with its snapshot fields filled in.
+        """
+        return cls(
+            budget_item_id=item.pk,
+            cost_snapshot=item.cost if cost is None else cost,
+            owner=item.owner.name,
+            repeats=item.repeats,
+            **kwargs
+        )
+
+
+class OwnerMonthSummaryQuerySet(models.QuerySet):
+    """
+    QuerySet for owner summaries with incremental and bulk maintenance.
+    """
+
+    def apply_lines(self, lines, sign):
+        """
+        Add (``sign=1``) or subtract (``sign=-1``) MonthlyLineItem queryset ``lines`` to the summaries.
+
+        The lines are grouped by month and owner in the database, so the
+        work grows with the number of groups touched rather than with the
+        size of the months. Summaries left with no items are deleted.
+        """
+        deltas = {
+            (month_id, owner): (total * sign, count * sign)
+            for month_id, owner, total, count in lines.order_by().values(
+                'monthly_instance_id', 'owner'
+            ).annotate(
+                total=Sum('cost_snapshot'), count=Count('pk')
+            ).values_list('monthly_instance_id', 'owner', 'total', 'count')
+        }
+        if not deltas:
+            return
+        existing = {
+            (summary.monthly_instance_id, summary.owner): summary
+            for summary in self.filter(
+                monthly_instance_id__in={month_id for month_id, _ in deltas},
+                owner__in={owner for _, owner in deltas}
+            )
+        }
+        created, updated = [], []
+        for (month_id, owner), (total, count) in deltas.items():
+            summary = existing.get((month_id, owner))
+            if summary is None:
+                summary = self.model(monthly_instance_id=month_id, owner=owner)
+                created.append(summary)
+            else:
+                updated.append(summary)
+            summary.total = (summary.total + total).quantize(Decimal('0.01'))
+            summary.item_count += count
+        emptied = [summary.pk for summary in updated if summary.item_count <= 0]
+        if emptied:
+            self.filter(pk__in=emptied).delete()
+        self.bulk_update([summary for summary in updated if summary.item_count > 0], ['total', 'item_count'])
+        self.bulk_create([summary for summary in created if summary.item_count > 0])
+
+    def rebuild(self, months=None):
+        """
+        Recompute the summaries of ``months`` (a MonthlyInstance queryset, default all) from their line items.
+
+        Deletes the existing rows and refills them with a single
+        ``INSERT ... SELECT ... GROUP BY``. Returns the number of rows written.
+        """
+        summaries = self.all()
+        if months is not None:
+            summaries = summaries.filter(monthly_instance__in=months)
+        with transaction.atomic(using=self.db):
+            summaries.delete()
+            return self.insert_from_lines(months)
+
+    def insert_from_lines(self, months=None):
+        """
+        Insert summaries for ``months`` grouped from their line items, assuming there are none yet.
+
+        The grouping is served by ``lineitem_month_owner_idx`` without
+        reading the line item table itself.
+        """
+        lines = MonthlyLineItem.objects.using(self.db)
+        if months is not None:
+            lines = lines.filter(monthly_instance__in=months)
+        grouped = lines.order_by().values('monthly_instance_id', 'owner').annotate(
+            total=Sum('cost_snapshot'), count=Count('pk')
+        ).values_list('monthly_instance_id', 'owner', 'total', 'count')
+        select, params = grouped.query.sql_with_params()
+
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        sql = 'INSERT INTO {} ({}) {}'.format(
+            quote(opts.db_table),
+            ', '.join(quote(opts.get_field(name).column) for name in (
+                'monthly_instance', 'owner', 'total', 'item_count'
+            )),
+            select,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+
+class OwnerMonthSummary(models.Model):
+    """
+    Spend and item count per owner per month, derived from the line items.
+
+    Kept in step by every path that writes MonthlyLineItem rows, so owner
+    reports read O(owners x months) rows instead of grouping all links.
+    ``manage.py rebuild_owner_summaries`` recomputes it from scratch.
+    """
+    monthly_instance = models.ForeignKey(
+        MonthlyInstance,
+        on_delete=models.CASCADE,
+        related_name='owner_summaries'
+    )
+    owner = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Owner snapshot of the line items summarised"
+    )
+    total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Sum of the owner's line item costs in this month"
+    )
+    item_count = models.IntegerField(
+        default=0,
+        help_text="Number of the owner's line items in this month"
+    )
+
+    objects = OwnerMonthSummaryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Owner Month Summary"
+        verbose_name_plural = "Owner Month Summaries"
+        unique_together = ['monthly_instance', 'owner']
+
+    def __str__(self):
+        return f"{self.owner} - {self.monthly_instance.month:%B %Y}: ${self.total}"
@@ -0,0 +1,66 @@
+"""
+Helpers for working with months.
+
+Months are represented as ``date`` objects on the first day of the month,
+matching ``MonthlyInstance.month``. Month ordinals (``year * 12 + month - 1``)
+are used wherever many months need to be compared or indexed cheaply.
+"""
+from datetime import date
+
+
+def month_start(value):
+    """Return the first day of the month containing ``value``."""
+    return value.replace(day=1)
+
+
+def month_ordinal(value):
+    """Return the month ordinal of the month containing ``value``."""
+    return value.year * 12 + value.month - 1
+
+
+def ordinal_to_month(ordinal):
+    """Return the first day of the month with the given ordinal."""
+    year, month = divmod(ordinal, 12)
+    return date(year, month + 1, 1)
+
+
+def month_range(start, end):
+    """Return the first day of every month from ``start`` to ``end`` inclusive."""
+    return [
+        ordinal_to_month(ordinal)
+        for ordinal in range(month_ordinal(start), month_ordinal(end) + 1)
+    ]
+
+
+def parse_month(value):
+    """Parse a ``YYYY-MM`` (or ``YYYY-MM-DD``) string into the first day of that month."""
+    parts = value.split('-')
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+    return date(int(parts[0]), int(parts[1]), 1)
+
+
+def first_active_ordinal(startdate):
+    """
+    Return the first month ordinal in which an item starting on ``startdate`` is active.
+
+    Months are active once ``startdate <= month`` (the first day of the month),
+    so an item starting mid-month first appears in the following month.
+    """
+    ordinal = month_ordinal(startdate)
+    return ordinal if startdate.day == 1 else ordinal + 1
+
+
+def last_active_ordinal(end_date):
+    """
+    Return the last month ordinal in which an item ending on ``end_date`` is active.
+
+    Returns ``None`` for open-ended items.
+    """
+    return None if end_date is None else month_ordinal(end_date)
+
+
+# ``last_month`` of open-ended items: the ordinal of December 9999, after
+# every representable month.
+OPEN_ENDED_MONTH = month_ordinal(date.max)
+
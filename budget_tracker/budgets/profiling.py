@@ -0,0 +1,147 @@
+"""
+On-demand cProfile captures of single requests and management commands.
+
+A capture is one ``.prof`` file in ``BUDGETS_PROFILE_DIR`` (default
+``BASE_DIR / 'profiles'``), readable with ``pstats``, snakeviz and the
+like. Only the newest ``BUDGETS_PROFILE_KEEP`` captures are kept.
+
+Captures are triggered by:
+
+* a staff user's request carrying ``?_profile=1`` or an ``X-Profile: 1``
+  header, through ``budgets.middleware.ProfilingMiddleware``;
+* ``--profile`` on the budgets management commands built on
+  ``ProfiledCommand``.
+
+The admin lists recent captures with their top cumulative functions at
+``admin/budgets/monthlyinstance/profiles/``.
+"""
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+PROFILE_SUFFIX = '.prof'
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+# Held while a capture is being taken.
+_capturing = threading.Lock()
+
+
+def profile_dir():
+    return Path(getattr(settings, 'BUDGETS_PROFILE_DIR', None) or Path(settings.BASE_DIR) / 'profiles')
+
+
+class Capture:
+    """A profile file; ``label`` is what was profiled."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        # Files are named <timestamp>_<label>.prof.
+        self.label = self.path.stem.partition('_')[2]
+
+    @property
+    def created_at(self):
+        return datetime.fromtimestamp(self.path.stat().st_mtime, tz=timezone.get_current_timezone())
+
+    @property
+    def size(self):
+        return self.path.stat().st_size
+
+    def top_functions(self, limit=30, sort='cumulative'):
+        """Return the ``pstats`` report of the ``limit`` top functions as text."""
+        out = io.StringIO()
+        stats = pstats.Stats(str(self.path), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def recent_captures(limit=None):
+    """Return the captures in the profile directory, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    paths = sorted(directory.glob(f'*{PROFILE_SUFFIX}'), reverse=True)
+    return [Capture(path) for path in paths[:limit]]
+
+
+def get_capture(name):
+    """Return the capture called ``name``, or None if there is none."""
+    if _UNSAFE.search(name) or not name.endswith(PROFILE_SUFFIX):
+        return None
+    path = profile_dir() / name
+    return Capture(path) if path.is_file() else None
+
+
+@contextmanager
+def profile(label):
+    """
+    Profile the block and write it to a new capture.
+
+    Yields a list that holds the ``Capture`` once the block exits, also when
+    it raises. Since Python 3.12 a process can run one profiler at a time,
+    so captures are serialised: the list stays empty, and the block runs
+    unprofiled, while another capture or profiling tool is active.
+    """
+    result = []
+    if not _capturing.acquire(blocking=False):
+        yield result
+        return
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active.
+            yield result
+            return
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            directory = profile_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            now = time.time()
+            stamp = time.strftime('%Y%m%dT%H%M%S', time.localtime(now)) + f'.{int(now % 1 * 1e6):06d}'
+            path = directory / f"{stamp}_{_UNSAFE.sub('-', label).strip('-')[:80]}{PROFILE_SUFFIX}"
+            profiler.dump_stats(path)
+            for old in recent_captures()[getattr(settings, 'BUDGETS_PROFILE_KEEP', 50):]:
+                old.path.unlink(missing_ok=True)
+            result.append(Capture(path))
+    finally:
+        _capturing.release()
+
+
+class ProfiledCommand(BaseCommand):
+    """
+    Management command base class adding a ``--profile`` option.
+    """
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help="Write a cProfile capture of this run to the profile directory",
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        if not options.get('profile'):
+            return super().execute(*args, **options)
+        with profile(f"command {self.__module__.rpartition('.')[2]}") as result:
+            output = super().execute(*args, **options)
+        if result:
+            self.stderr.write(f"Profile written to {result[0].path}")
+        else:
+            self.stderr.write("Not profiled: another profiler is active")
+        return output
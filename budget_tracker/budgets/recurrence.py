@@ -0,0 +1,193 @@
+"""
+Recurrence rules of budget items and their expansion into months.
+
+A repeating item recurs by its ``recurrence`` between ``startdate`` and
+``end_date`` (inclusive; open-ended without one). Every occurrence costs
+the item's cost as of its month, so an item's amount in a month is that
+cost times its occurrences in the month (``MonthlyLineItem.occurrences``).
+
+- Month rules occur on the first of the month, every month (``monthly``,
+  the rule of every repeating item before recurrences were added), every
+  three (``quarterly``), twelve (``annual``) or ``interval``
+  (``every_n_months``) months from the first month starting on or after
+  ``startdate``.
+- ``day_of_month`` occurs every month on ``day_of_month``, or on the last
+  day of shorter months.
+- Day rules occur every 7 (``weekly``) or 14 (``fortnightly``) days from
+  ``startdate``.
+
+``expand()`` computes the occurrences of many items over a window of
+months at once without stepping through dates: a month rule reduces to a
+first month, last month and stride by integer arithmetic on month
+ordinals, and a day rule's occurrences per month are differences of its
+cumulative count evaluated at the day numbers of the month boundaries,
+which are computed once for the whole window.
+"""
+import calendar
+from datetime import date
+
+from .months import OPEN_ENDED_MONTH, month_ordinal, ordinal_to_month
+
+
+MONTHLY = 'monthly'
+DAY_OF_MONTH = 'day_of_month'
+QUARTERLY = 'quarterly'
+ANNUAL = 'annual'
+EVERY_N_MONTHS = 'every_n_months'
+WEEKLY = 'weekly'
+FORTNIGHTLY = 'fortnightly'
+
+RECURRENCE_CHOICES = [
+    (MONTHLY, 'Monthly'),
+    (DAY_OF_MONTH, 'Monthly on a day'),
+    (QUARTERLY, 'Quarterly'),
+    (ANNUAL, 'Annually'),
+    (EVERY_N_MONTHS, 'Every N months'),
+    (WEEKLY, 'Weekly'),
+    (FORTNIGHTLY, 'Fortnightly'),
+]
+
+# BudgetItem fields making up a rule, in the order ``expand`` takes them.
+RULE_FIELDS = ('recurrence', 'interval', 'day_of_month')
+
+MONTH_STEPS = {MONTHLY: 1, DAY_OF_MONTH: 1, QUARTERLY: 3, ANNUAL: 12}
+DAY_PERIODS = {WEEKLY: 7, FORTNIGHTLY: 14}
+
+
+def month_step(recurrence, interval):
+    """Return the months between occurrences of a month rule, or ``None`` for a day rule."""
+    if recurrence == EVERY_N_MONTHS:
+        return max(interval or 1, 1)
+    return MONTH_STEPS.get(recurrence)
+
+
+def _day_in(ordinal, day):
+    """Return ``day`` clamped to the length of the month with ``ordinal``."""
+    if day == 1:
+        return 1
+    year, month = divmod(ordinal, 12)
+    return min(day, calendar.monthrange(year, month + 1)[1])
+
+
+def item_month_range(repeats, startdate, end_date, recurrence=MONTHLY, interval=1, day_of_month=None):
+    """
+    Return ``(first, last)``, the month ordinals of an item's first and last occurrence.
+
+    A one-off item occurs once, in the month it starts in. A repeating item
+    without an end date has ``OPEN_ENDED_MONTH`` as last; for rules recurring
+    every few months it is otherwise the month of the last occurrence, so
+    ``last - first`` is a multiple of the step. ``first > last`` when the
+    item never occurs.
+    """
+    first = month_ordinal(startdate)
+    if not repeats:
+        return first, first
+    period = DAY_PERIODS.get(recurrence)
+    if period is not None:
+        if end_date is None:
+            return first, OPEN_ENDED_MONTH
+        if end_date < startdate:
+            return first, first - 1
+        last_day = startdate.toordinal() + (end_date.toordinal() - startdate.toordinal()) // period * period
+        return first, month_ordinal(date.fromordinal(last_day))
+
+    day = (day_of_month or 1) if recurrence == DAY_OF_MONTH else 1
+    if startdate.day > _day_in(first, day):
+        first += 1
+    if end_date is None:
+        return first, OPEN_ENDED_MONTH
+    last = month_ordinal(end_date)
+    if end_date.day < _day_in(last, day):
+        last -= 1
+    if last > first:
+        last -= (last - first) % month_step(recurrence, interval)
+    return first, last
+
+
+def expand(rows, first, last):
+    """
+    Yield the occurrences of repeating items in month ordinals ``first`` to ``last`` as runs.
+
+    ``rows`` are ``(key, recurrence, interval, day_of_month, startdate,
+    end_date)`` tuples. Each run is ``(key, run_first, run_last, step,
+    count)``: the item occurs ``count`` times in every ``step``-th month
+    from ``run_first`` to ``run_last``, which is ``run_first`` plus a
+    multiple of ``step``. Runs of one key never share a month, and months
+    without an occurrence are never in a run.
+    """
+    bounds = None
+    for key, recurrence, interval, day_of_month, startdate, end_date in rows:
+        item_first, item_last = item_month_range(True, startdate, end_date, recurrence, interval, day_of_month)
+        low, high = max(item_first, first), min(item_last, last)
+        if low > high:
+            continue
+        period = DAY_PERIODS.get(recurrence)
+        if period is None:
+            step = month_step(recurrence, interval)
+            months = align(item_first, step, low, high)
+            if months is not None:
+                yield key, *months, step, 1
+            continue
+
+        if bounds is None:
+            # Day numbers of the first of every month in the window and of
+            # the month after it.
+            bounds = [ordinal_to_month(ordinal).toordinal() for ordinal in range(first, last + 2)]
+        start = startdate.toordinal()
+        end = bounds[-1] if end_date is None else end_date.toordinal()
+        # Occurrences up to the day before each boundary; consecutive
+        # differences are the occurrences in each month.
+        seen = [
+            (min(day - 1, end) - start) // period + 1 if day > start else 0
+            for day in bounds[low - first:high - first + 2]
+        ]
+        counts = [after - before for before, after in zip(seen, seen[1:])]
+        run_start = 0
+        for offset in range(1, len(counts) + 1):
+            if offset == len(counts) or counts[offset] != counts[run_start]:
+                if counts[run_start]:
+                    yield key, low + run_start, low + offset - 1, 1, counts[run_start]
+                run_start = offset
+
+
+def occurrence_counts(rows, month):
+    """Return ``{key: occurrences}`` in ``month`` for ``rows`` as taken by ``expand``, without the keys not occurring."""
+    ordinal = month_ordinal(month)
+    return {key: count for key, _, _, _, count in expand(rows, ordinal, ordinal)}
+
+
+def align(run_first, step, first, last):
+    """
+    Return the part of a run starting at ``run_first`` that falls in ordinals ``first`` to ``last``.
+
+    Returns ``(first, last)`` moved onto the run's months, or ``None`` if
+    none of them is in range.
+    """
+    first += -(first - run_first) % step
+    if first > last:
+        return None
+    return first, last - (last - first) % step
+
+
+def run_totals(runs, span, zero=0):
+    """
+    Sum ``(first, last, step, amount)`` runs into a total for each offset ``0`` to ``span - 1``.
+
+    One difference array per distinct step is prefix-summed with that
+    stride, so the cost grows with the runs and the span rather than with
+    the number of occurrences.
+    """
+    deltas = {}
+    for first, last, step, amount in runs:
+        steps = deltas.get(step)
+        if steps is None:
+            steps = deltas[step] = [zero] * (span + step)
+        steps[first] += amount
+        steps[last + step] -= amount
+    totals = [zero] * span
+    for step, steps in deltas.items():
+        for offset in range(span):
+            if offset >= step:
+                steps[offset] += steps[offset - step]
+            totals[offset] += steps[offset]
+    return totals
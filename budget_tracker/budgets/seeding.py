@@ -0,0 +1,139 @@
+"""
+Deterministic synthetic data for measuring the budgets app at scale.
+
+``seed_dataset()`` writes owners, budget items and a run of
+MonthlyInstances with their line items through the bulk paths the app
+already has: ``BudgetItemQuerySet.insert_rows`` for items and
+``MonthlyInstanceQuerySet.bulk_generate`` for months. The same arguments
+and seed always produce the same rows.
+
+The mix is loosely modelled on a household or small team budget: most
+items repeat, some of those end or change cost part way through, and the
+rest are one-off purchases linked into the month they start in.
+"""
+import random
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+
+from .models import (
+    BudgetItem, BudgetItemCostPeriod, MonthlyInstance, MonthlyLineItem, Owner,
+    OwnerMonthSummary, months_changed
+)
+from .months import month_ordinal, month_start, ordinal_to_month
+
+
+ITEM_NAMES = (
+    'Rent', 'Mortgage', 'Council tax', 'Electricity', 'Gas', 'Water',
+    'Broadband', 'Mobile', 'Car insurance', 'Home insurance', 'Gym',
+    'Streaming', 'Groceries', 'Childcare', 'Pension', 'Savings', 'Holiday',
+    'Laptop', 'Furniture', 'Repairs',
+)
+
+REPEATING_SHARE = 0.8
+# Shares of the repeating items that end, and that change cost, in the range.
+ENDING_SHARE = 0.1
+COST_CHANGE_SHARE = 0.05
+# Repeating items may start this many months before the first seeded month.
+LEAD_MONTHS = 24
+
+
+def default_start(months):
+    """Return the first month of a ``months``-long range centred on the current month."""
+    return ordinal_to_month(month_ordinal(date.today()) - months // 2)
+
+
+def _cost(rng):
+    # Log-normal: mostly tens to hundreds, with a long tail.
+    return min(Decimal(str(round(rng.lognormvariate(4, 1.2), 2))), Decimal('99999.99')) or Decimal('0.01')
+
+
+def _item_rows(rng, count, owner_ids, first, last):
+    """Yield ``ITEM_COLUMNS`` tuples for ``count`` items active within ordinals ``first``..``last``."""
+    for i in range(count):
+        repeats = rng.random() < REPEATING_SHARE
+        start_ordinal = rng.randint(first - LEAD_MONTHS if repeats else first, last)
+        startdate = ordinal_to_month(start_ordinal).replace(day=rng.randint(1, 28))
+        end_date = None
+        if repeats and rng.random() < ENDING_SHARE:
+            end_date = ordinal_to_month(start_ordinal + rng.randint(6, 60)).replace(day=28)
+        yield (
+            f'{ITEM_NAMES[i % len(ITEM_NAMES)]} {i}',
+            owner_ids[rng.randrange(len(owner_ids))],
+            _cost(rng),
+            repeats,
+            startdate,
+            end_date,
+        )
+
+
+def seed_dataset(items, owners, months, start=None, seed=0, batch_size=10000):
+    """
+    Create ``owners`` owners, ``items`` budget items and ``months`` months from ``start``.
+
+    Runs in one transaction and returns a dict of row counts. ``start``
+    defaults to ``default_start(months)``.
+    """
+    rng = random.Random(seed)
+    start = month_start(start or default_start(months))
+    first = month_ordinal(start)
+    last = first + months - 1
+
+    with transaction.atomic():
+        ids = Owner.objects.ids_for(f'Owner {i}' for i in range(owners))
+        owner_ids = [ids[f'Owner {i}'] for i in range(owners)]
+        BudgetItem.objects.insert_rows(_item_rows(rng, items, owner_ids, first, last), batch_size=batch_size)
+
+        repeating = BudgetItem.objects.filter(repeats=True).order_by('id').values_list('id', 'cost', 'startdate')
+        periods = (
+            BudgetItemCostPeriod(
+                budget_item_id=item_id,
+                effective_from=ordinal_to_month(
+                    max(month_ordinal(startdate), first) + rng.randint(1, max(months - 1, 1))
+                ),
+                cost=(cost * Decimal(rng.choice(('0.9', '1.05', '1.1', '1.25')))).quantize(Decimal('0.01')),
+            )
+            for item_id, cost, startdate in repeating.iterator(chunk_size=batch_size)
+            if rng.random() < COST_CHANGE_SHARE
+        )
+        cost_periods = 0
+        while batch := list(islice(periods, batch_size)):
+            cost_periods += len(BudgetItemCostPeriod.objects.bulk_create(batch))
+
+        instances = MonthlyInstance.objects.bulk_generate(start, ordinal_to_month(last), batch_size=batch_size)
+        by_month = {instance.month: instance for instance in instances}
+
+        # One-off items go into the month they start in.
+        one_offs = BudgetItem.objects.filter(
+            repeats=False, startdate__gte=start
+        ).order_by('id').values_list('id', 'cost', 'owner__name', 'startdate')
+        lines = (
+            MonthlyLineItem(
+                monthly_instance=by_month[month_start(startdate)],
+                budget_item_id=item_id,
+                cost_snapshot=cost,
+                owner=owner,
+            )
+            for item_id, cost, owner, startdate in one_offs.iterator(chunk_size=batch_size)
+            if month_start(startdate) in by_month
+        )
+        linked = 0
+        while batch := list(islice(lines, batch_size)):
+            MonthlyLineItem.objects.bulk_create(batch)
+            for line in batch:
+                line.monthly_instance.total_amount += line.cost_snapshot
+            linked += len(batch)
+        MonthlyInstance.objects.bulk_update(instances, ['total_amount'], batch_size=batch_size)
+        OwnerMonthSummary.objects.rebuild(MonthlyInstance.objects.filter(pk__in=[i.pk for i in instances]))
+    months_changed.send(sender=MonthlyInstance, months=list(by_month))
+
+    return {
+        'owners': owners,
+        'items': items,
+        'cost_periods': cost_periods,
+        'months': len(instances),
+        'line_items': MonthlyLineItem.objects.count(),
+        'one_off_line_items': linked,
+    }
@@ -0,0 +1,101 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache, intervals
+from .models import BudgetItem, MonthlyInstance, MonthlyLineItem, OwnerMonthSummary, months_changed
+
+
+@receiver(m2m_changed, sender=MonthlyLineItem)
+def snapshot_added_line_items(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Fill in the snapshot fields of line items created through ``budget_items.add()``/``set()``.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        lines = MonthlyLineItem.objects.filter(budget_item=instance, monthly_instance_id__in=pk_set)
+    else:
+        lines = MonthlyLineItem.objects.filter(monthly_instance=instance, budget_item_id__in=pk_set)
+    lines.refresh_snapshots()
+
+
+@receiver(m2m_changed, sender=MonthlyLineItem)
+def summarise_removed_line_items(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Subtract line items about to be deleted by ``remove()``/``set()``/``clear()`` from the owner summaries.
+    """
+    if action not in ('pre_remove', 'pre_clear'):
+        return
+    lines = MonthlyLineItem.objects.filter(**{'budget_item' if reverse else 'monthly_instance': instance})
+    if action == 'pre_remove':
+        if not pk_set:
+            return
+        lines = lines.filter(**{'monthly_instance_id__in' if reverse else 'budget_item_id__in': pk_set})
+    OwnerMonthSummary.objects.apply_lines(lines, -1)
+
+
+@receiver(m2m_changed, sender=MonthlyLineItem)
+def invalidate_linked_months(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Invalidate cached data for the months whose line items are added, removed or cleared.
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            cache.invalidate_months([instance.month], using=using)
+    elif action == 'pre_clear':
+        cache.invalidate_months(
+            MonthlyInstance.objects.using(using).filter(budget_items=instance).values_list('month', flat=True),
+            using=using
+        )
+    elif action in ('post_add', 'post_remove') and pk_set:
+        cache.invalidate_months(
+            MonthlyInstance.objects.using(using).filter(pk__in=pk_set).values_list('month', flat=True),
+            using=using
+        )
+
+
+@receiver(post_save, sender=MonthlyInstance)
+@receiver(post_delete, sender=MonthlyInstance)
+def invalidate_saved_month(sender, instance, using, **kwargs):
+    """
+    Invalidate cached data for a saved or deleted month, and its old month if it moved.
+    """
+    cache.invalidate_months({instance.month, getattr(instance, '_loaded_month', instance.month)}, using=using)
+    instance._loaded_month = instance.month
+
+
+@receiver(pre_delete, sender=BudgetItem)
+def invalidate_item_months(sender, instance, using, **kwargs):
+    """
+    Invalidate the months an item is linked to and drop it from their totals and owner summaries before it is deleted.
+
+    ``BudgetItem.delete()`` and ``BudgetItemQuerySet.delete()`` discard the
+    line items first; this covers cascades that remove them without going
+    through ``MonthlyLineItemQuerySet.discard()``. Edits made by
+    ``BudgetItem.save()`` reach the cache through ``months_changed``.
+    """
+    lines = MonthlyLineItem.objects.using(using).filter(budget_item=instance)
+    lines._adjust_month_totals(-F('cost_snapshot'))
+    OwnerMonthSummary.objects.using(using).apply_lines(lines, -1)
+    cache.invalidate_months(
+        MonthlyInstance.objects.using(using).filter(budget_items=instance).values_list('month', flat=True),
+        using=using
+    )
+
+
+@receiver(post_save, sender=BudgetItem)
+@receiver(post_delete, sender=BudgetItem)
+def invalidate_item_intervals(sender, **kwargs):
+    """
+    Drop this process's interval tree snapshot after an item is saved or deleted.
+    """
+    intervals.invalidate()
+
+
+@receiver(months_changed, sender=MonthlyInstance)
+def invalidate_changed_months(sender, months, **kwargs):
+    """
+    Invalidate cached data for months changed by set-based writes.
+    """
+    cache.invalidate_months(months)
@@ -0,0 +1,29 @@
+'use strict';
+{
+    const $ = django.jQuery;
+    const djangoAdminSelect2 = $.fn.djangoAdminSelect2;
+
+    // Budget item pickers (data-keyset) page by seeking past the last item
+    // shown: each page's response carries the cursor to send for the next.
+    $.fn.djangoAdminSelect2 = function() {
+        djangoAdminSelect2.call(this.not('[data-keyset]'));
+        $.each(this.filter('[data-keyset]'), function(i, element) {
+            const cursors = {};
+            $(element).select2({
+                ajax: {
+                    data: (params) => {
+                        return {
+                            term: params.term,
+                            cursor: params.page > 1 ? cursors[params.page] : undefined
+                        };
+                    },
+                    processResults: (data, params) => {
+                        cursors[(params.page || 1) + 1] = data.pagination.cursor;
+                        return data;
+                    }
+                }
+            });
+        });
+        return this;
+    };
+}
@@ -0,0 +1,123 @@
+"""
+Query budget assertions for tests of hot code paths.
+
+``QueryBudgetMixin`` adds two assertions to a ``TestCase``:
+
+``assertQueryBudget(label, max_queries, max_time=None)``
+    A context manager failing if the block runs more than ``max_queries``
+    queries or spends more than ``max_time`` seconds in SQL.
+
+``assertConstantQueries(label, build, run, sizes=...)``
+    Builds a dataset of each size with ``build(size)`` and measures
+    ``run(built)`` against it, failing if the queries differ between sizes.
+    Queries are compared with literals removed, so the failure message is a
+    diff of the statements that appeared or disappeared as the data grew:
+    the signature of an N+1.
+
+Each size is built and measured inside a transaction that is rolled back,
+so sizes do not see each other's rows.
+"""
+import difflib
+import re
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+DEFAULT_SIZES = (10, 1000, 10000)
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'"s\d+_x\d+"'), '"savepoint"'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\((?:\?, )+\?\)'), '(...)'),
+    (re.compile(r'(?:\(\.\.\.\), )+\(\.\.\.\)'), '(...)'),
+]
+
+
+def normalize_sql(sql):
+    """Return ``sql`` with literals, savepoint names and value lists replaced by placeholders."""
+    for pattern, replacement in _LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class CapturedQueries:
+    """The queries run by a block, with their total database time in seconds."""
+
+    def __init__(self, queries):
+        self.queries = [query['sql'] for query in queries]
+        self.time = sum(float(query['time']) for query in queries)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def normalized(self):
+        return [normalize_sql(sql) for sql in self.queries]
+
+    def listing(self):
+        return '\n'.join(f'{number}. {sql}' for number, sql in enumerate(self.queries, 1))
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting query counts and SQL time of code paths.
+    """
+
+    @contextmanager
+    def capture_queries(self, using=DEFAULT_DB_ALIAS):
+        """Yield a list that holds a ``CapturedQueries`` once the block exits."""
+        result = []
+        with CaptureQueriesContext(connections[using]) as context:
+            yield result
+        result.append(CapturedQueries(context.captured_queries))
+
+    def _check_budget(self, label, captured, max_queries, max_time):
+        if max_queries is not None and len(captured) > max_queries:
+            self.fail(
+                f"{label} ran {len(captured)} queries, over its budget of {max_queries}:\n"
+                f"{captured.listing()}"
+            )
+        if max_time is not None and captured.time > max_time:
+            self.fail(
+                f"{label} spent {captured.time:.3f}s in SQL, over its budget of {max_time:.3f}s:\n"
+                f"{captured.listing()}"
+            )
+
+    @contextmanager
+    def assertQueryBudget(self, label, max_queries, max_time=None, using=DEFAULT_DB_ALIAS):
+        """Assert that the block runs at most ``max_queries`` queries taking at most ``max_time`` seconds."""
+        with self.capture_queries(using) as result:
+            yield
+        self._check_budget(label, result[0], max_queries, max_time)
+
+    def assertConstantQueries(self, label, build, run, sizes=DEFAULT_SIZES, max_queries=None,
+                              max_time=None, using=DEFAULT_DB_ALIAS):
+        """
+        Assert that ``run(build(size))`` runs the same queries for every size.
+
+        ``max_queries`` and ``max_time`` additionally budget every size.
+        Returns the query count.
+        """
+        reference = None
+        for size in sizes:
+            with transaction.atomic(using=using):
+                built = build(size)
+                with self.capture_queries(using) as result:
+                    run(built)
+                transaction.set_rollback(True, using=using)
+            captured = result[0]
+            if reference is None:
+                reference = (size, captured)
+            elif captured.normalized() != reference[1].normalized():
+                diff = '\n'.join(difflib.unified_diff(
+                    reference[1].normalized(), captured.normalized(),
+                    f'{label} at {reference[0]}', f'{label} at {size}', lineterm=''
+                ))
+                self.fail(
+                    f"{label} ran {len(captured)} queries at size {size} and "
+                    f"{len(reference[1])} at size {reference[0]}:\n{diff}"
+                )
+            self._check_budget(f'{label} at size {size}', captured, max_queries, max_time)
+        return len(reference[1])
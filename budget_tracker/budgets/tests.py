@@ -1,12 +1,49 @@
 from django.test import TestCase
-from django.core.exceptions import ValidationError
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.test import RequestFactory
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
+from django.db import connection, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
 from decimal import Decimal
 from datetime import date, timedelta
-from .models import BudgetItem, MonthlyInstance
-from .admin import MonthlyInstanceAdmin
+from .models import (
+    BudgetItem, BudgetItemCostPeriod, MonthlyInstance, MonthlyLineItem, Owner, OwnerMonthSummary,
+    cost_segments
+)
+from .months import OPEN_ENDED_MONTH, month_ordinal, month_start, ordinal_to_month
+from .recurrence import expand
+from . import recurrence
+from .forecast import forecast
+from .intervals import IntervalTree, item_intervals
+from .exports import export_queryset, stream_csv, stream_export
+from .imports import import_items
+from . import cache as budget_cache
+from . import metrics
+from .testing import QueryBudgetMixin
+import csv
+import json
+import os
+import re
+import tempfile
+from unittest import mock
+from .admin import ActiveInMonthFilter, MonthlyInstanceAdmin, BudgetItemAdmin
+from .middleware import PerformanceMiddleware
+from .profiling import profile, recent_captures
+from .views import item_list
+
+
+def owner_named(name):
+    """Return the Owner called ``name``, creating it if needed."""
+    return Owner.objects.get_or_create(name=name)[0]
 
 
 class BudgetItemModelTest(TestCase):
@@ -14,7 +51,7 @@ class BudgetItemModelTest(TestCase):
     def setUp(self):
         self.valid_data = {
             'name': 'Monthly Rent',
-            'owner': 'John Doe',
+            'owner': owner_named('John Doe'),
             'cost': Decimal('1200.00'),
             'repeats': True,
             'startdate': date.today()
@@ -24,7 +61,7 @@ class BudgetItemModelTest(TestCase):
         """Test basic budget item creation"""
         item = BudgetItem.objects.create(**self.valid_data)
         self.assertEqual(item.name, 'Monthly Rent')
-        self.assertEqual(item.owner, 'John Doe')
+        self.assertEqual(item.owner.name, 'John Doe')
         self.assertEqual(item.cost, Decimal('1200.00'))
         self.assertTrue(item.repeats)
         self.assertEqual(item.startdate, date.today())
@@ -57,14 +94,14 @@ class MonthlyInstanceModelTest(TestCase):
         self.month = date(2024, 1, 1)
         self.budget_item1 = BudgetItem.objects.create(
             name='Rent',
-            owner='John',
+            owner=owner_named('John'),
             cost=Decimal('1200.00'),
             repeats=True,
             startdate=date.today()
         )
         self.budget_item2 = BudgetItem.objects.create(
             name='Insurance',
-            owner='Jane',
+            owner=owner_named('Jane'),
             cost=Decimal('150.00'),
             repeats=True,
             startdate=date.today()
@@ -94,6 +131,28 @@ class MonthlyInstanceModelTest(TestCase):
         self.assertEqual(total, expected_total)
         self.assertEqual(instance.total_amount, expected_total)
     
+    def test_calculate_total_uses_single_aggregate_and_targeted_update(self):
+        """Test calculate_total issues one SUM query and one narrow UPDATE"""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        instance.budget_items.add(self.budget_item1, self.budget_item2)
+        
+        with self.assertNumQueries(2) as ctx:
+            total = instance.calculate_total()
+        
+        self.assertEqual(total, Decimal('1350.00'))
+        self.assertIn('SUM', ctx.captured_queries[0]['sql'])
+        update_sql = ctx.captured_queries[1]['sql']
+        self.assertIn('"total_amount"', update_sql)
+        self.assertNotIn('"notes"', update_sql)
+        instance.refresh_from_db()
+        self.assertEqual(instance.total_amount, Decimal('1350.00'))
+    
+    def test_calculate_total_empty_month(self):
+        """Test calculate_total returns 0.00 for a month without items"""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        instance.budget_items.clear()
+        self.assertEqual(str(instance.calculate_total()), '0.00')
+    
     def test_unique_month_constraint(self):
         """Test that only one monthly instance per month is allowed"""
         MonthlyInstance.objects.create(month=self.month)
@@ -112,7 +171,7 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         # Create repeating items with different scenarios
         self.active_repeating_item = BudgetItem.objects.create(
             name='Rent',
-            owner='John',
+            owner=owner_named('John'),
             cost=Decimal('1200.00'),
             repeats=True,
             startdate=date(2024, 1, 1)  # Started before test month
@@ -120,7 +179,7 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         
         self.future_repeating_item = BudgetItem.objects.create(
             name='Future Insurance',
-            owner='Jane',
+            owner=owner_named('Jane'),
             cost=Decimal('150.00'),
             repeats=True,
             startdate=date(2024, 12, 1)  # Starts after test month
@@ -128,7 +187,7 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         
         self.expired_repeating_item = BudgetItem.objects.create(
             name='Old Subscription',
-            owner='Bob',
+            owner=owner_named('Bob'),
             cost=Decimal('50.00'),
             repeats=True,
             startdate=date(2024, 1, 1),
@@ -137,7 +196,7 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         
         self.non_repeating_item = BudgetItem.objects.create(
             name='One-time Payment',
-            owner='Alice',
+            owner=owner_named('Alice'),
             cost=Decimal('500.00'),
             repeats=False,  # Not repeating
             startdate=date(2024, 1, 1)
@@ -145,7 +204,7 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         
         self.active_with_future_end = BudgetItem.objects.create(
             name='Car Payment',
-            owner='Charlie',
+            owner=owner_named('Charlie'),
             cost=Decimal('300.00'),
             repeats=True,
             startdate=date(2024, 1, 1),
@@ -217,6 +276,20 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         
         self.assertEqual(len(budget_items), 3)
     
+    def test_active_in_matches_auto_populated_items(self):
+        """Test that BudgetItem.objects.active_in selects the same items auto-population links."""
+        active_ids = set(BudgetItem.objects.active_in(self.test_month).values_list('id', flat=True))
+        self.assertEqual(
+            active_ids,
+            {self.active_repeating_item.id, self.active_with_future_end.id}
+        )
+    
+    def test_active_in_uses_composite_index(self):
+        """Test that the active-in-month filter is served by budgetitem_active_idx on SQLite."""
+        plan = BudgetItem.objects.active_in(self.test_month).explain()
+        self.assertIn('budgetitem_active_idx', plan)
+        self.assertNotIn('SCAN budgets_budgetitem', plan)
+    
     def test_no_duplicate_items(self):
         """Test that calling auto_populate_repeating_items multiple times doesn't create duplicates."""
         instance = MonthlyInstance.objects.create(month=self.test_month)
@@ -228,6 +301,1195 @@ class MonthlyInstanceAutoPopulateTest(TestCase):
         self.assertEqual(len(budget_items), 2)  # Should still be 2, not 4
 
 
+class MonthlyInstanceBulkGenerateTest(TestCase):
+    """Test bulk generation of monthly instances."""
+    
+    def setUp(self):
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.insurance = BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=date(2024, 2, 15),  # Mid-month start, first active in March
+            end_date=date(2024, 4, 30)
+        )
+        BudgetItem.objects.create(
+            name='One-time Payment',
+            owner=owner_named('Alice'),
+            cost=Decimal('500.00'),
+            repeats=False,
+            startdate=date(2024, 1, 1)
+        )
+    
+    def test_bulk_generate_matches_auto_population(self):
+        """Test that bulk-generated months have the same items and totals as individually created ones."""
+        MonthlyInstance.objects.bulk_generate(date(2023, 12, 1), date(2024, 6, 1))
+        generated = {
+            instance.month: (set(instance.budget_items.values_list('id', flat=True)), instance.total_amount)
+            for instance in MonthlyInstance.objects.all()
+        }
+        self.assertEqual(len(generated), 7)
+        
+        MonthlyInstance.objects.all().delete()
+        for month, (item_ids, total) in generated.items():
+            instance = MonthlyInstance.objects.create(month=month)
+            self.assertEqual(set(instance.budget_items.values_list('id', flat=True)), item_ids)
+            self.assertEqual(instance.total_amount, total)
+        
+        self.assertEqual(generated[date(2023, 12, 1)], (set(), Decimal('0.00')))
+        self.assertEqual(generated[date(2024, 3, 1)][1], Decimal('1350.00'))
+        self.assertEqual(generated[date(2024, 5, 1)][1], Decimal('1200.00'))
+    
+    def test_bulk_generate_skips_existing_months(self):
+        """Test that existing months are left untouched."""
+        existing = MonthlyInstance.objects.create(month=date(2024, 3, 1), notes='Keep me')
+        existing.budget_items.clear()
+        
+        created = MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 4, 1))
+        
+        self.assertEqual([instance.month for instance in created], [
+            date(2024, 1, 1), date(2024, 2, 1), date(2024, 4, 1)
+        ])
+        existing.refresh_from_db()
+        self.assertEqual(existing.notes, 'Keep me')
+        self.assertEqual(existing.budget_items.count(), 0)
+        self.assertEqual(MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 4, 1)), [])
+    
+    def test_bulk_generate_query_count_is_constant(self):
+        """Test that generating a year does not issue per-month queries."""
+        with self.assertNumQueries(8):  # includes one INSERT ... SELECT of owner summaries
+            MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 12, 1))
+        self.assertEqual(MonthlyInstance.objects.count(), 12)
+    
+    def test_generate_months_command(self):
+        """Test the generate_months management command."""
+        out = StringIO()
+        call_command('generate_months', '--from', '2024-01', '--to', '2024-03', stdout=out)
+        self.assertIn('Created 3 monthly instance(s)', out.getvalue())
+        self.assertEqual(
+            MonthlyInstance.objects.get(month=date(2024, 1, 1)).total_amount,
+            Decimal('1200.00')
+        )
+
+
+class BudgetItemChangeTrackingTest(TestCase):
+    """Test that edits to budget items keep monthly totals and links correct."""
+    
+    def setUp(self):
+        # Six months from two months ago to three months ahead, so edits can
+        # be checked against both historical and current/future months.
+        self.this_month = month_start(timezone.localdate())
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=self.month(-2)
+        )
+        self.one_off = BudgetItem.objects.create(
+            name='One-time Payment',
+            owner=owner_named('Alice'),
+            cost=Decimal('500.00'),
+            repeats=False,
+            startdate=self.month(-2)
+        )
+        MonthlyInstance.objects.bulk_generate(self.month(-2), self.month(3))
+        self.current = MonthlyInstance.objects.get(month=self.month(0))
+        self.current.budget_items.add(self.one_off)
+        self.current.calculate_total()
+    
+    def month(self, offset):
+        return ordinal_to_month(month_ordinal(self.this_month) + offset)
+    
+    def assertTotalsConsistent(self):
+        for instance in MonthlyInstance.objects.all():
+            stored = instance.total_amount
+            self.assertEqual(stored, instance.calculate_total(), instance.month)
+    
+    def totals(self):
+        return dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+    
+    def test_cost_change_applies_delta_to_current_and_future_months(self):
+        """Test that a cost change adjusts current and future totals and leaves history alone."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.cost = Decimal('1300.00')
+        rent.save()
+        
+        totals = self.totals()
+        self.assertEqual(totals[self.month(-1)], Decimal('1200.00'))
+        self.assertEqual(totals[self.month(0)], Decimal('1800.00'))
+        self.assertEqual(totals[self.month(3)], Decimal('1300.00'))
+        self.assertEqual(
+            set(MonthlyLineItem.objects.filter(budget_item=rent).values_list('cost_snapshot', flat=True)),
+            {Decimal('1200.00'), Decimal('1300.00')}
+        )
+        self.assertTotalsConsistent()
+    
+    def test_owner_change_updates_current_snapshots(self):
+        """Test that an owner change is reflected in current breakdowns only."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.owner = owner_named('Jane')
+        rent.save()
+        
+        self.assertEqual(
+            self.current.owner_breakdown(),
+            {'Jane': Decimal('1200.00'), 'Alice': Decimal('500.00')}
+        )
+        past = MonthlyInstance.objects.get(month=self.month(-1))
+        self.assertEqual(past.owner_breakdown(), {'John': Decimal('1200.00')})
+    
+    def test_end_date_change_removes_links(self):
+        """Test that shortening the date window unlinks months after the new end date."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.end_date = self.month(1)
+        rent.save()
+        
+        self.assertEqual(
+            list(rent.monthlyinstance_set.order_by('month').values_list('month', flat=True)),
+            [self.month(-2), self.month(-1), self.month(0), self.month(1)]
+        )
+        self.assertEqual(self.totals()[self.month(2)], Decimal('0.00'))
+        self.assertTotalsConsistent()
+    
+    def test_start_date_and_cost_change_together(self):
+        """Test that moving the start date and changing cost in one save stay consistent."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.startdate = self.month(1)
+        rent.cost = Decimal('1000.00')
+        rent.save()
+        
+        totals = self.totals()
+        self.assertEqual(totals[self.month(-1)], Decimal('0.00'))
+        self.assertEqual(totals[self.month(0)], Decimal('500.00'))
+        self.assertEqual(totals[self.month(1)], Decimal('1000.00'))
+        
+        rent.startdate = self.month(-1)
+        rent.save()
+        totals = self.totals()
+        self.assertEqual(totals[self.month(-1)], Decimal('1000.00'))
+        self.assertEqual(totals[self.month(-2)], Decimal('0.00'))
+        self.assertTotalsConsistent()
+    
+    def test_repeats_flag_change(self):
+        """Test that toggling repeats unlinks and relinks the item's active months."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.repeats = False
+        rent.save()
+        self.assertEqual(rent.monthlyinstance_set.count(), 0)
+        self.assertEqual(self.totals()[self.month(0)], Decimal('500.00'))
+        
+        rent.repeats = True
+        rent.save()
+        self.assertEqual(rent.monthlyinstance_set.count(), 6)
+        self.assertTotalsConsistent()
+    
+    def test_non_repeating_item_links_preserved(self):
+        """Test that manually linked non-repeating items keep their links on date edits."""
+        one_off = BudgetItem.objects.get(pk=self.one_off.pk)
+        one_off.startdate = self.month(3)
+        one_off.cost = Decimal('550.00')
+        one_off.save()
+        
+        self.assertEqual(list(one_off.monthlyinstance_set.all()), [self.current])
+        self.assertEqual(self.totals()[self.month(0)], Decimal('1750.00'))
+        self.assertTotalsConsistent()
+    
+    def test_unchanged_save_issues_no_month_updates(self):
+        """Test that saving without tracked changes does not touch monthly instances."""
+        rent = BudgetItem.objects.get(pk=self.rent.pk)
+        rent.name = 'Apartment Rent'
+        with self.assertNumQueries(3):  # savepoint, UPDATE, release
+            rent.save()
+    
+    def test_delete_subtracts_snapshot_cost(self):
+        """Test that deleting an item removes its snapshot cost from linked months."""
+        BudgetItem.objects.get(pk=self.one_off.pk).delete()
+        self.assertEqual(self.totals()[self.month(0)], Decimal('1200.00'))
+        self.assertTotalsConsistent()
+    
+    def test_queryset_delete_subtracts_snapshot_cost(self):
+        """Test that deleting items through a queryset removes their snapshot cost from linked months."""
+        BudgetItem.objects.filter(pk=self.one_off.pk).delete()
+        self.assertEqual(self.totals()[self.month(0)], Decimal('1200.00'))
+        self.assertTotalsConsistent()
+    
+        BudgetItem.objects.all().delete()
+        self.assertEqual(set(self.totals().values()), {Decimal('0.00')})
+        self.assertTotalsConsistent()
+    
+    def test_admin_bulk_delete_subtracts_snapshot_cost(self):
+        """Test that the admin "delete selected" action keeps totals correct."""
+        user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(user)
+        response = self.client.post('/admin/budgets/budgetitem/', {
+            'action': 'delete_selected',
+            '_selected_action': [self.one_off.pk],
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BudgetItem.objects.filter(pk=self.one_off.pk).exists())
+        self.assertEqual(self.totals()[self.month(0)], Decimal('1200.00'))
+        self.assertTotalsConsistent()
+    
+    def test_admin_edit_updates_totals(self):
+        """Test that editing an item through the admin keeps totals correct."""
+        user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(user)
+        response = self.client.post(f'/admin/budgets/budgetitem/{self.rent.pk}/change/', {
+            'name': 'Rent',
+            'owner': str(self.rent.owner_id),
+            'cost': '1250.00',
+            'repeats': 'on',
+            'recurrence': 'monthly',
+            'interval': '1',
+            'startdate': self.month(-2).isoformat(),
+            'end_date': self.month(1).isoformat(),
+            'cost_periods-TOTAL_FORMS': '0',
+            'cost_periods-INITIAL_FORMS': '0',
+        })
+        self.assertEqual(response.status_code, 302)
+        
+        totals = self.totals()
+        self.assertEqual(totals[self.month(-1)], Decimal('1200.00'))
+        self.assertEqual(totals[self.month(0)], Decimal('1750.00'))
+        self.assertEqual(totals[self.month(2)], Decimal('0.00'))
+        self.assertTotalsConsistent()
+
+
+class MonthlyLineItemTest(TestCase):
+    """Test the cost snapshots stored on monthly line items."""
+    
+    def setUp(self):
+        self.month = date(2024, 6, 1)
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.dinner = BudgetItem.objects.create(
+            name='Dinner',
+            owner=owner_named('Jane'),
+            cost=Decimal('80.00'),
+            repeats=False,
+            startdate=date(2024, 6, 1)
+        )
+    
+    def test_snapshots_filled_when_linked(self):
+        """Test that auto-populated and manually added line items copy the item's fields."""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        instance.budget_items.add(self.dinner)
+        
+        snapshots = dict(
+            (line.budget_item_id, (line.cost_snapshot, line.owner, line.repeats))
+            for line in instance.line_items.all()
+        )
+        self.assertEqual(snapshots, {
+            self.rent.pk: (Decimal('1200.00'), 'John', True),
+            self.dinner.pk: (Decimal('80.00'), 'Jane', False),
+        })
+    
+    def test_snapshots_filled_from_reverse_side(self):
+        """Test that adding months from the budget item side fills snapshots too."""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        self.dinner.monthlyinstance_set.add(instance)
+        line = MonthlyLineItem.objects.get(budget_item=self.dinner)
+        self.assertEqual(line.cost_snapshot, Decimal('80.00'))
+    
+    def test_totals_and_breakdown_read_only_line_items(self):
+        """Test that totals and owner breakdowns never join the budget item table."""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        instance.budget_items.add(self.dinner)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            total = instance.calculate_total()
+            breakdown = instance.owner_breakdown()
+        
+        self.assertEqual(total, Decimal('1280.00'))
+        self.assertEqual(breakdown, {'John': Decimal('1200.00'), 'Jane': Decimal('80.00')})
+        for query in ctx.captured_queries:
+            self.assertNotIn('budgets_budgetitem', query['sql'])
+    
+    def test_historical_month_keeps_snapshot(self):
+        """Test that editing an item's cost does not change a past month's total."""
+        instance = MonthlyInstance.objects.create(month=self.month)
+        self.rent.cost = Decimal('1500.00')
+        self.rent.save()
+        
+        instance.refresh_from_db()
+        self.assertEqual(instance.total_amount, Decimal('1200.00'))
+        self.assertEqual(instance.calculate_total(), Decimal('1200.00'))
+
+
+class BudgetItemCostPeriodTest(TestCase):
+    """Test effective-dated cost history for budget items."""
+    
+    def setUp(self):
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.insurance = BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        BudgetItemCostPeriod.objects.bulk_create([
+            BudgetItemCostPeriod(budget_item=self.rent, effective_from=date(2024, 4, 1), cost=Decimal('1300.00')),
+            BudgetItemCostPeriod(budget_item=self.rent, effective_from=date(2024, 9, 15), cost=Decimal('1400.00')),
+        ])
+    
+    def test_with_cost_as_of_resolves_in_one_query(self):
+        """Test that as-of costs for all items are resolved in a single query."""
+        with self.assertNumQueries(1):
+            costs = dict(
+                BudgetItem.objects.with_cost_as_of(date(2024, 6, 1)).values_list('name', 'cost_as_of')
+            )
+        self.assertEqual(costs, {'Rent': Decimal('1300.00'), 'Insurance': Decimal('150.00')})
+        
+        costs = dict(BudgetItem.objects.with_cost_as_of(date(2024, 3, 1)).values_list('name', 'cost_as_of'))
+        self.assertEqual(costs['Rent'], Decimal('1200.00'))
+        # Mid-month periods take effect from the following month
+        costs = dict(BudgetItem.objects.with_cost_as_of(date(2024, 9, 1)).values_list('name', 'cost_as_of'))
+        self.assertEqual(costs['Rent'], Decimal('1300.00'))
+    
+    def test_schedules_and_cost_segments(self):
+        """Test that schedules split a month range into runs of constant cost."""
+        schedules = BudgetItemCostPeriod.objects.schedules()
+        self.assertNotIn(self.insurance.pk, schedules)
+        
+        first = month_ordinal(date(2024, 1, 1))
+        runs = [
+            (ordinal_to_month(run_first), ordinal_to_month(run_last), cost)
+            for run_first, run_last, cost in cost_segments(
+                self.rent.cost, schedules[self.rent.pk], first, first + 11
+            )
+        ]
+        self.assertEqual(runs, [
+            (date(2024, 1, 1), date(2024, 3, 1), Decimal('1200.00')),
+            (date(2024, 4, 1), date(2024, 9, 1), Decimal('1300.00')),
+            (date(2024, 10, 1), date(2024, 12, 1), Decimal('1400.00')),
+        ])
+    
+    def test_new_months_snapshot_cost_as_of_month(self):
+        """Test that auto-populated and bulk-generated months use the as-of cost."""
+        instance = MonthlyInstance.objects.create(month=date(2024, 5, 1))
+        self.assertEqual(instance.total_amount, Decimal('1450.00'))
+        
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 12, 1))
+        totals = dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+        self.assertEqual(totals[date(2024, 3, 1)], Decimal('1350.00'))
+        self.assertEqual(totals[date(2024, 10, 1)], Decimal('1550.00'))
+        self.assertEqual(totals[date(2024, 12, 1)], Decimal('1550.00'))
+        for instance in MonthlyInstance.objects.all():
+            self.assertEqual(instance.total_amount, instance.calculate_total())
+    
+    def test_period_changes_update_affected_months(self):
+        """Test that adding, moving and deleting periods re-resolve the affected months only."""
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 12, 1))
+        
+        period = BudgetItemCostPeriod.objects.create(
+            budget_item=self.insurance, effective_from=date(2024, 7, 1), cost=Decimal('175.00')
+        )
+        totals = dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+        self.assertEqual(totals[date(2024, 6, 1)], Decimal('1450.00'))
+        self.assertEqual(totals[date(2024, 7, 1)], Decimal('1475.00'))
+        
+        period.effective_from = date(2024, 5, 1)
+        period.save()
+        totals = dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+        self.assertEqual(totals[date(2024, 5, 1)], Decimal('1475.00'))
+        
+        period.delete()
+        totals = dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+        self.assertEqual(totals[date(2024, 7, 1)], Decimal('1450.00'))
+        for instance in MonthlyInstance.objects.all():
+            self.assertEqual(instance.total_amount, instance.calculate_total())
+
+
+class ForecastTest(TestCase):
+    """Test the read-only multi-month forecast."""
+    
+    def setUp(self):
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2023, 6, 1)
+        )
+        BudgetItemCostPeriod.objects.create(
+            budget_item=self.rent, effective_from=date(2024, 4, 1), cost=Decimal('1300.00')
+        )
+        BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=date(2024, 2, 15),
+            end_date=date(2024, 5, 31)
+        )
+        BudgetItem.objects.create(
+            name='Phone',
+            owner=owner_named('Jane'),
+            cost=Decimal('45.50'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        BudgetItem.objects.create(
+            name='Short Subscription',
+            owner=owner_named('Bob'),
+            cost=Decimal('9.99'),
+            repeats=True,
+            startdate=date(2024, 3, 10),
+            end_date=date(2024, 3, 20)  # Never active on the first of a month
+        )
+        BudgetItem.objects.create(
+            name='Lapsed Plan',
+            owner=owner_named('Bob'),
+            cost=Decimal('40.00'),
+            repeats=True,
+            startdate=date(2024, 6, 1),
+            end_date=date(2024, 2, 1)  # Ends before it starts
+        )
+        BudgetItem.objects.create(
+            name='One-time Payment',
+            owner=owner_named('Alice'),
+            cost=Decimal('500.00'),
+            repeats=False,
+            startdate=date(2024, 3, 1)
+        )
+    
+    def test_forecast_matches_generated_months(self):
+        """Test that the forecast equals the owner breakdown of generated months."""
+        with CaptureQueriesContext(connection) as ctx:
+            result = forecast(date(2024, 1, 1), months=12)
+        for query in ctx.captured_queries:
+            self.assertTrue(query['sql'].startswith('SELECT'), query['sql'])
+        self.assertEqual(MonthlyInstance.objects.count(), 0)
+        
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 12, 1))
+        self.assertEqual(result.owners, ['Jane', 'John'])
+        for instance in MonthlyInstance.objects.all():
+            breakdown = instance.owner_breakdown()
+            for owner in result.owners:
+                self.assertEqual(
+                    result.amount(instance.month, owner),
+                    breakdown.get(owner, Decimal('0.00')),
+                    (instance.month, owner)
+                )
+        self.assertEqual(result.month_totals()[3], Decimal('1495.50'))
+        self.assertEqual(result.owner_totals()['John'], Decimal('15300.00'))
+    
+    def test_forecast_owner_filter(self):
+        """Test restricting the forecast to some owners."""
+        result = forecast(date(2024, 1, 1), months=3, owners=['Jane', 'Nobody'])
+        self.assertEqual(result.owners, ['Jane', 'Nobody'])
+        self.assertEqual(result.month_totals(), [Decimal('45.50'), Decimal('45.50'), Decimal('195.50')])
+    
+    def test_forecast_command_formats(self):
+        """Test the forecast management command CSV and JSON output."""
+        out = StringIO()
+        call_command('forecast', '--from', '2024-03', '--months', '2', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'month,Jane,John,total',
+            '2024-03,195.50,1200.00,1395.50',
+            '2024-04,195.50,1300.00,1495.50',
+        ])
+        
+        out = StringIO()
+        call_command('forecast', '--from', '2024-03', '--months', '1', '--format', 'json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue()), {
+            'months': ['2024-03'],
+            'owners': ['Jane', 'John'],
+            'spend': [['195.50', '1200.00']],
+        })
+
+
+class BudgetApiTest(TestCase):
+    """Test the keyset-paginated JSON API."""
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+    
+    def create_items(self, count, **kwargs):
+        defaults = {'owner': owner_named('John'), 'cost': Decimal('10.10'), 'repeats': True, 'startdate': date(2024, 1, 1)}
+        defaults.update(kwargs)
+        return [BudgetItem.objects.create(name=f'Item {i}', **defaults) for i in range(count)]
+    
+    def fetch_all(self, url, params):
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append(data['results'])
+            url, params = data['next'], None
+        return pages
+    
+    def test_items_pages_cover_every_item_once_newest_first(self):
+        """Test that following next links walks all items in (created_at, id) order."""
+        items = self.create_items(5)
+        pages = self.fetch_all('/api/items/', {'limit': 2})
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [row['id'] for page in pages for row in page]
+        expected = BudgetItem.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+        self.assertEqual(sorted(ids), sorted(item.id for item in items))
+    
+    def test_decimals_are_serialized_as_strings(self):
+        """Test that costs keep their exact decimal representation."""
+        self.create_items(1, cost=Decimal('0.10'))
+        row = self.client.get('/api/items/').json()['results'][0]
+        self.assertEqual(row['cost'], '0.10')
+    
+    def test_items_include_recurrence_rule(self):
+        """Test that items are listed with the rule that decides their cost per month."""
+        self.create_items(1, recurrence='every_n_months', interval=4)
+        row = self.client.get('/api/items/').json()['results'][0]
+        self.assertEqual(
+            (row['repeats'], row['recurrence'], row['interval'], row['day_of_month']),
+            (True, 'every_n_months', 4, None)
+        )
+    
+    def test_items_filters(self):
+        """Test the owner, repeats and date window filters."""
+        john = self.create_items(1)[0]
+        jane = self.create_items(1, owner=owner_named('Jane'), startdate=date(2024, 6, 1), end_date=date(2024, 8, 31))[0]
+        once = self.create_items(1, repeats=False)[0]
+        july = self.create_items(1, repeats=False, startdate=date(2024, 7, 15))[0]
+        
+        def ids(**params):
+            return {row['id'] for row in self.client.get('/api/items/', params).json()['results']}
+        
+        self.assertEqual(ids(owner='Jane'), {jane.id})
+        self.assertEqual(ids(repeats='false'), {once.id, july.id})
+        self.assertEqual(ids(active_from='2024-09-01'), {john.id})
+        self.assertEqual(ids(active_to='2024-03-01'), {john.id, once.id})
+        self.assertEqual(ids(active_from='2024-07-01', active_to='2024-07-31'), {john.id, jane.id, july.id})
+        
+        request = RequestFactory().get('/api/items/', {'active_from': '2024-07-01', 'active_to': '2024-07-31'})
+        request.user = self.user
+        with CaptureQueriesContext(connection) as queries:
+            item_list(request)
+        with connection.cursor() as db:
+            db.execute(f"EXPLAIN QUERY PLAN {queries[-1]['sql']}")
+            plan = ' '.join(row[-1] for row in db.fetchall())
+        self.assertRegex(plan, r'SEARCH U0 USING COVERING INDEX budgetitem_(months|last_month)_idx')
+        self.assertNotIn('SCAN', plan)
+    
+    def test_invalid_parameters_return_400(self):
+        """Test that malformed filters and cursors are rejected."""
+        for params in [{'repeats': 'maybe'}, {'active_from': '2024-13-01'}, {'cursor': 'garbage'}, {'limit': 'x'}]:
+            response = self.client.get('/api/items/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.client.get('/api/months/', {'from': '2024'}).status_code, 400)
+    
+    def test_requires_staff(self):
+        """Test that anonymous requests are not served."""
+        self.client.logout()
+        response = self.client.get('/api/items/')
+        self.assertEqual(response.status_code, 302)
+    
+    def test_page_query_count_is_independent_of_dataset_size(self):
+        """Test that each page costs the same fixed queries and never COUNTs."""
+        for size in (5, 30):
+            self.create_items(size - BudgetItem.objects.count())
+            first = self.client.get('/api/items/', {'limit': 2}).json()
+            # Session, user and one page query.
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(first['next'])
+            self.assertEqual(len(response.json()['results']), 2)
+            self.assertEqual(len(queries), 3)
+            self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+            self.assertNotIn('OFFSET', queries.captured_queries[-1]['sql'].upper())
+    
+    def test_months_pages_latest_first(self):
+        """Test month pagination, range filters and constant query count."""
+        self.create_items(1)
+        for month in range(1, 7):
+            MonthlyInstance.objects.create(month=date(2024, month, 1))
+        pages = self.fetch_all('/api/months/', {'from': '2024-02', 'to': '2024-06', 'limit': 2})
+        months = [row['month'] for page in pages for row in page]
+        self.assertEqual(months, ['2024-06-01', '2024-05-01', '2024-04-01', '2024-03-01', '2024-02-01'])
+        self.assertEqual(pages[0][0]['total_amount'], '10.10')
+        with self.assertNumQueries(3):
+            self.client.get('/api/months/', {'limit': 2})
+
+
+class ExportTest(TestCase):
+    """Test streaming exports of items and line items."""
+    
+    def setUp(self):
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.insurance = BudgetItem.objects.create(
+            name='Insurance, Car',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.50'),
+            repeats=True,
+            startdate=date(2024, 2, 1)
+        )
+        MonthlyInstance.objects.create(month=date(2024, 1, 1))
+        MonthlyInstance.objects.create(month=date(2024, 2, 1))
+    
+    def test_stream_does_not_materialise_queryset(self):
+        """Test that streaming iterates the queryset without filling its result cache."""
+        columns, queryset = export_queryset('items')
+        lines = stream_csv(columns, queryset, chunk_size=1)
+        self.assertEqual(
+            next(lines),
+            'id,name,owner,cost,repeats,recurrence,interval,day_of_month,startdate,end_date,created_at,updated_at\r\n'
+        )
+        self.assertTrue(next(lines).startswith(f'{self.rent.id},Rent,John,1200.00,True,monthly,1,,'))
+        self.assertEqual(len(list(lines)), 1)
+        self.assertIsNone(queryset._result_cache)
+    
+    def test_line_items_csv(self):
+        """Test that line items are exported per month with their snapshots."""
+        rows = list(csv.reader(stream_export('line-items', 'csv')))
+        self.assertEqual(rows[0], ['month', 'budget_item_id', 'name', 'owner', 'cost', 'repeats'])
+        self.assertEqual(rows[1:], [
+            ['2024-01-01', str(self.rent.id), 'Rent', 'John', '1200.00', 'True'],
+            ['2024-02-01', str(self.rent.id), 'Rent', 'John', '1200.00', 'True'],
+            ['2024-02-01', str(self.insurance.id), 'Insurance, Car', 'Jane', '150.50', 'True'],
+        ])
+    
+    def test_line_items_jsonl_month_range(self):
+        """Test JSON lines output restricted to a month range."""
+        rows = [json.loads(line) for line in stream_export('line-items', 'jsonl', start=date(2024, 2, 1))]
+        self.assertEqual([row['cost'] for row in rows], ['1200.00', '150.50'])
+        self.assertEqual({row['month'] for row in rows}, {'2024-02-01'})
+    
+    def test_export_endpoint_streams(self):
+        """Test that the endpoint returns a streaming attachment."""
+        user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.client.force_login(user)
+        response = self.client.get('/api/export/items/', {'format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual({row['name'] for row in rows}, {'Rent', 'Insurance, Car'})
+        self.assertEqual(self.client.get('/api/export/items/', {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/export/owners/').status_code, 404)
+    
+    def test_export_budget_command(self):
+        """Test the export_budget management command."""
+        out = StringIO()
+        call_command('export_budget', 'line-items', '--from', '2024-02', '--chunk-size', '1', stdout=out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2][2], 'Insurance, Car')
+
+
+class ImportItemsTest(TestCase):
+    """Test bulk import of budget items from CSV."""
+    
+    CSV = (
+        'name,owner,cost,repeats,startdate,end_date\n'
+        'Rent,John,1200.00,true,2024-01-01,\n'
+        'Gym,Jane,45.5,yes,2024-02-15,2024-03-31\n'
+        'Too cheap,John,0.001,false,2024-01-01,\n'
+        'Bad date,John,10,false,2024-02-30,\n'
+        ',John,10,false,2024-01-01,\n'
+        'Laptop,Jane,999.99,false,2024-01-10,\n'
+    )
+    
+    def test_import_creates_valid_rows_and_reports_errors(self):
+        """Test that invalid rows are reported by line without aborting the import."""
+        result = import_items(StringIO(self.CSV), batch_size=2)
+        self.assertEqual(result.created, 3)
+        self.assertEqual([line for line, _ in result.errors], [4, 5, 6])
+        self.assertIn('cost', result.errors[0][1])
+        self.assertIn('startdate', result.errors[1][1])
+        self.assertIn('name is required', result.errors[2][1])
+        
+        gym = BudgetItem.objects.get(name='Gym')
+        self.assertEqual(gym.cost, Decimal('45.50'))
+        self.assertTrue(gym.repeats)
+        self.assertEqual(gym.end_date, date(2024, 3, 31))
+        self.assertIsNotNone(gym.created_at)
+        self.assertIsNone(BudgetItem.objects.get(name='Laptop').end_date)
+    
+    def test_import_recurrence_rules(self):
+        """Test that the optional rule columns are validated and stored, defaulting to monthly."""
+        result = import_items(StringIO(
+            'name,owner,cost,repeats,recurrence,interval,day_of_month,startdate\n'
+            'Water,John,60.00,true,quarterly,,,2024-01-01\n'
+            'Car tax,John,120.00,true,every_n_months,6,,2024-03-01\n'
+            'Card,Jane,15.00,true,day_of_month,,31,2024-01-01\n'
+            'Rent,John,1200.00,true,,,,2024-01-01\n'
+            'Bad rule,John,10,true,hourly,,,2024-01-01\n'
+            'Bad interval,John,10,true,every_n_months,0,,2024-01-01\n'
+            'No day,John,10,true,day_of_month,,,2024-01-01\n'
+            'Bad day,John,10,true,day_of_month,,32,2024-01-01\n'
+        ))
+        self.assertEqual(result.created, 4)
+        self.assertEqual([line for line, _ in result.errors], [6, 7, 8, 9])
+        self.assertIn('recurrence', result.errors[0][1])
+        self.assertIn('interval', result.errors[1][1])
+        self.assertIn('day_of_month is required', result.errors[2][1])
+        self.assertIn('day_of_month', result.errors[3][1])
+        self.assertEqual(
+            {item.name: (item.recurrence, item.interval, item.day_of_month) for item in BudgetItem.objects.all()},
+            {
+                'Water': ('quarterly', 1, None), 'Car tax': ('every_n_months', 6, None),
+                'Card': ('day_of_month', 1, 31), 'Rent': ('monthly', 1, None),
+            }
+        )
+        car_tax = BudgetItem.objects.get(name='Car tax')
+        self.assertEqual(
+            (car_tax.first_month, car_tax.occurrences_in(date(2024, 9, 1)), car_tax.occurrences_in(date(2024, 6, 1))),
+            (month_ordinal(date(2024, 3, 1)), 1, 0)
+        )
+    
+    def test_export_round_trip_keeps_rules(self):
+        """Test that importing an items export recreates the items with their rules."""
+        BudgetItem.objects.create(
+            name='Water', owner=owner_named('John'), cost=Decimal('60.00'), repeats=True,
+            recurrence='quarterly', startdate=date(2024, 1, 1)
+        )
+        BudgetItem.objects.create(
+            name='Cleaner', owner=owner_named('Jane'), cost=Decimal('40.00'), repeats=True,
+            recurrence='day_of_month', day_of_month=15, startdate=date(2024, 1, 1), end_date=date(2024, 12, 31)
+        )
+        fields = ('name', 'owner__name', 'cost', 'repeats', 'recurrence', 'interval', 'day_of_month',
+                  'startdate', 'end_date', 'first_month', 'last_month')
+        before = sorted(BudgetItem.objects.values_list(*fields))
+        exported = ''.join(stream_export('items', 'csv'))
+        BudgetItem.objects.all().delete()
+        result = import_items(StringIO(exported))
+        self.assertEqual(result.errors, [])
+        self.assertEqual(sorted(BudgetItem.objects.values_list(*fields)), before)
+    
+    def test_owners_are_matched_by_name(self):
+        """Test that imported rows reuse existing owners and create missing ones once."""
+        john = owner_named('John')
+        import_items(StringIO(self.CSV), batch_size=2)
+        self.assertEqual(sorted(Owner.objects.values_list('name', flat=True)), ['Jane', 'John'])
+        self.assertEqual(BudgetItem.objects.get(name='Rent').owner, john)
+        self.assertEqual(BudgetItem.objects.get(name='Gym').owner, BudgetItem.objects.get(name='Laptop').owner)
+    
+    def test_missing_columns_raise(self):
+        """Test that a header without required columns is rejected up front."""
+        with self.assertRaises(ValueError):
+            import_items(StringIO('name,owner\nRent,John\n'))
+        self.assertEqual(BudgetItem.objects.count(), 0)
+    
+    def test_link_months_adds_lines_and_totals(self):
+        """Test that new repeating items are linked into existing months."""
+        existing = BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('John'),
+            cost=Decimal('100.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        january = MonthlyInstance.objects.create(month=date(2024, 1, 1))
+        march = MonthlyInstance.objects.create(month=date(2024, 3, 1))
+        april = MonthlyInstance.objects.create(month=date(2024, 4, 1))
+        
+        result = import_items(StringIO(self.CSV), link_months=True)
+        self.assertEqual(result.linked, 4)  # Rent x3, Gym in March only
+        
+        for instance, expected in [(january, '1300.00'), (march, '1345.50'), (april, '1300.00')]:
+            instance.refresh_from_db()
+            self.assertEqual(instance.total_amount, Decimal(expected))
+            self.assertEqual(instance.total_amount, instance.calculate_total())
+        gym = MonthlyLineItem.objects.get(budget_item__name='Gym')
+        self.assertEqual((gym.monthly_instance, gym.cost_snapshot, gym.owner), (march, Decimal('45.50'), 'Jane'))
+        self.assertFalse(existing.line_items.filter(monthly_instance__month__gt=date(2024, 4, 1)).exists())
+    
+    def test_import_items_command(self):
+        """Test the import_items management command."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.CSV)
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_items', handle.name, '--batch-size', '2', stdout=out, stderr=err)
+        self.assertIn('Created 3 budget item(s)', out.getvalue())
+        self.assertIn('skipped 3 invalid row(s)', out.getvalue())
+        self.assertIn('Line 4:', err.getvalue())
+    
+    def test_admin_upload(self):
+        """Test the admin CSV upload view."""
+        user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/admin/budgets/budgetitem/'), '/admin/budgets/budgetitem/import/')
+        upload = SimpleUploadedFile('items.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post('/admin/budgets/budgetitem/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Created 3 budget item(s)')
+        self.assertContains(response, 'Line 5:')
+        self.assertEqual(BudgetItem.objects.count(), 3)
+
+
+class MonthCacheTest(TestCase):
+    """Test cached month totals, owner subtotals and item ids."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        budget_cache.reset_stats()
+        self.this_month = month_start(timezone.localdate())
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=self.month(-1)
+        )
+        self.insurance = BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=self.month(1)
+        )
+        self.one_off = BudgetItem.objects.create(
+            name='One-time Payment',
+            owner=owner_named('Alice'),
+            cost=Decimal('500.00'),
+            repeats=False,
+            startdate=self.month(0)
+        )
+        MonthlyInstance.objects.bulk_generate(self.month(-1), self.month(1))
+        self.months = [self.month(offset) for offset in (-1, 0, 1)]
+    
+    def month(self, offset):
+        return ordinal_to_month(month_ordinal(self.this_month) + offset)
+    
+    def read(self, month):
+        return budget_cache.month_total(month), budget_cache.owner_subtotals(month), budget_cache.item_ids(month)
+    
+    def assertFresh(self):
+        for month in self.months:
+            instance = MonthlyInstance.objects.filter(month=month).first()
+            if instance is None:
+                expected = (None, {}, frozenset())
+            else:
+                expected = (
+                    instance.total_amount,
+                    instance.owner_breakdown(),
+                    frozenset(instance.budget_items.values_list('id', flat=True)),
+                )
+            self.assertEqual(self.read(month), expected, month)
+    
+    def test_hits_and_misses_are_counted(self):
+        """Test that repeated reads are served from the cache."""
+        self.assertEqual(budget_cache.month_total(self.month(0)), Decimal('1200.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(budget_cache.month_total(self.month(0)), Decimal('1200.00'))
+        self.assertEqual(budget_cache.stats['total.miss'], 1)
+        self.assertEqual(budget_cache.stats['total.hit'], 1)
+    
+    def test_no_stale_reads_after_edits(self):
+        """Test that every kind of write is visible to the next cached read."""
+        current = MonthlyInstance.objects.get(month=self.month(0))
+        
+        def edit_item(item, **changes):
+            item = BudgetItem.objects.get(pk=item.pk)
+            for name, value in changes.items():
+                setattr(item, name, value)
+            item.save()
+        
+        def delete_gym():
+            BudgetItem.objects.filter(name='Gym').delete()
+            # The stored total would be as stale as the cache, so compare
+            # with the line items.
+            for month in self.months:
+                lines = MonthlyInstance.objects.get(month=month).line_items.aggregate(total=Sum('cost_snapshot'))
+                self.assertEqual(
+                    budget_cache.month_total(month), (lines['total'] or Decimal('0')).quantize(Decimal('0.01'))
+                )
+        
+        edits = [
+            lambda: edit_item(self.rent, cost=Decimal('1300.00')),
+            lambda: edit_item(self.insurance, owner=owner_named('Janet')),
+            lambda: edit_item(self.rent, end_date=self.month(0)),
+            lambda: current.budget_items.add(self.one_off),
+            lambda: current.calculate_total(),
+            lambda: self.one_off.monthlyinstance_set.remove(current),
+            lambda: self.one_off.monthlyinstance_set.add(current),
+            lambda: BudgetItemCostPeriod.objects.create(
+                budget_item=self.insurance, effective_from=self.month(1), cost=Decimal('175.00')
+            ),
+            lambda: edit_item(self.insurance, repeats=False),
+            lambda: self.rent.monthlyinstance_set.clear(),
+            lambda: MonthlyInstance.objects.filter(month=self.month(1)).first().save(),
+            lambda: BudgetItem.objects.get(pk=self.one_off.pk).delete(),
+            lambda: MonthlyInstance.objects.refresh_totals(),
+            lambda: import_items(StringIO(
+                f'name,owner,cost,repeats,startdate\nGym,Bob,45.00,true,{self.month(-1)}\n'
+            ), link_months=True),
+            delete_gym,
+            lambda: MonthlyInstance.objects.filter(month=self.month(1)).delete(),
+            lambda: MonthlyInstance.objects.bulk_generate(self.month(1), self.month(1)),
+        ]
+        self.assertFresh()
+        for edit in edits:
+            edit()
+            self.assertFresh()
+    
+    def test_invalidation_is_limited_to_affected_months(self):
+        """Test that an edit only invalidates the months the item is linked to."""
+        self.assertFresh()
+        insurance = BudgetItem.objects.get(pk=self.insurance.pk)
+        insurance.cost = Decimal('175.00')
+        with self.assertNumQueries(0):
+            self.read(self.month(-1))
+            self.read(self.month(0))
+        insurance.save()
+        with self.assertNumQueries(0):
+            self.read(self.month(-1))
+            self.read(self.month(0))
+        self.assertEqual(budget_cache.month_total(self.month(1)), Decimal('1375.00'))
+        self.assertEqual(budget_cache.stats['total.miss'], 4)
+    
+    def test_invalidates_again_on_commit(self):
+        """Test that months are invalidated again when the transaction commits."""
+        budget_cache.month_total(self.month(0))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            current = MonthlyInstance.objects.get(month=self.month(0))
+            current.notes = 'Edited'
+            current.save()
+        self.assertEqual(len(callbacks), 1)
+        budget_cache.month_total(self.month(0))
+        self.assertEqual(budget_cache.stats['total.miss'], 2)
+    
+    def test_month_summary_endpoint(self):
+        """Test the cached month summary API endpoint."""
+        user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.client.force_login(user)
+        response = self.client.get(f'/api/months/{self.month(1):%Y-%m}/')
+        self.assertEqual(response.json(), {
+            'month': self.month(1).isoformat(),
+            'total_amount': '1350.00',
+            'owners': {'John': '1200.00', 'Jane': '150.00'},
+            'item_ids': sorted([self.rent.id, self.insurance.id]),
+        })
+        self.assertEqual(self.client.get('/api/months/1999-01/').status_code, 404)
+        self.assertEqual(self.client.get('/api/months/soon/').status_code, 400)
+
+
+class OwnerMonthSummaryTest(TestCase):
+    """Test that the owner x month summary table stays in step with the line items."""
+    
+    def setUp(self):
+        self.this_month = month_start(timezone.localdate())
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=self.month(-1)
+        )
+        self.insurance = BudgetItem.objects.create(
+            name='Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=self.month(0)
+        )
+        self.one_off = BudgetItem.objects.create(
+            name='One-time Payment',
+            owner=owner_named('John'),
+            cost=Decimal('500.00'),
+            repeats=False,
+            startdate=self.month(0)
+        )
+        MonthlyInstance.objects.bulk_generate(self.month(-1), self.month(2))
+        self.current = MonthlyInstance.objects.get(month=self.month(0))
+    
+    def month(self, offset):
+        return ordinal_to_month(month_ordinal(self.this_month) + offset)
+    
+    def summaries(self):
+        return {
+            (month, owner): (total, count)
+            for month, owner, total, count in OwnerMonthSummary.objects.values_list(
+                'monthly_instance__month', 'owner', 'total', 'item_count'
+            )
+        }
+    
+    def assertSummariesMatchLineItems(self):
+        expected = {
+            (month, owner): (total.quantize(Decimal('0.01')), count)
+            for month, owner, total, count in MonthlyLineItem.objects.order_by().values(
+                'monthly_instance__month', 'owner'
+            ).annotate(
+                total=Sum('cost_snapshot'), count=Count('pk')
+            ).values_list('monthly_instance__month', 'owner', 'total', 'count')
+        }
+        self.assertEqual(self.summaries(), expected)
+    
+    def test_bulk_generate_summarises_new_months(self):
+        """Test that generated months get one summary row per owner."""
+        self.assertEqual(self.summaries()[(self.month(0), 'John')], (Decimal('1200.00'), 1))
+        self.assertEqual(self.summaries()[(self.month(0), 'Jane')], (Decimal('150.00'), 1))
+        self.assertNotIn((self.month(-1), 'Jane'), self.summaries())
+    
+    def test_summaries_follow_every_write_path(self):
+        """Test item edits, M2M changes, cost periods, imports and deletes."""
+        def edit_item(item, **changes):
+            item = BudgetItem.objects.get(pk=item.pk)
+            for name, value in changes.items():
+                setattr(item, name, value)
+            item.save()
+        
+        edits = [
+            lambda: self.current.budget_items.add(self.one_off),
+            lambda: edit_item(self.rent, cost=Decimal('1300.00')),
+            lambda: edit_item(self.insurance, owner=owner_named('John')),
+            lambda: edit_item(self.rent, end_date=self.month(0)),
+            lambda: edit_item(self.rent, end_date=None, startdate=self.month(1)),
+            lambda: BudgetItemCostPeriod.objects.create(
+                budget_item=self.insurance, effective_from=self.month(1), cost=Decimal('175.00')
+            ),
+            lambda: self.one_off.monthlyinstance_set.remove(self.current),
+            lambda: self.one_off.monthlyinstance_set.add(self.current),
+            lambda: self.current.budget_items.set([self.rent]),
+            lambda: self.current.auto_populate_repeating_items(),
+            lambda: self.insurance.monthlyinstance_set.clear(),
+            lambda: self.current.budget_items.clear(),
+            lambda: import_items(StringIO(
+                f'name,owner,cost,repeats,startdate\nGym,Bob,45.00,true,{self.month(-1)}\n'
+            ), link_months=True),
+            lambda: BudgetItem.objects.get(pk=self.rent.pk).delete(),
+            lambda: BudgetItem.objects.filter(name='Gym').delete(),
+            lambda: MonthlyInstance.objects.filter(month=self.month(2)).delete(),
+        ]
+        for edit in edits:
+            edit()
+            self.assertSummariesMatchLineItems()
+    
+    def test_cascade_delete_keeps_totals_and_summaries_in_step(self):
+        """Test that a cascade bypassing discard() drops the lines from both the totals and the summaries."""
+        self.current.budget_items.add(self.one_off)
+        self.current.calculate_total()
+        # The plain QuerySet.delete() cascades to the line items directly,
+        # leaving only the pre_delete receiver to adjust the months.
+        models.QuerySet.delete(BudgetItem.objects.filter(pk__in=[self.rent.pk, self.one_off.pk]))
+        self.assertSummariesMatchLineItems()
+        self.assertEqual(
+            dict(MonthlyInstance.objects.values_list('month', 'total_amount')),
+            {self.month(-1): Decimal('0.00'), self.month(0): Decimal('150.00'),
+             self.month(1): Decimal('150.00'), self.month(2): Decimal('150.00')}
+        )
+        call_command('verify_totals', stdout=StringIO())
+    
+    def test_owner_breakdown_reads_summaries(self):
+        """Test that owner breakdowns are a single query over the summary table."""
+        self.current.budget_items.add(self.one_off)
+        with self.assertNumQueries(1) as ctx:
+            breakdown = self.current.owner_breakdown()
+        self.assertEqual(breakdown, {'John': Decimal('1700.00'), 'Jane': Decimal('150.00')})
+        self.assertNotIn('monthlylineitem', ctx.captured_queries[0]['sql'])
+    
+    def test_rebuild_owner_summaries_command(self):
+        """Test that the rebuild command restores a damaged table."""
+        OwnerMonthSummary.objects.filter(owner='Jane').delete()
+        OwnerMonthSummary.objects.update(total=Decimal('1.00'))
+        out = StringIO()
+        call_command('rebuild_owner_summaries', '--from', self.month(0).strftime('%Y-%m'), stdout=out)
+        self.assertIn('Wrote 6 owner summary row(s)', out.getvalue())
+        self.assertEqual(self.summaries()[(self.month(-1), 'John')], (Decimal('1.00'), 1))
+        call_command('rebuild_owner_summaries', stdout=StringIO())
+        self.assertSummariesMatchLineItems()
+
+
+class BudgetItemAdminTest(TestCase):
+    """Test the Django admin changelist for BudgetItem."""
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+        self.active_item = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.future_item = BudgetItem.objects.create(
+            name='Future Insurance',
+            owner=owner_named('Jane'),
+            cost=Decimal('150.00'),
+            repeats=True,
+            startdate=date(2024, 12, 1)
+        )
+        MonthlyInstance.objects.create(month=date(2024, 6, 1))
+    
+    def test_active_in_month_filter(self):
+        """Test that the changelist can be filtered to items active in a month."""
+        response = self.client.get('/admin/budgets/budgetitem/', {'active_in': '2024-06-01'})
+        self.assertEqual(response.status_code, 200)
+        items = list(response.context['cl'].queryset)
+        self.assertEqual(items, [self.active_item])
+        self.assertContains(response, 'June 2024')
+    
+    def test_active_in_month_filter_lists_months_around_today(self):
+        """Test that the filter lists a bounded number of months around today, whatever the history."""
+        today = month_ordinal(timezone.localdate())
+        MonthlyInstance.objects.bulk_generate(ordinal_to_month(today - 120), ordinal_to_month(today + 24))
+        response = self.client.get('/admin/budgets/budgetitem/')
+        changelist = response.context['cl']
+        spec = next(spec for spec in changelist.filter_specs if isinstance(spec, ActiveInMonthFilter))
+        choices = [choice['display'] for choice in spec.choices(changelist)]
+        around = ActiveInMonthFilter.MONTHS_AROUND
+        expected = [
+            ordinal_to_month(ordinal).strftime('%B %Y') for ordinal in range(today + around, today - around - 1, -1)
+        ]
+        self.assertEqual(choices, ['All'] + expected)
+    
+    def test_owner_filter_uses_owner_table(self):
+        """Test that the owner filter lists Owner rows and filters by foreign key."""
+        owner_named('Nobody')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/budgets/budgetitem/', {'owner__id__exact': self.future_item.owner_id})
+        self.assertEqual(list(response.context['cl'].queryset), [self.future_item])
+        self.assertContains(response, 'Nobody')
+        self.assertFalse(
+            [query['sql'] for query in queries if 'DISTINCT' in query['sql'] and 'budgetitem' in query['sql']]
+        )
+
+
 class MonthlyInstanceAdminTest(TestCase):
     """Test Django admin interface behavior for MonthlyInstance with auto-populated items."""
     
@@ -246,7 +1508,7 @@ class MonthlyInstanceAdminTest(TestCase):
         # Create repeating budget items that should be auto-populated
         self.repeating_item1 = BudgetItem.objects.create(
             name='Monthly Rent',
-            owner='John',
+            owner=owner_named('John'),
             cost=Decimal('1200.00'),
             repeats=True,
             startdate=date(2024, 1, 1)
@@ -254,7 +1516,7 @@ class MonthlyInstanceAdminTest(TestCase):
         
         self.repeating_item2 = BudgetItem.objects.create(
             name='Car Insurance',
-            owner='Jane',
+            owner=owner_named('Jane'),
             cost=Decimal('150.00'),
             repeats=True,
             startdate=date(2024, 1, 1)
@@ -263,7 +1525,7 @@ class MonthlyInstanceAdminTest(TestCase):
         # Create a non-repeating item that should NOT be auto-populated
         self.non_repeating_item = BudgetItem.objects.create(
             name='One-time Expense',
-            owner='Bob',
+            owner=owner_named('Bob'),
             cost=Decimal('500.00'),
             repeats=False,
             startdate=date(2024, 1, 1)
@@ -390,3 +1652,899 @@ class MonthlyInstanceAdminTest(TestCase):
         # Verify the string representation shows the correct total
         expected_str = f"{self.test_month.strftime('%B %Y')} - Total: ${expected_total}"
         self.assertEqual(str(instance), expected_str)
+
+
+class MonthlyInstanceItemPickerTest(TestCase):
+    """Test the autocomplete item pickers of the MonthlyInstance change form."""
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+        self.rent = BudgetItem.objects.create(
+            name='Rent',
+            owner=owner_named('John'),
+            cost=Decimal('1200.00'),
+            repeats=True,
+            startdate=date(2024, 1, 1)
+        )
+        self.laptop = BudgetItem.objects.create(
+            name='Laptop',
+            owner=owner_named('Jane'),
+            cost=Decimal('999.99'),
+            repeats=False,
+            startdate=date(2024, 1, 1)
+        )
+        self.instance = MonthlyInstance.objects.create(month=date(2024, 6, 1))
+        self.instance.budget_items.add(self.laptop)
+    
+    def add_unselected_items(self, count):
+        owners = [owner_named(f'Owner {i}') for i in range(5)]
+        start = BudgetItem.objects.count()
+        BudgetItem.objects.bulk_create([
+            BudgetItem(
+                name=f'Unselected {start + i}',
+                owner=owners[i % 5],
+                cost=Decimal('10.00'),
+                repeats=i % 2 == 0,
+                startdate=date(2025, 1, 1)
+            )
+            for i in range(count)
+        ])
+    
+    def render_change_form(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/budgets/monthlyinstance/{self.instance.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.content)
+    
+    def test_change_form_cost_is_independent_of_item_count(self):
+        """Test that the change form renders only the selected items, whatever the table size."""
+        self.add_unselected_items(10)
+        self.render_change_form()  # Warm per-process caches such as content types.
+        baseline = self.render_change_form()
+        self.add_unselected_items(500)
+        self.assertEqual(self.render_change_form(), baseline)
+        
+        response = self.client.get(f'/admin/budgets/monthlyinstance/{self.instance.pk}/change/')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, str(self.rent))
+        self.assertContains(response, str(self.laptop))
+        self.assertNotContains(response, 'Unselected')
+    
+    def test_item_lookup_searches_and_pages(self):
+        """Test that the lookup endpoint filters by repeats and term and pages by name."""
+        self.add_unselected_items(50)
+        url = '/admin/budgets/monthlyinstance/item-lookup/'
+        
+        data = self.client.get(url, {'repeats': 'false', 'term': 'lapt'}).json()
+        self.assertEqual(data, {
+            'results': [{'id': str(self.laptop.pk), 'text': str(self.laptop)}],
+            'pagination': {'more': False},
+        })
+        self.assertEqual(self.client.get(url, {'repeats': 'false', 'term': 'apt'}).json()['results'], [])
+        
+        seen = []
+        params = {'repeats': 'true', 'term': 'unsel'}
+        for page in (1, 2):
+            data = self.client.get(url, params).json()
+            seen += [row['text'] for row in data['results']]
+            self.assertEqual(data['pagination']['more'], page == 1)
+            params['cursor'] = data['pagination'].get('cursor')
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen))
+        self.assertNotIn(str(self.rent), seen)
+        self.assertEqual(self.client.get(url, {'repeats': 'true', 'cursor': 'junk'}).status_code, 400)
+        
+        response = self.client.get(f'/admin/budgets/monthlyinstance/{self.instance.pk}/change/')
+        self.assertContains(response, 'data-keyset')
+        self.assertContains(response, 'budgets/js/item_lookup.js')
+    
+    def test_item_lookup_seeks_on_the_name_index(self):
+        """Test that prefix searches and later pages seek on the name index instead of scanning it."""
+        self.add_unselected_items(50)
+        url = '/admin/budgets/monthlyinstance/item-lookup/'
+        for params in ({'term': 'unsel'}, {}):
+            params['repeats'] = 'true'
+            params['cursor'] = self.client.get(url, params).json()['pagination']['cursor']
+            request = RequestFactory().get(url, params)
+            request.user = self.user
+            with CaptureQueriesContext(connection) as queries:
+                MonthlyInstanceAdmin(MonthlyInstance, AdminSite()).item_lookup_view(request)
+            sql = next(query['sql'] for query in queries if 'budgets_budgetitem' in query['sql'])
+            with connection.cursor() as db:
+                db.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(row[-1] for row in db.fetchall())
+            self.assertIn('SEARCH budgets_budgetitem USING INDEX budgetitem_repeating_name_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class MonthlyInstanceSelectionTest(TestCase):
+    """Test applying an item selection to a month, directly and through the admin."""
+    
+    # Session, user, the save itself and the selection diff; see
+    # MonthlyInstance.apply_selection.
+    ADMIN_ADD_QUERIES = 20
+    ADMIN_CHANGE_QUERIES = 20
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+        ContentType.objects.get_for_model(MonthlyInstance)  # Cached for the admin log.
+        self.laptop = BudgetItem.objects.create(
+            name='Laptop',
+            owner=owner_named('Jane'),
+            cost=Decimal('999.99'),
+            repeats=False,
+            startdate=date(2024, 1, 1)
+        )
+    
+    def create_repeating(self, count):
+        owner = owner_named('John')
+        return [
+            BudgetItem.objects.create(
+                name=f'Repeating {i}',
+                owner=owner,
+                cost=Decimal('10.00'),
+                repeats=True,
+                startdate=date(2024, 1, 1)
+            )
+            for i in range(count)
+        ]
+    
+    def assertMonthConsistent(self, instance):
+        instance.refresh_from_db()
+        lines = instance.line_items.aggregate(total=Sum('cost_snapshot'), count=Count('pk'))
+        self.assertEqual(instance.total_amount, (lines['total'] or Decimal('0')).quantize(Decimal('0.01')))
+        summaries = instance.owner_summaries.aggregate(total=Sum('total'), count=Sum('item_count'))
+        self.assertEqual(summaries['count'] or 0, lines['count'])
+        self.assertEqual(summaries['total'] or Decimal('0'), instance.total_amount)
+    
+    def test_apply_selection_writes_only_the_difference(self):
+        """Test that items are added and removed by diff and the total kept in step."""
+        rent, gym = self.create_repeating(2)
+        instance = MonthlyInstance.objects.create(month=date(2024, 6, 1))
+        
+        self.assertTrue(instance.apply_selection([rent.pk, self.laptop.pk]))
+        self.assertEqual(set(instance.budget_items.all()), {rent, self.laptop})
+        self.assertEqual(instance.total_amount, Decimal('1009.99'))
+        self.assertMonthConsistent(instance)
+        
+        with self.assertNumQueries(3):  # savepoint, read of current items, release
+            self.assertFalse(instance.apply_selection([self.laptop.pk, rent.pk]))
+    
+    def test_admin_add_is_a_constant_number_of_queries(self):
+        """Test that adding a month populates it in one pass whatever the number of items."""
+        for count, month in [(3, date(2024, 6, 1)), (30, date(2024, 7, 1))]:
+            self.create_repeating(count)
+            with self.assertNumQueries(self.ADMIN_ADD_QUERIES):
+                response = self.client.post('/admin/budgets/monthlyinstance/add/', {
+                    'month': month.isoformat(),
+                    'notes': '',
+                    'non_repeating_items': [self.laptop.pk],
+                })
+            self.assertEqual(response.status_code, 302)
+            instance = MonthlyInstance.objects.get(month=month)
+            self.assertIn(self.laptop, instance.budget_items.all())
+            self.assertEqual(instance.budget_items.filter(repeats=True).count(), 33 if count == 30 else 3)
+            self.assertMonthConsistent(instance)
+    
+    def test_admin_change_is_a_constant_number_of_queries(self):
+        """Test that editing a month's items is a constant number of queries."""
+        for count, month in [(3, date(2024, 6, 1)), (30, date(2024, 7, 1))]:
+            items = self.create_repeating(count)
+            instance = MonthlyInstance.objects.create(month=month)
+            instance.budget_items.add(self.laptop)
+            with self.assertNumQueries(self.ADMIN_CHANGE_QUERIES):
+                response = self.client.post(f'/admin/budgets/monthlyinstance/{instance.pk}/change/', {
+                    'month': month.isoformat(),
+                    'notes': 'Trimmed',
+                    'repeating_items': [item.pk for item in items[1:]],
+                    'non_repeating_items': [self.laptop.pk],
+                })
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(set(instance.budget_items.all()), set(items[1:]) | {self.laptop})
+            self.assertMonthConsistent(instance)
+
+
+class BenchmarkSuiteTest(TestCase):
+    """Test the synthetic data generator and the macro benchmark suite."""
+    
+    def seed(self, seed=0):
+        out = StringIO()
+        call_command(
+            'seed_benchmark', '--items', '300', '--owners', '7', '--months', '6',
+            '--from', '2024-01', '--seed', str(seed), stdout=out
+        )
+        return out.getvalue()
+    
+    def test_seed_is_deterministic_and_consistent(self):
+        """Test that a seed always produces the same rows, with totals matching the line items."""
+        self.assertIn('300 items', self.seed())
+        self.assertEqual(Owner.objects.count(), 7)
+        self.assertEqual(MonthlyInstance.objects.count(), 6)
+        self.assertTrue(MonthlyLineItem.objects.filter(repeats=False).exists())
+        for instance in MonthlyInstance.objects.all():
+            self.assertEqual(instance.total_amount, instance.calculate_total(), instance.month)
+            self.assertEqual(
+                instance.owner_summaries.aggregate(total=Sum('total'))['total'], instance.total_amount
+            )
+        
+        def snapshot():
+            return (
+                list(BudgetItem.objects.order_by('name').values_list('name', 'owner__name', 'cost', 'startdate')),
+                list(MonthlyInstance.objects.order_by('month').values_list('month', 'total_amount')),
+            )
+        
+        first = snapshot()
+        MonthlyInstance.objects.all().delete()
+        BudgetItem.objects.all().delete()
+        self.seed()
+        self.assertEqual(snapshot(), first)
+    
+    def test_seed_refuses_existing_data(self):
+        """Test that seeding never mixes synthetic rows into existing data."""
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+    
+    def test_suite_writes_json_results(self):
+        """Test that the suite times every benchmark against the seeded data and reports as JSON."""
+        self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('benchmark_suite', '--repeat', '1', '--label', 'test', '--output', path, stdout=StringIO())
+            with open(path) as handle:
+                report = json.load(handle)
+        self.assertEqual(report['label'], 'test')
+        self.assertEqual(report['dataset']['items'], 300)
+        self.assertEqual(
+            {result['benchmark'] for result in report['results']},
+            {'admin_pages', 'month_writes', 'reports'}
+        )
+        for result in report['results']:
+            self.assertEqual(result.get('status', 200), 200, result)
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(MonthlyInstance.objects.count(), 6)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test that hot paths run a constant number of queries at 10, 1k and 10k items."""
+    
+    MONTH = date(2024, 6, 1)
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+        ContentType.objects.get_for_model(MonthlyInstance)  # Cached by the change page.
+        self.owners = [owner_named(f'Owner {i}') for i in range(5)]
+    
+    def create_items(self, count, repeats=True):
+        return BudgetItem.objects.bulk_create([
+            BudgetItem(
+                name=f'Item {i}',
+                owner=self.owners[i % 5],
+                cost=Decimal('10.00') + i % 7,
+                repeats=repeats,
+                startdate=date(2024, 1, 1)
+            )
+            for i in range(count)
+        ], batch_size=5000)
+    
+    def create_month(self, size):
+        """Build ``size`` repeating items and one month linking all of them."""
+        self.create_items(size)
+        return MonthlyInstance.objects.bulk_generate(self.MONTH, self.MONTH)[0]
+    
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+    
+    # Below a page of items the changelist drops its LIMIT.
+    @mock.patch.object(BudgetItemAdmin, 'list_per_page', 5)
+    def test_budget_item_changelist(self):
+        """Test the BudgetItem changelist, whose rows show each item's owner."""
+        self.assertConstantQueries(
+            'BudgetItem changelist', self.create_items,
+            lambda items: self.get('/admin/budgets/budgetitem/'),
+            max_queries=8
+        )
+    
+    def test_monthly_instance_changelist(self):
+        """Test the MonthlyInstance changelist for months with many line items."""
+        self.assertConstantQueries(
+            'MonthlyInstance changelist', self.create_month,
+            lambda instance: self.get('/admin/budgets/monthlyinstance/'),
+            max_queries=6
+        )
+    
+    def test_monthly_instance_change_page(self):
+        """Test the MonthlyInstance change form against a growing number of unselected items."""
+        def build(size):
+            self.create_items(size, repeats=False)
+            self.create_items(3)
+            return MonthlyInstance.objects.create(month=self.MONTH)
+        
+        self.assertConstantQueries(
+            'MonthlyInstance change page', build,
+            lambda instance: self.get(f'/admin/budgets/monthlyinstance/{instance.pk}/change/'),
+            max_queries=8
+        )
+    
+    def test_monthly_instance_save(self):
+        """Test creating a month, which links every active repeating item."""
+        self.assertConstantQueries(
+            'MonthlyInstance.save', self.create_items,
+            lambda items: MonthlyInstance.objects.create(month=self.MONTH),
+            max_queries=16, max_time=5
+        )
+    
+    def test_calculate_total(self):
+        """Test that calculate_total is one aggregate and one UPDATE however big the month."""
+        count = self.assertConstantQueries(
+            'calculate_total', self.create_month, lambda instance: instance.calculate_total(),
+            max_queries=2, max_time=1
+        )
+        self.assertEqual(count, 2)
+    
+    def test_n_plus_one_fails_with_diff(self):
+        """Test that a per-row query is reported as a diff between sizes."""
+        with self.assertRaises(AssertionError) as ctx:
+            self.assertConstantQueries(
+                'item labels', self.create_items,
+                lambda items: [str(item) for item in BudgetItem.objects.all()],
+                sizes=(1, 3)
+            )
+        message = str(ctx.exception)
+        self.assertIn('item labels ran 4 queries at size 3 and 2 at size 1', message)
+        self.assertIn('+SELECT "budgets_owner"', message)
+        
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget('item count', max_queries=0):
+                BudgetItem.objects.count()
+
+
+class PerformanceMiddlewareTest(TestCase):
+    """Test the opt-in request instrumentation middleware."""
+    
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.user)
+        BudgetItem.objects.create(
+            name='Rent', owner=owner_named('John'), cost=Decimal('500.00'),
+            repeats=True, startdate=date(2024, 1, 1)
+        )
+    
+    def test_disabled_middleware_is_not_loaded(self):
+        """Test that a disabled middleware drops out of the handler chain."""
+        with self.assertRaises(MiddlewareNotUsed):
+            PerformanceMiddleware(lambda request: None)
+        response = self.client.get('/api/items/')
+        self.assertFalse(response.has_header('Server-Timing'))
+    
+    def test_server_timing_and_report(self):
+        """Test the Server-Timing header and the per URL name percentiles report."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'perf.jsonl')
+            with self.settings(BUDGETS_PERF_ENABLED=True, BUDGETS_PERF_REPORT_FILE=path,
+                               BUDGETS_PERF_REPORT_INTERVAL=0):
+                response = self.client.get('/api/items/')
+                self.client.get('/api/months/')
+            timing = response['Server-Timing']
+            match = re.match(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", cache;desc="0 hits, 0 misses"', timing)
+            self.assertTrue(match, timing)
+            self.assertIn('sql-1;dur=', timing)
+            self.assertNotIn('SELECT', timing)
+            with open(path) as handle:
+                reports = [json.loads(line) for line in handle]
+        self.assertEqual(len(reports), 2)
+        items = reports[0]['urls']['budgets:item-list']
+        self.assertEqual(items['requests'], 1)
+        self.assertEqual(items['queries']['p99'], int(match.group(1)))
+        self.assertEqual(set(items['wall_ms']), {'p50', 'p95', 'p99', 'max'})
+        self.assertLessEqual(len(items['slowest_queries']), 3)
+        self.assertIn('SELECT', items['slowest_queries'][0]['sql'])
+        self.assertEqual(list(reports[1]['urls']), ['budgets:month-list'])
+
+
+class ProfilingTest(TestCase):
+    """Test on-demand profile captures of requests and commands."""
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = self.settings(BUDGETS_PROFILE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.instance = MonthlyInstance.objects.create(month=date(2024, 6, 1))
+    
+    def test_staff_request_is_profiled_on_request(self):
+        """Test that only flagged requests of staff users are profiled, and the admin lists them."""
+        url = f'/admin/budgets/monthlyinstance/{self.instance.pk}/change/'
+        self.client.force_login(self.user)
+        self.assertFalse(self.client.get(url).has_header('X-Profile-Capture'))
+        response = self.client.get(url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Capture']
+        self.assertEqual([capture.name for capture in recent_captures()], [name])
+        self.assertEqual(recent_captures()[0].label, f'GET-admin-budgets-monthlyinstance-{self.instance.pk}-change')
+        self.assertTrue(self.client.get(url, headers={'X-Profile': '1'}).has_header('X-Profile-Capture'))
+        
+        listing = self.client.get('/admin/budgets/monthlyinstance/profiles/')
+        self.assertContains(listing, name)
+        detail = self.client.get(f'/admin/budgets/monthlyinstance/profiles/{name}/', {'sort': 'tottime'})
+        self.assertContains(detail, 'tottime')
+        self.assertContains(detail, 'function calls')
+        self.assertEqual(self.client.get('/admin/budgets/monthlyinstance/profiles/db.sqlite3/').status_code, 404)
+        
+        self.client.logout()
+        response = self.client.get('/api/months/', {'_profile': '1'})
+        self.assertFalse(response.has_header('X-Profile-Capture'))
+        self.assertEqual(len(recent_captures()), 2)
+    
+    def test_command_profile_option_and_pruning(self):
+        """Test that --profile captures a command run and old captures are pruned."""
+        err = StringIO()
+        with self.settings(BUDGETS_PROFILE_KEEP=2):
+            for _ in range(3):
+                call_command('rebuild_owner_summaries', profile=True, stdout=StringIO(), stderr=err)
+        captures = recent_captures()
+        self.assertEqual(len(captures), 2)
+        self.assertEqual(captures[0].label, 'command-rebuild_owner_summaries')
+        self.assertIn(str(captures[0].path), err.getvalue())
+        self.assertIn('rebuild', captures[0].top_functions())
+        
+        call_command('rebuild_owner_summaries', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(len(recent_captures()), 2)
+    
+    def test_overlapping_captures_run_unprofiled(self):
+        """Test that requests and commands run unprofiled while another capture or profiler is active."""
+        url = f'/admin/budgets/monthlyinstance/{self.instance.pk}/change/'
+        self.client.force_login(self.user)
+        err = StringIO()
+        with profile('outer') as outer:
+            response = self.client.get(url, {'_profile': '1'})
+            call_command('rebuild_owner_summaries', profile=True, stdout=StringIO(), stderr=err)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Profile-Capture'))
+        self.assertIn('Not profiled', err.getvalue())
+        self.assertEqual([capture.name for capture in recent_captures()], [outer[0].name])
+    
+        with mock.patch('budgets.profiling.cProfile.Profile') as profiler:
+            profiler.return_value.enable.side_effect = ValueError('Another profiling tool is already active')
+            response = self.client.get(url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Profile-Capture'))
+        self.assertTrue(self.client.get(url, {'_profile': '1'}).has_header('X-Profile-Capture'))
+
+
+class MetricsTest(TestCase):
+    """Test the Prometheus metrics and their shared file store."""
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = self.settings(BUDGETS_METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode().splitlines()
+    
+    def test_operations_are_instrumented(self):
+        """Test month population, totals, row writes, imports, admin saves and cache lookups."""
+        for name in ('Rent', 'Gym'):
+            BudgetItem.objects.create(
+                name=name, owner=owner_named('John'), cost=Decimal('10.00'),
+                repeats=True, startdate=date(2024, 1, 1)
+            )
+        MonthlyInstance.objects.create(month=date(2024, 6, 1))
+        import_items(StringIO('name,owner,cost,startdate\nTV,Jane,300.00,2024-06-01\nBad,Jane,x,2024-06-01\n'))
+        budget_cache.month_total(date(2024, 6, 1))
+        budget_cache.month_total(date(2024, 6, 1))
+        user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.client.force_login(user)
+        self.client.post('/admin/budgets/owner/add/', {'name': 'Alex'})
+        
+        lines = self.scrape()
+        for expected in (
+            'budgets_month_populate_seconds_count 1.0',
+            'budgets_month_populate_seconds_bucket{le="+Inf"} 1.0',
+            'budgets_month_populate_items_total 2.0',
+            'budgets_month_total_seconds_count 1.0',
+            'budgets_rows_written_total{model="monthlylineitem",operation="insert"} 2.0',
+            'budgets_rows_written_total{model="budgetitem",operation="insert"} 1.0',
+            'budgets_import_rows_total{result="created"} 1.0',
+            'budgets_import_rows_total{result="skipped"} 1.0',
+            'budgets_import_seconds_count 1.0',
+            'budgets_admin_save_seconds_count{model="owner"} 1.0',
+            'budgets_cache_requests_total{kind="total",result="hit"} 1.0',
+            'budgets_cache_hit_ratio{kind="total"} 0.5',
+            '# TYPE budgets_month_generate_seconds histogram',
+        ):
+            self.assertIn(expected, lines)
+        buckets = [line for line in lines if line.startswith('budgets_month_populate_seconds_bucket')]
+        self.assertEqual(len(buckets), len(metrics.DEFAULT_BUCKETS) + 1)
+    
+    def test_process_files_are_summed(self):
+        """Test that every worker's file counts, survives reopening and grows as keys are added."""
+        metrics.months_generated.inc(2)
+        with mock.patch('budgets.metrics.os.getpid', return_value=-1):
+            metrics.months_generated.inc(3)
+        self.assertIn('budgets_months_generated_total 5.0', self.scrape())
+        
+        with mock.patch.object(metrics.FileStore, 'INITIAL_SIZE', 64):
+            store = metrics.FileStore(self.directory + '/other')
+            store.inc([(f'key {i}', i) for i in range(100)])
+            self.assertEqual(metrics.FileStore(self.directory + '/other').collect()['key 99'], 99)
+            store.inc([('key 99', 1)])
+            self.assertEqual(store.collect()['key 99'], 100)
+
+
+class RecomputeTotalsTest(TestCase):
+    """Test recomputing stored month totals in chunks."""
+    
+    def setUp(self):
+        BudgetItem.objects.create(
+            name='Rent', owner=owner_named('John'), cost=Decimal('500.00'),
+            repeats=True, startdate=date(2024, 1, 1)
+        )
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 6, 1))
+        MonthlyInstance.objects.filter(month__gte=date(2024, 3, 1)).update(total_amount=Decimal('1.00'))
+    
+    def test_queryset_recompute_is_set_based_and_idempotent(self):
+        """Test that only wrong totals are written, with a constant number of queries."""
+        with self.assertNumQueries(5):
+            changed = MonthlyInstance.objects.all().recompute_totals()
+        self.assertEqual(changed, 4)
+        self.assertEqual(set(MonthlyInstance.objects.values_list('total_amount', flat=True)), {Decimal('500.00')})
+        with self.assertNumQueries(2):
+            self.assertEqual(MonthlyInstance.objects.all().recompute_totals(), 0)
+    
+    def test_refresh_totals_is_one_update(self):
+        """Test that refresh_totals sets every total, empty months to zero, in one UPDATE or one per chunk."""
+        gym = BudgetItem.objects.create(
+            name='Gym', owner=owner_named('Jane'), cost=Decimal('10.10'),
+            repeats=False, startdate=date(2024, 6, 1)
+        )
+        MonthlyInstance.objects.get(month=date(2024, 6, 1)).budget_items.add(gym)
+        MonthlyInstance.objects.filter(month=date(2024, 6, 1)).update(total_amount=Decimal('7.00'))
+        empty = MonthlyInstance.objects.create(month=date(2023, 1, 1), total_amount=Decimal('3.00'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(MonthlyInstance.objects.refresh_totals(), 7)
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['SELECT', 'UPDATE'])
+        totals = dict(MonthlyInstance.objects.values_list('month', 'total_amount'))
+        self.assertEqual(totals[date(2024, 2, 1)], Decimal('500.00'))
+        self.assertEqual(totals[date(2024, 6, 1)], Decimal('510.10'))
+        self.assertEqual(totals[empty.month], Decimal('0.00'))
+        
+        MonthlyInstance.objects.update(total_amount=Decimal('1.00'))
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                MonthlyInstance.objects.filter(month__gte=date(2024, 1, 1)).refresh_totals(chunk_months=2), 6
+            )
+        self.assertEqual(
+            dict(MonthlyInstance.objects.values_list('month', 'total_amount')),
+            {**totals, empty.month: Decimal('1.00')}
+        )
+        
+        # Chunks follow the existing months, not the 18 months they span.
+        with self.assertNumQueries(5):
+            self.assertEqual(MonthlyInstance.objects.refresh_totals(chunk_months=2), 7)
+        self.assertEqual(dict(MonthlyInstance.objects.values_list('month', 'total_amount')), totals)
+    
+    def test_command_chunks_and_resumes_from_checkpoint(self):
+        """Test the month range, progress output and that a checkpoint skips finished months."""
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'recompute.json')
+            skipped = MonthlyInstance.objects.get(month=date(2024, 3, 1))
+            with open(checkpoint, 'w') as handle:
+                json.dump({'done': [skipped.pk]}, handle)
+            out = StringIO()
+            call_command(
+                'recompute_totals', '--from', '2024-02', '--chunk', '2', '--checkpoint', checkpoint, stdout=out
+            )
+            self.assertFalse(os.path.exists(checkpoint))
+        output = out.getvalue()
+        self.assertIn('Resuming: 1 month(s) already done, 4 left', output)
+        self.assertIn('2/4 months', output)
+        self.assertIn('Recomputed 4 month total(s), 3 changed', output)
+        skipped.refresh_from_db()
+        self.assertEqual(skipped.total_amount, Decimal('1.00'))
+        
+        with self.assertRaises(CommandError):
+            call_command('recompute_totals', '--workers', '0')
+
+
+class VerifyTotalsTest(TestCase):
+    """Test the chunked month total integrity checker."""
+    
+    def setUp(self):
+        BudgetItem.objects.create(
+            name='Rent', owner=owner_named('John'), cost=Decimal('500.00'),
+            repeats=True, startdate=date(2024, 1, 1)
+        )
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 5, 1))
+        MonthlyInstance.objects.create(month=date(2023, 6, 1))
+        MonthlyInstance.objects.filter(month__in=[date(2024, 2, 1), date(2024, 5, 1)]).update(
+            total_amount=Decimal('499.99')
+        )
+    
+    def test_reports_drift_per_chunk(self):
+        """Test that drift is reported without writing, reading one grouped query per chunk."""
+        out = StringIO()
+        with self.assertNumQueries(4):
+            with self.assertRaises(CommandError) as ctx:
+                call_command('verify_totals', '--chunk', '2', stdout=out)
+        self.assertIn('Checked 6 month total(s)', str(ctx.exception))
+        self.assertIn('2 disagreed', str(ctx.exception))
+        self.assertIn('2024-02: stored 499.99, line items sum to 500.00', out.getvalue())
+        self.assertIn('2024-05: stored 499.99', out.getvalue())
+        self.assertEqual(MonthlyInstance.objects.filter(total_amount=Decimal('499.99')).count(), 2)
+    
+    def test_repair_and_range(self):
+        """Test that --repair fixes the drifted months within the range only."""
+        out = StringIO()
+        call_command('verify_totals', '--to', '2024-03', '--repair', stdout=out)
+        self.assertIn('Checked 4 month total(s)', out.getvalue())
+        self.assertIn('1 disagreed, 1 repaired', out.getvalue())
+        self.assertEqual(
+            list(MonthlyInstance.objects.filter(total_amount=Decimal('499.99')).values_list('month', flat=True)),
+            [date(2024, 5, 1)]
+        )
+        call_command('verify_totals', '--repair', stdout=StringIO())
+        call_command('verify_totals', stdout=StringIO())
+
+
+class ItemIntervalTest(TestCase):
+    """Test the item month range columns, overlap queries and the interval tree."""
+    
+    def setUp(self):
+        john = owner_named('John')
+        self.rent = BudgetItem.objects.create(
+            name='Rent', owner=john, cost=Decimal('500.00'), repeats=True, startdate=date(2024, 1, 1)
+        )
+        self.gym = BudgetItem.objects.create(
+            name='Gym', owner=john, cost=Decimal('30.00'), repeats=True,
+            startdate=date(2024, 2, 15), end_date=date(2024, 6, 1)
+        )
+        self.car = BudgetItem.objects.create(
+            name='Car repair', owner=john, cost=Decimal('250.00'), repeats=False, startdate=date(2024, 4, 20)
+        )
+    
+    def overlapping_names(self, start, end):
+        return set(BudgetItem.objects.overlapping(start, end).values_list('name', flat=True))
+    
+    def test_month_range_set_on_save(self):
+        """Test that save() derives the range from the first active month and the end date."""
+        self.gym.refresh_from_db()
+        self.assertEqual(
+            (self.gym.first_month, self.gym.last_month),
+            (month_ordinal(date(2024, 3, 1)), month_ordinal(date(2024, 6, 1)))
+        )
+        self.rent.end_date = date(2024, 12, 1)
+        self.rent.save(update_fields=['end_date'])
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.last_month, month_ordinal(date(2024, 12, 1)))
+    
+    def test_overlapping(self):
+        """Test that overlap covers active months of repeating items and the month of one-off items."""
+        self.assertEqual(self.overlapping_names(date(2024, 1, 1), date(2024, 2, 29)), {'Rent'})
+        self.assertEqual(self.overlapping_names(date(2024, 4, 1), date(2024, 4, 30)), {'Rent', 'Gym', 'Car repair'})
+        self.assertEqual(self.overlapping_names(date(2024, 7, 1), date(2030, 1, 1)), {'Rent'})
+        self.assertEqual(self.overlapping_names(date(2023, 1, 1), date(2023, 12, 1)), set())
+        for month in (date(2024, 1, 1), date(2024, 3, 1), date(2024, 7, 1)):
+            self.assertEqual(
+                set(BudgetItem.objects.overlapping(month, month).filter(repeats=True)),
+                set(BudgetItem.objects.active_in(month))
+            )
+    
+    def test_bulk_writes_maintain_range(self):
+        """Test that update(), bulk_create() and insert_rows() keep the range in step."""
+        BudgetItem.objects.filter(startdate__gte=date(2024, 2, 1)).update(startdate=date(2025, 1, 1))
+        self.assertEqual(self.overlapping_names(date(2024, 4, 1), date(2024, 4, 30)), {'Rent'})
+        self.assertEqual(self.overlapping_names(date(2025, 1, 1), date(2025, 1, 1)), {'Rent', 'Car repair'})
+        
+        john = owner_named('John')
+        BudgetItem.objects.bulk_create([
+            BudgetItem(name='Phone', owner=john, cost=Decimal('20.00'), repeats=True,
+                       startdate=date(2026, 1, 1), end_date=date(2026, 3, 1)),
+        ])
+        BudgetItem.objects.insert_rows([('Boiler', john.pk, Decimal('900.00'), False, date(2026, 5, 9), None)])
+        self.assertEqual(self.overlapping_names(date(2026, 3, 1), date(2026, 5, 1)), {'Rent', 'Phone', 'Boiler'})
+        self.assertFalse(BudgetItem.objects.filter(first_month=0).exists())
+    
+    def test_tree_matches_query(self):
+        """Test that the interval tree finds and counts the same items as overlapping()."""
+        john = owner_named('John')
+        BudgetItem.objects.insert_rows(
+            (f'Item {i}', john.pk, Decimal('1.00'), i % 2 == 0, ordinal_to_month(month_ordinal(date(2020, 1, 1)) + i % 60),
+             ordinal_to_month(month_ordinal(date(2020, 1, 1)) + i % 60 + i % 13) if i % 3 else None)
+            for i in range(300)
+        )
+        # Items ending before they become active cover no month.
+        BudgetItem.objects.insert_rows(
+            (f'Lapsed {i}', john.pk, Decimal('1.00'), True, date(2023, 8, 1), date(2023, 2 + i, 1))
+            for i in range(3)
+        )
+        tree = IntervalTree.from_items()
+        self.assertEqual(len(tree), BudgetItem.objects.exclude(name__startswith='Lapsed').count())
+        for start, end in [
+            (date(2019, 1, 1), date(2019, 12, 1)), (date(2020, 1, 1), date(2020, 1, 1)),
+            (date(2021, 4, 1), date(2021, 6, 1)), (date(2022, 12, 1), date(2024, 2, 1)),
+            (date(2024, 4, 1), date(2024, 4, 1)), (date(2030, 1, 1), date(2040, 1, 1)),
+        ]:
+            expected = set(BudgetItem.objects.overlapping(start, end).values_list('id', flat=True))
+            found = tree.overlapping_dates(start, end)
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(found), expected, (start, end))
+            self.assertEqual(tree.count(month_ordinal(start), month_ordinal(end)), len(expected))
+        self.assertEqual(IntervalTree([]).overlapping(0, 10), [])
+    
+    def test_snapshot_invalidated_by_writes(self):
+        """Test that saving or deleting an item rebuilds the process snapshot."""
+        window = (month_ordinal(date(2024, 4, 1)), month_ordinal(date(2024, 4, 1)))
+        self.assertEqual(item_intervals().count(*window), 3)
+        self.assertIs(item_intervals(), item_intervals())
+        self.car.delete()
+        self.assertEqual(item_intervals().count(*window), 2)
+        self.gym.end_date = date(2024, 3, 1)
+        self.gym.save()
+        self.assertEqual(item_intervals().count(*window), 1)
+
+
+class RecurrenceTest(TestCase):
+    """Test recurrence rules, their expansion and their use by population, generation and forecasts."""
+    
+    def setUp(self):
+        self.owner = owner_named('John')
+    
+    def item(self, name, cost, recurrence, startdate, end_date=None, **kwargs):
+        return BudgetItem.objects.create(
+            name=name, owner=self.owner, cost=Decimal(cost), repeats=True, recurrence=recurrence,
+            startdate=startdate, end_date=end_date, **kwargs
+        )
+    
+    def occurrences(self, item, start, end):
+        runs = expand([item.recurrence_row()], month_ordinal(start), month_ordinal(end))
+        return {
+            ordinal_to_month(ordinal): count
+            for _, first, last, step, count in runs
+            for ordinal in range(first, last + 1, step)
+        }
+    
+    def test_expand(self):
+        """Test the occurrences of every kind of rule, including clamped days and end dates."""
+        weekly = self.item('Groceries', '50.00', recurrence.WEEKLY, date(2024, 1, 3), date(2024, 3, 6))
+        self.assertEqual(self.occurrences(weekly, date(2023, 12, 1), date(2024, 4, 1)), {
+            date(2024, 1, 1): 5, date(2024, 2, 1): 4, date(2024, 3, 1): 1
+        })
+        fortnightly = self.item('Cleaner', '40.00', recurrence.FORTNIGHTLY, date(2024, 1, 1))
+        self.assertEqual(self.occurrences(fortnightly, date(2024, 1, 1), date(2024, 2, 1)), {
+            date(2024, 1, 1): 3, date(2024, 2, 1): 2
+        })
+        quarterly = self.item('Water', '90.00', recurrence.QUARTERLY, date(2024, 1, 15), date(2024, 11, 30))
+        self.assertEqual(sorted(self.occurrences(quarterly, date(2024, 1, 1), date(2025, 12, 1))), [
+            date(2024, 2, 1), date(2024, 5, 1), date(2024, 8, 1), date(2024, 11, 1)
+        ])
+        every_five = self.item('Filters', '15.00', recurrence.EVERY_N_MONTHS, date(2024, 1, 1), interval=5)
+        self.assertEqual(sorted(self.occurrences(every_five, date(2024, 3, 1), date(2025, 6, 1))), [
+            date(2024, 6, 1), date(2024, 11, 1), date(2025, 4, 1)
+        ])
+        payday = self.item(
+            'Savings', '100.00', recurrence.DAY_OF_MONTH, date(2024, 1, 31), date(2024, 4, 29), day_of_month=31
+        )
+        self.assertEqual(sorted(self.occurrences(payday, date(2024, 1, 1), date(2024, 12, 1))), [
+            date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)
+        ])
+        annual = self.item('Insurance', '600.00', recurrence.ANNUAL, date(2024, 3, 1))
+        self.assertEqual(annual.occurrences_in(date(2026, 3, 1)), 1)
+        self.assertEqual(annual.occurrences_in(date(2026, 4, 1)), 0)
+        self.assertEqual(
+            (annual.first_month, payday.last_month, quarterly.last_month),
+            (month_ordinal(date(2024, 3, 1)), month_ordinal(date(2024, 3, 1)), month_ordinal(date(2024, 11, 1)))
+        )
+        
+        with self.assertRaises(ValidationError):
+            BudgetItem(
+                name='Bad', owner=self.owner, cost=Decimal('1.00'), repeats=True,
+                recurrence=recurrence.DAY_OF_MONTH, startdate=date(2024, 1, 1)
+            ).full_clean()
+    
+    def test_run_totals(self):
+        """Test that strided runs are summed per offset."""
+        self.assertEqual(
+            recurrence.run_totals([(0, 9, 3, 5), (2, 4, 1, 1), (1, 1, 12, 7)], 11),
+            [5, 7, 1, 6, 1, 0, 5, 0, 0, 5, 0]
+        )
+    
+    def test_months_cost_every_occurrence(self):
+        """Test that auto-population, generation, linking and forecasts agree on occurrence costs."""
+        self.item('Rent', '1000.00', recurrence.MONTHLY, date(2024, 1, 1))
+        weekly = self.item('Groceries', '50.00', recurrence.WEEKLY, date(2024, 1, 3))
+        quarterly = self.item('Water', '90.00', recurrence.QUARTERLY, date(2024, 1, 15))
+        BudgetItemCostPeriod.objects.create(budget_item=quarterly, effective_from=date(2024, 5, 1), cost=Decimal('120.00'))
+        
+        february = MonthlyInstance.objects.create(month=date(2024, 2, 1))
+        self.assertEqual(february.total_amount, Decimal('1290.00'))
+        self.assertEqual(february.line_items.get(budget_item=weekly).occurrences, 4)
+        self.assertEqual(
+            set(BudgetItem.objects.active_in(date(2024, 3, 1)).values_list('name', flat=True)),
+            {'Rent', 'Groceries'}
+        )
+        
+        generated = MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 8, 1))
+        totals = {instance.month: instance.total_amount for instance in MonthlyInstance.objects.all()}
+        self.assertEqual(len(generated), 7)
+        self.assertEqual(totals[date(2024, 1, 1)], Decimal('1250.00'))
+        self.assertEqual(totals[date(2024, 5, 1)], Decimal('1370.00'))
+        self.assertEqual(totals[date(2024, 6, 1)], Decimal('1200.00'))
+        for instance in MonthlyInstance.objects.all():
+            self.assertEqual(instance.total_amount, instance.calculate_total())
+            self.assertEqual(
+                instance.owner_summaries.aggregate(total=Sum('total'))['total'], instance.total_amount
+            )
+        self.assertEqual(
+            forecast(date(2024, 1, 1), months=8).month_totals(),
+            [totals[month] for month in sorted(totals)]
+        )
+        
+        fortnightly = self.item('Cleaner', '40.00', recurrence.FORTNIGHTLY, date(2024, 7, 1))
+        linked = MonthlyInstance.objects.link_new_items(
+            BudgetItem.objects.filter(pk=fortnightly.pk).select_related('owner')
+        )
+        self.assertEqual(linked, 2)
+        july = MonthlyInstance.objects.get(month=date(2024, 7, 1))
+        self.assertEqual(july.total_amount, totals[date(2024, 7, 1)] + Decimal('120.00'))
+    
+    def test_editing_the_rule_moves_and_recounts_lines(self):
+        """Test that changing an item's recurrence relinks and recosts the months it occurs in."""
+        item = self.item('Gym', '10.00', recurrence.WEEKLY, date(2024, 1, 3))
+        MonthlyInstance.objects.bulk_generate(date(2024, 1, 1), date(2024, 4, 1))
+        
+        def amounts():
+            return dict(MonthlyInstance.objects.order_by('month').values_list('month', 'total_amount'))
+        
+        self.assertEqual(list(amounts().values()), [Decimal('50.00'), Decimal('40.00'), Decimal('40.00'), Decimal('40.00')])
+        item = BudgetItem.objects.get(pk=item.pk)
+        item.startdate = date(2024, 1, 2)
+        item.save()
+        self.assertEqual(list(amounts().values()), [Decimal('50.00'), Decimal('40.00'), Decimal('40.00'), Decimal('50.00')])
+        
+        item.recurrence = recurrence.QUARTERLY
+        item.save()
+        self.assertEqual(list(amounts().values()), [Decimal('0.00'), Decimal('10.00'), Decimal('0.00'), Decimal('0.00')])
+        self.assertEqual(list(item.line_items.values_list('occurrences', flat=True)), [1])
+        
+        item.recurrence = recurrence.MONTHLY
+        item.save()
+        self.assertEqual(list(amounts().values()), [Decimal('0.00'), Decimal('10.00'), Decimal('10.00'), Decimal('10.00')])
+        
+        BudgetItem.objects.filter(pk=item.pk).update(recurrence=recurrence.ANNUAL)
+        item.refresh_from_db()
+        self.assertEqual(item.last_month, OPEN_ENDED_MONTH)
+        self.assertEqual(set(BudgetItem.objects.overlapping(date(2025, 2, 1), date(2025, 2, 1))), {item})
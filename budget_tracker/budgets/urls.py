@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'budgets'
+
+urlpatterns = [
+    path('items/', views.item_list, name='item-list'),
+    path('months/', views.month_list, name='month-list'),
+    path('months/<str:month>/', views.month_summary, name='month-summary'),
+    path('export/<slug:name>/', views.export, name='export'),
+]
@@ -1,3 +1,203 @@
-from django.shortcuts import render
+import base64
+import json
+from datetime import date
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import models
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import cache, exports, metrics
+from .models import BudgetItem, MonthlyInstance
+from .months import parse_month
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+ITEM_FIELDS = [
+    'id', 'name', 'owner__name', 'cost', 'repeats', 'recurrence', 'interval', 'day_of_month',
+    'startdate', 'end_date', 'created_at', 'updated_at',
+]
+MONTH_FIELDS = ['id', 'month', 'total_amount', 'notes', 'created_at', 'updated_at']
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _encode_cursor(values):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(model, keys, cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [model._meta.get_field(key).to_python(value) for key, value in zip(keys, values)]
+    except Exception:
+        raise BadRequest("Invalid cursor")
+
+
+def _after(keys, values):
+    """
+    Return a Q selecting rows that come after ``values`` in descending ``keys`` order.
+    """
+    q = models.Q()
+    for i, key in enumerate(keys):
+        step = models.Q(**{f'{key}__lt': values[i]})
+        for prior_key, prior_value in zip(keys[:i], values[:i]):
+            step &= models.Q(**{prior_key: prior_value})
+        q |= step
+    return q
+
+
+def keyset_page(request, queryset, keys, fields, rename=None):
+    """
+    Return one page of ``queryset`` ordered by descending ``keys`` as a JsonResponse.
+
+    Seeks past the ``cursor`` query parameter instead of using OFFSET and
+    fetches one extra row to know whether there is a next page, so every
+    page is a single query whatever the table size and no COUNT is issued.
+    ``rename`` maps lookups in ``fields`` to the keys used in the output.
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("Invalid limit")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(_after(keys, _decode_cursor(queryset.model, keys, cursor)))
+    rows = list(queryset.order_by(*[f'-{key}' for key in keys]).values(*fields)[:limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['cursor'] = _encode_cursor([rows[-1][key] for key in keys])
+        next_url = f'{request.path}?{params.urlencode()}'
+    if rename:
+        rows = [{rename.get(key, key): value for key, value in row.items()} for row in rows]
+    return JsonResponse({'results': rows, 'next': next_url})
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"Invalid {name}, expected YYYY-MM-DD")
+
+
+def _parse_month(value, name):
+    try:
+        return parse_month(value)
+    except ValueError:
+        raise BadRequest(f"Invalid {name}, expected YYYY-MM")
+
+
+def json_api(view):
+    """Wrap an API view so BadRequest becomes a 400 JSON response."""
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return require_GET(staff_member_required(wrapper))
+
+
+@json_api
+def item_list(request):
+    """
+    List budget items, newest first, keyset-paginated on (created_at, id).
+
+    Filters: ``owner``, ``repeats`` (true/false) and ``active_from`` /
+    ``active_to`` (YYYY-MM-DD) selecting items occurring in a month of the
+    window (see ``BudgetItemQuerySet.overlapping``); one-off items occur in
+    the month they start in.
+    """
+    items = BudgetItem.objects.all()
+    if 'owner' in request.GET:
+        items = items.filter(owner__name=request.GET['owner'])
+    if 'repeats' in request.GET:
+        value = request.GET['repeats'].lower()
+        if value not in ('true', 'false'):
+            raise BadRequest("Invalid repeats, expected true or false")
+        items = items.filter(repeats=value == 'true')
+    if 'active_from' in request.GET or 'active_to' in request.GET:
+        window = BudgetItem.objects.overlapping(
+            _parse_date(request.GET['active_from'], 'active_from') if 'active_from' in request.GET else date.min,
+            _parse_date(request.GET['active_to'], 'active_to') if 'active_to' in request.GET else date.max,
+        )
+        # As a subquery SQLite seeks the window on the month range indexes
+        # instead of walking budgetitem_created_idx for the page order.
+        items = items.filter(pk__in=window.values('pk'))
+    return keyset_page(request, items, ['created_at', 'id'], ITEM_FIELDS, rename={'owner__name': 'owner'})
+
+
+@json_api
+def month_list(request):
+    """
+    List monthly instances, latest first, keyset-paginated on month.
+
+    Filters: ``from`` / ``to`` (YYYY-MM), inclusive.
+    """
+    months = MonthlyInstance.objects.all()
+    if 'from' in request.GET:
+        months = months.filter(month__gte=_parse_month(request.GET['from'], 'from'))
+    if 'to' in request.GET:
+        months = months.filter(month__lte=_parse_month(request.GET['to'], 'to'))
+    return keyset_page(request, months, ['month'], MONTH_FIELDS)
+
+
+@json_api
+def month_summary(request, month):
+    """
+    Return the cached total, owner subtotals and linked item ids of one month (YYYY-MM).
+    """
+    month = _parse_month(month, 'month')
+    total = cache.month_total(month)
+    if total is None:
+        raise Http404
+    return JsonResponse({
+        'month': month,
+        'total_amount': total,
+        'owners': cache.owner_subtotals(month),
+        'item_ids': sorted(cache.item_ids(month)),
+    })
+
+
+@json_api
+def export(request, name):
+    """
+    Stream export ``name`` (``items`` or ``line-items``) as CSV or JSON lines.
+
+    Query parameters: ``format`` (csv, the default, or jsonl) and, for line
+    items, ``from`` / ``to`` (YYYY-MM).
+    """
+    if name not in exports.EXPORTS:
+        raise Http404
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        raise BadRequest("Invalid format, expected csv or jsonl")
+    start = _parse_month(request.GET['from'], 'from') if 'from' in request.GET else None
+    end = _parse_month(request.GET['to'], 'to') if 'to' in request.GET else None
+
+    response = StreamingHttpResponse(
+        exports.stream_export(name, fmt, start, end),
+        content_type=exports.FORMATS[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+
+@require_GET
+def metrics_view(request):
+    """Expose the budget operation metrics in the Prometheus text format."""
+    return HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE)